@@ -1,3 +1,5 @@
+from csp.action_history import ActionCodec, ActionHistory, RingBufferActionHistory, GzipActionHistory, \
+                             read_action_history, replay_actions
 from csp.ac3_implementation import ac3
 from csp.ac4_implementation import ac4
 from csp.backtracking import *
@@ -8,14 +10,28 @@ from csp.constraint_weighting_implementation import constraints_weighting
 from csp.domain_sorters import *
 from csp.forward_checking_implementation import forward_check
 from csp.general_genetic_constraint_problem import GeneralGeneticConstraintProblem
-from csp.genetic_search import GeneticConstraintProblem, Assignment, genetic_local_search
+from csp.genetic_search import GeneticConstraintProblem, Assignment, Individual, genetic_local_search, \
+                              island_genetic_local_search, ring_migration_topology, fully_connected_migration_topology
 from csp.hill_climbing_implementations import generate_start_state_randomly, consistent_constraints_amount, \
-                             alter_random_variable_value_pair, random_restart_first_choice_hill_climbing
-from csp.i_consistency_implementation import i_consistency
-from csp.min_conflicts_implementation import min_conflicts
-from csp.naive_cutset_conditioning import naive_cycle_cutset
+                             alter_random_variable_value_pair, random_restart_first_choice_hill_climbing, Move, \
+                             apply_move, undo_move, alter_random_variable_value_move, consistent_constraints_delta, \
+                             move_based_random_restart_first_choice_hill_climbing
+from csp.i_consistency_implementation import i_consistency, i_consistency_with_report, IConsistencyReport
+from csp.min_conflicts_implementation import min_conflicts, parallel_min_conflicts, MinConflictsSearch, \
+                             MinConflictsRunStatistics, MinConflictsBatchResult
+from csp.naive_cutset_conditioning import naive_cycle_cutset, parallel_cycle_cutset, find_cycle_cutset, \
+                             get_cycle_cutset_report, CycleCutsetReport
+from csp.parallel_tempering_implementation import parallel_tempering, geometric_temperature_ladder
 from csp.pc2_implementation import pc2
-from csp.simulated_annealing_implementation import simulated_annealing
+from csp.sac_implementation import sac, parallel_sac
+from csp.search_budget import SearchBudget, SolverResult, BudgetExhaustedError
+from csp.search_context import SearchContext
+from csp.search_events import SearchEvents
+from csp.simulated_annealing_implementation import simulated_annealing, move_based_simulated_annealing
+from csp.solver_statistics import SolverStatistics
 from csp.tree_csp_solver_implementation import tree_csp_solver
+from csp.tree_decomposition_implementation import tree_decompose, tree_decomposition_solver, \
+                             count_solutions_with_tree_decomposition, min_fill_elimination_order, \
+                             min_degree_elimination_order, TreeDecomposition
 from csp.unassigned_variable_selectors import *
 from csp.variable import *
@@ -1,24 +1,58 @@
+from contextlib import ExitStack
+from typing import Optional
 from csp.variable import Variable
 from csp.constraint_problem import ConstraintProblem
+from csp.solver_statistics import SolverStatistics
+from csp.search_events import SearchEvents
+from csp.search_budget import SearchBudget
 
 
-def ac3(constraint_problem: ConstraintProblem, assigned_variable: Variable = None) -> bool:
+def ac3(constraint_problem: ConstraintProblem, assigned_variable: Variable = None,
+        statistics: Optional[SolverStatistics] = None, events: Optional[SearchEvents] = None,
+        budget: Optional[SearchBudget] = None) -> bool:
+    """ With a budget, a node is charged per revised arc. """
+    if statistics is None and events is None and budget is None:
+        return __ac3(constraint_problem, assigned_variable)
+    if budget is not None:
+        budget.start(constraint_problem)
+    with ExitStack() as phase_stack:
+        searched_problem = constraint_problem
+        if statistics is not None:
+            searched_problem = statistics.get_counting_problem(constraint_problem)
+            phase_stack.enter_context(statistics.phase("ac3"))
+        if events is not None:
+            phase_stack.enter_context(events.phase("ac3"))
+        is_consistent = __ac3(searched_problem, assigned_variable, statistics, events, budget)
+    if budget is not None:
+        budget.report_consistency(constraint_problem, is_consistent)
+    return is_consistent
+
+
+def __ac3(constraint_problem: ConstraintProblem, assigned_variable: Optional[Variable],
+          statistics: Optional[SolverStatistics] = None, events: Optional[SearchEvents] = None,
+          budget: Optional[SearchBudget] = None) -> bool:
     if assigned_variable is not None:  # usage of ac3 as part of Maintaining Arc Consistency (MAC) algorithm
         unassigned_neighbors = constraint_problem.get_unassigned_neighbors(assigned_variable)
         arcs = {(unassigned_neighbor, assigned_variable) for unassigned_neighbor in unassigned_neighbors}
     else:
         arcs = {(variable, neighbor) for variable in constraint_problem.get_unassigned_variables()
                 for neighbor in constraint_problem.get_neighbors(variable)}
+    if statistics is not None:
+        statistics.queue_pushes += len(arcs)
 
     while arcs:
+        if budget is not None and budget.charge_node():
+            break
         variable, neighbor = arcs.pop()
-        if __revise(constraint_problem, variable, neighbor):
+        if __revise(constraint_problem, variable, neighbor, statistics, events):
             if not constraint_problem.get_consistent_domain(variable):
                 return False
             rest_of_neighbors = constraint_problem.get_neighbors(variable) - {neighbor}
             if rest_of_neighbors:
                 for other_neighbor in rest_of_neighbors:
                     arcs.add((other_neighbor, variable))
+                if statistics is not None:
+                    statistics.queue_pushes += len(rest_of_neighbors)
 
     for var in constraint_problem.get_variables():
         if not var.domain or not constraint_problem.get_consistent_domain(var):
@@ -26,7 +60,8 @@ def ac3(constraint_problem: ConstraintProblem, assigned_variable: Variable = Non
     return True
 
 
-def __revise(constraints_problem: ConstraintProblem, variable: Variable, neighbor: Variable) -> bool:
+def __revise(constraints_problem: ConstraintProblem, variable: Variable, neighbor: Variable,
+             statistics: Optional[SolverStatistics], events: Optional[SearchEvents]) -> bool:
     if variable.value is not None:
         return False
     variable_constraints = constraints_problem.get_constraints_containing_variable(variable)
@@ -38,5 +73,9 @@ def __revise(constraints_problem: ConstraintProblem, variable: Variable, neighbo
         if not shared_constraint.get_consistent_domain_values(neighbor):
             variable.remove_from_domain(value)
             revised = True
+            if statistics is not None:
+                statistics.pruned_values += 1
+            if events is not None:
+                events.emit(SearchEvents.PRUNE, variable, value)
         variable.unassign()
     return revised
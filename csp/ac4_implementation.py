@@ -1,25 +1,89 @@
-from typing import FrozenSet, Counter, Tuple, Any, DefaultDict, Deque, Set
-import collections
+from contextlib import ExitStack
+from array import array
+from collections import deque
+from typing import Tuple, List, Any, Dict, Optional
 from csp.variable import Variable
-from csp.constraint import Constraint
 from csp.constraint_problem import ConstraintProblem
+from csp.solver_statistics import SolverStatistics
+from csp.search_events import SearchEvents
+from csp.search_budget import SearchBudget
 
 
-def ac4(constraint_problem: ConstraintProblem) -> bool:
-    support_counter = collections.Counter()
-    variable_value_pairs_supported_by = collections.defaultdict(set)
-    unsupported_variable_value_pairs = collections.deque()
-    __initialize_ac4(constraint_problem.get_constraints(), support_counter, variable_value_pairs_supported_by,
-                     unsupported_variable_value_pairs)
+# ////////////////////////////////////////////////////// ac4 //////////////////////////////////////////////////////////
+# variables and values are indexed by integers: the values of the i-th variable get the global ids
+# values_offsets[i], ..., values_offsets[i + 1] - 1, and an assigned variable's only candidate value is its value.
+# every constraint of at least two variables contributes an arc (x, y) for each ordered pair of variables in its scope,
+# and each arc has a support counter per value of x. all the structures are flat arrays:
+# 1. support_counters[counter id]: how many values of y support the counter's value of x within the counter's arc.
+# 2. counters_values[counter id]: the global id of the counter's value of x.
+# 3. supported_counters[supported_starts[value id]:supported_starts[value id + 1]]: the ids of the counters this value
+#    supports (a compressed sparse row layout of the "supported by" sets).
+# when a value dies, the counters it supports are decremented, and values whose counter reaches zero die as well.
+# /////////////////////////////////////////////////////////////////////////////////////////////////////////////////
 
-    while unsupported_variable_value_pairs:
-        second_variable, second_value = unsupported_variable_value_pairs.popleft()
-        for first_variable, first_value in variable_value_pairs_supported_by[(second_variable, second_value)]:
-            if first_value in first_variable.domain:
-                support_counter[(first_variable, first_value, second_variable)] -= 1
-                if support_counter[(first_variable, first_value, second_variable)] == 0:
-                    first_variable.remove_from_domain(first_value)
-                    unsupported_variable_value_pairs.append((first_variable, first_value))
+
+def ac4(constraint_problem: ConstraintProblem, statistics: Optional[SolverStatistics] = None,
+        events: Optional[SearchEvents] = None, budget: Optional[SearchBudget] = None) -> bool:
+    """ With a budget, a node is charged per unsupported value. """
+    if budget is not None:
+        budget.start(constraint_problem)
+    with ExitStack() as phase_stack:
+        searched_problem = constraint_problem
+        if statistics is not None:
+            searched_problem = statistics.get_counting_problem(constraint_problem)
+            phase_stack.enter_context(statistics.phase("ac4"))
+        if events is not None:
+            phase_stack.enter_context(events.phase("ac4"))
+        is_consistent = __ac4(searched_problem, statistics, events, budget)
+    if budget is not None:
+        budget.report_consistency(constraint_problem, is_consistent)
+    return is_consistent
+
+
+def __ac4(constraint_problem: ConstraintProblem, statistics: Optional[SolverStatistics],
+          events: Optional[SearchEvents], budget: Optional[SearchBudget]) -> bool:
+    variables = tuple(constraint_problem.get_variables())
+    candidates = [(variable.value,) if variable else tuple(variable.domain) for variable in variables]
+    values_offsets = array("l", [0])
+    for variable_candidates in candidates:
+        values_offsets.append(values_offsets[-1] + len(variable_candidates))
+    variables_indices = {variable: i for i, variable in enumerate(variables)}
+
+    support_counters, counters_values, supported_starts, supported_counters = \
+        __initialize_ac4(constraint_problem, variables, candidates, values_offsets, variables_indices)
+
+    alive = bytearray(b"\x01") * values_offsets[-1]
+    unsupported_values = deque()
+    for counter_id, support_amount in enumerate(support_counters):
+        value_id = counters_values[counter_id]
+        if support_amount == 0 and alive[value_id]:
+            alive[value_id] = 0
+            unsupported_values.append(value_id)
+
+    while unsupported_values:
+        if budget is not None and budget.charge_node():
+            break
+        value_id = unsupported_values.popleft()
+        for supported_index in range(supported_starts[value_id], supported_starts[value_id + 1]):
+            counter_id = supported_counters[supported_index]
+            support_counters[counter_id] -= 1
+            supported_value_id = counters_values[counter_id]
+            if support_counters[counter_id] == 0 and alive[supported_value_id]:
+                alive[supported_value_id] = 0
+                unsupported_values.append(supported_value_id)
+
+    for i, (variable, variable_candidates) in enumerate(zip(variables, candidates)):
+        dead_values = [value for j, value in enumerate(variable_candidates) if not alive[values_offsets[i] + j]]
+        if variable:
+            if dead_values:
+                return False
+            continue
+        for value in dead_values:
+            variable.remove_from_domain(value)
+            if statistics is not None:
+                statistics.pruned_values += 1
+            if events is not None:
+                events.emit(SearchEvents.PRUNE, variable, value)
 
     for var in constraint_problem.get_variables():
         if not var.domain or not constraint_problem.get_consistent_domain(var):
@@ -27,31 +91,55 @@ def ac4(constraint_problem: ConstraintProblem) -> bool:
     return True
 
 
-def __initialize_ac4(constraints: FrozenSet[Constraint], support_counter: Counter[Tuple[Variable, Any, Variable]],
-                     variable_value_pairs_supported_by: DefaultDict[Tuple[Variable, Any], Set[Tuple[Variable, Any]]],
-                     unsupported_variable_value_pairs: Deque[Tuple[Variable, Any]]) -> None:
-    for constraint in constraints:
-        if len(constraint.variables) == 1:
+def __initialize_ac4(constraint_problem: ConstraintProblem, variables: Tuple[Variable, ...],
+                     candidates: List[Tuple[Any, ...]], values_offsets: array,
+                     variables_indices: Dict[Variable, int]) \
+        -> Tuple[array, array, array, array]:
+    """ Checks every pair of candidate values of every pair of variables in each constraint's scope once, counting the
+        supports of both arcs at the same time. Pairs are checked against an assignment of the scope, so the
+        variables' state is neither read nor changed in the inner loop. """
+    support_counters = array("l")
+    counters_values = array("l")
+    supporters = array("l")
+    supported = array("l")
+    for constraint in constraint_problem.get_constraints():
+        scope = constraint.variables
+        if len(scope) == 1:
             continue
-        first_variable, second_variable, *_ = constraint.variables
-        for i in range(2):
-            first_variable_was_assigned = False if first_variable.value is None else True
-            for first_value in first_variable.domain:
-                if not first_variable_was_assigned:
-                    first_variable.assign(first_value)
-                second_variable_was_assigned = False if second_variable.value is None else True
-                for second_value in second_variable.domain:
-                    if not second_variable_was_assigned:
-                        second_variable.assign(second_value)
-                    if constraint.is_consistent():
-                        support_counter[(first_variable, first_value, second_variable)] += 1
-                        variable_value_pairs_supported_by[(second_variable, second_value)].add((first_variable,
-                                                                                                first_value))
-                    if not second_variable_was_assigned:
-                        second_variable.unassign()
-                if support_counter[(first_variable, first_value, second_variable)] == 0:
-                    first_variable.remove_from_domain(first_value)
-                    unsupported_variable_value_pairs.append((first_variable, first_value))
-                if not first_variable_was_assigned:
-                    first_variable.unassign()
-            first_variable, second_variable = second_variable, first_variable
+        scope_assignment = {variable: variable.value for variable in scope}
+        for x_position in range(len(scope)):
+            for y_position in range(x_position + 1, len(scope)):
+                x, y = variables_indices[scope[x_position]], variables_indices[scope[y_position]]
+                x_counters_offset = len(support_counters)
+                y_counters_offset = x_counters_offset + len(candidates[x])
+                for value_id in range(values_offsets[x], values_offsets[x + 1]):
+                    counters_values.append(value_id)
+                for value_id in range(values_offsets[y], values_offsets[y + 1]):
+                    counters_values.append(value_id)
+                support_counters.extend(array("l", [0]) * (len(candidates[x]) + len(candidates[y])))
+
+                x_variable, y_variable = variables[x], variables[y]
+                for j, x_value in enumerate(candidates[x]):
+                    scope_assignment[x_variable] = x_value
+                    for k, y_value in enumerate(candidates[y]):
+                        scope_assignment[y_variable] = y_value
+                        if constraint.is_consistent_with(scope_assignment):
+                            support_counters[x_counters_offset + j] += 1
+                            support_counters[y_counters_offset + k] += 1
+                            supporters.append(values_offsets[y] + k)
+                            supported.append(x_counters_offset + j)
+                            supporters.append(values_offsets[x] + j)
+                            supported.append(y_counters_offset + k)
+                scope_assignment[x_variable], scope_assignment[y_variable] = x_variable.value, y_variable.value
+
+    supported_starts = array("l", [0]) * (values_offsets[-1] + 1)
+    for value_id in supporters:
+        supported_starts[value_id + 1] += 1
+    for value_id in range(values_offsets[-1]):
+        supported_starts[value_id + 1] += supported_starts[value_id]
+    supported_counters = array("l", [0]) * len(supported)
+    next_positions = array("l", supported_starts)
+    for value_id, counter_id in zip(supporters, supported):
+        supported_counters[next_positions[value_id]] = counter_id
+        next_positions[value_id] += 1
+    return support_counters, counters_values, supported_starts, supported_counters
@@ -0,0 +1,181 @@
+import gzip
+from abc import ABCMeta, abstractmethod
+from sys import byteorder
+from array import array
+from collections import deque
+from typing import Sequence, Tuple, Any, Iterator, Iterable, Optional, Union, Deque
+from csp.variable import Variable
+
+
+# //////////////////////////////////////////////// action history /////////////////////////////////////////////////////
+# instead of keeping a (variable, value) tuple per action, an action is encoded as two fixed width ints: the variable's
+# id (its index in the codec's variables) and the value's index in the variable's domain as it was when the codec was
+# made (-1 for an unassignment). a RingBufferActionHistory keeps only the last capacity actions in two int arrays, and
+# a GzipActionHistory streams the pairs to a compressed file, which read_action_history decodes back for replay.
+# /////////////////////////////////////////////////////////////////////////////////////////////////////////////////
+
+
+Action = Tuple[Variable, Any]
+
+
+class ActionCodec:
+    """ Encodes actions of variables as (variable id, value index) pairs. The variables' domains are snapshotted, so
+        the codec should be made before solving (domains may only shrink afterwards). Decoding an action history in
+        another process requires a codec of the same variables, in the same order, with the same domains. """
+
+    UNASSIGNED_INDEX = -1
+
+    def __init__(self, variables: Sequence[Variable]) -> None:
+        self.__variables = tuple(variables)
+        self.__variables_ids = {variable: i for i, variable in enumerate(self.__variables)}
+        self.__domains = [tuple(variable.domain) for variable in self.__variables]
+        self.__values_indices = [{value: j for j, value in enumerate(domain)} for domain in self.__domains]
+
+    def get_variables(self) -> Tuple[Variable, ...]:
+        return self.__variables
+
+    def encode(self, action: Action) -> Tuple[int, int]:
+        variable, value = action
+        variable_id = self.__variables_ids[variable]
+        if value is None:
+            return variable_id, ActionCodec.UNASSIGNED_INDEX
+        return variable_id, self.__values_indices[variable_id][value]
+
+    def decode(self, variable_id: int, value_index: int) -> Action:
+        if value_index == ActionCodec.UNASSIGNED_INDEX:
+            return self.__variables[variable_id], None
+        return self.__variables[variable_id], self.__domains[variable_id][value_index]
+
+
+class ActionHistory(metaclass=ABCMeta):
+    """ Base class of the compact action histories. Solvers append (variable, value) actions to it exactly as they
+        would to a deque, with value None for an unassignment. """
+
+    def __init__(self, codec: ActionCodec) -> None:
+        self._codec = codec
+
+    def get_codec(self) -> ActionCodec:
+        return self._codec
+
+    @abstractmethod
+    def append(self, action: Action) -> None:
+        pass
+
+    def extend(self, actions: Iterable[Action]) -> None:
+        for action in actions:
+            self.append(action)
+
+
+ActionsSink = Union[Deque[Action], ActionHistory]
+
+
+class RingBufferActionHistory(ActionHistory):
+    """ Keeps the last capacity actions, 8 bytes each. """
+
+    def __init__(self, codec: ActionCodec, capacity: int) -> None:
+        assert 0 < capacity, "capacity must be a positive integer."
+        super(RingBufferActionHistory, self).__init__(codec)
+        self.__variables_ids = array("i", [0]) * capacity
+        self.__values_indices = array("i", [0]) * capacity
+        self.__capacity = capacity
+        self.__start = 0
+        self.__length = 0
+        self.__appended_amount = 0
+
+    def get_appended_amount(self) -> int:
+        """ Returns the amount of actions appended since the history was made or last cleared, including the ones
+            which were overwritten. """
+        return self.__appended_amount
+
+    def append(self, action: Action) -> None:
+        position = (self.__start + self.__length) % self.__capacity
+        self.__variables_ids[position], self.__values_indices[position] = self._codec.encode(action)
+        if self.__length == self.__capacity:
+            self.__start = (self.__start + 1) % self.__capacity
+        else:
+            self.__length += 1
+        self.__appended_amount += 1
+
+    def clear(self) -> None:
+        self.__start = 0
+        self.__length = 0
+        self.__appended_amount = 0
+
+    def __len__(self) -> int:
+        return self.__length
+
+    def __iter__(self) -> Iterator[Action]:
+        for i in range(self.__length):
+            position = (self.__start + i) % self.__capacity
+            yield self._codec.decode(self.__variables_ids[position], self.__values_indices[position])
+
+
+class GzipActionHistory(ActionHistory):
+    """ Streams the actions to a gzip compressed file, as little endian pairs of 4 byte ints. Actions are buffered
+        and written buffer_size pairs at a time, so the file is complete only after close (or leaving a with block). """
+
+    def __init__(self, codec: ActionCodec, file_name: str, buffer_size: int = 4096) -> None:
+        assert 0 < buffer_size, "buffer_size must be a positive integer."
+        super(GzipActionHistory, self).__init__(codec)
+        self.__file = gzip.open(file_name, "wb")
+        self.__buffer = array("i")
+        self.__buffer_size = buffer_size
+        self.__length = 0
+
+    def append(self, action: Action) -> None:
+        self.__buffer.extend(self._codec.encode(action))
+        self.__length += 1
+        if self.__buffer_size * 2 <= len(self.__buffer):
+            self.flush()
+
+    def flush(self) -> None:
+        if byteorder == "big":
+            self.__buffer.byteswap()
+        self.__file.write(self.__buffer.tobytes())
+        self.__buffer = array("i")
+
+    def close(self) -> None:
+        if not self.__file.closed:
+            self.flush()
+            self.__file.close()
+
+    def __len__(self) -> int:
+        return self.__length
+
+    def __enter__(self) -> "GzipActionHistory":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+
+def read_action_history(codec: ActionCodec, file_name: str, buffer_size: int = 4096) -> Iterator[Action]:
+    """ Lazily decodes the actions a GzipActionHistory wrote to file_name. """
+    item_size = array("i").itemsize
+    with gzip.open(file_name, "rb") as history_file:
+        while True:
+            chunk = history_file.read(buffer_size * 2 * item_size)
+            if not chunk:
+                return
+            pairs = array("i")
+            pairs.frombytes(chunk)
+            if byteorder == "big":
+                pairs.byteswap()
+            for i in range(0, len(pairs), 2):
+                yield codec.decode(pairs[i], pairs[i + 1])
+
+
+def replay_actions(actions: Iterable[Action]) -> None:
+    """ Applies the actions to their variables, in order. """
+    for variable, value in actions:
+        variable.unassign()
+        if value is not None:
+            variable.assign(value)
+
+
+def get_actions_sink(with_history: bool, history: Optional[ActionsSink] = None) -> Optional[ActionsSink]:
+    """ The sink a solver records its actions to: history (a deque or an ActionHistory) if given, else a new deque if
+        with_history. """
+    if history is not None:
+        return history
+    return deque() if with_history else None
@@ -1,9 +1,14 @@
-from typing import FrozenSet, Callable, Deque, Tuple, Any, Optional, Union, Dict, Iterator
+from typing import FrozenSet, Callable, Deque, Tuple, Any, Optional, Union, Dict, Iterator, List
 from collections import deque
 from csp.variable import Variable
 from csp.constraint_problem import ConstraintProblem
 from csp.domain_sorters import least_constraining_value
 from csp.unassigned_variable_selectors import minimum_remaining_values, degree_heuristic
+from csp.solver_statistics import SolverStatistics
+from csp.search_events import SearchEvents
+from csp.action_history import ActionsSink, get_actions_sink
+from csp.search_context import SearchContext
+from csp.search_budget import SearchBudget, BudgetExhaustedError
 
 
 SelectUnassignedVariables = Callable[[ConstraintProblem, Optional[FrozenSet[Variable]]], FrozenSet[Variable]]
@@ -11,58 +16,59 @@ SortDomain = Callable[[ConstraintProblem, Variable], list]
 Inference = Callable[[ConstraintProblem, Variable], bool]
 
 
-__actions_history = deque()
-
-
 def backtracking_search(constraint_problem: ConstraintProblem, inference: Optional[Inference] = None,
-                        find_all_solutions: bool = False, with_history: bool = False) \
-        -> Union[None, Deque[Tuple[Variable, Any]], Iterator[Dict[Variable, Any]]]:
-    __actions_history.clear()
-    if find_all_solutions and with_history:
-        with_history = False
-
-    if not find_all_solutions:
-        next(__backtrack(constraint_problem, inference, find_all_solutions, with_history))
-        if with_history:
-            return __actions_history
-        return
-
-    return __backtrack(constraint_problem, inference, find_all_solutions, with_history)
-
-
-def __backtrack(constraint_problem: ConstraintProblem, inference: Optional[Inference] = None,
-                find_all_solutions: bool = False, with_history: bool = False) -> Optional[Dict[Variable, Any]]:
+                        find_all_solutions: bool = False, with_history: bool = False,
+                        statistics: Optional[SolverStatistics] = None, events: Optional[SearchEvents] = None,
+                        history: Optional[ActionsSink] = None,
+                        budget: Optional[SearchBudget] = None) \
+        -> Union[None, ActionsSink, Iterator[Dict[Variable, Any]]]:
+    context = __get_search_context(find_all_solutions, with_history, statistics, events, history, budget)
+    searched_problem = context.get_searched_problem(constraint_problem)
+    solutions = __backtrack(searched_problem, context, inference, find_all_solutions)
+    return __run_search(constraint_problem, solutions, find_all_solutions, context)
+
+
+def __backtrack(constraint_problem: ConstraintProblem, context: SearchContext, inference: Optional[Inference] = None,
+                find_all_solutions: bool = False) -> Optional[Dict[Variable, Any]]:
     variable, *_ = constraint_problem.get_unassigned_variables()
     for value in variable.domain:
         variable.assign(value)
-        if with_history:
-            __actions_history.append((variable, value))
+        if context.is_tracking:
+            context.assigned(variable, value)
 
         if inference is not None and not inference(constraint_problem, variable):
+            if context.events is not None:
+                context.conflicted(variable)
             variable.unassign()
-            if with_history:
-                __actions_history.append((variable, None))
+            if context.is_tracking:
+                context.unassigned(variable)
             continue
 
         if constraint_problem.is_completely_assigned():
             if constraint_problem.is_consistently_assigned():
+                if context.events is not None:
+                    context.events.emit(SearchEvents.SOLUTION, constraint_problem.get_current_assignment())
                 if find_all_solutions:
                     yield constraint_problem.get_current_assignment()
                 else:
                     yield None
+            elif context.events is not None:
+                context.conflicted(variable)
 
             variable.unassign()
-            if with_history:
-                __actions_history.append((variable, None))
+            if context.is_tracking:
+                context.unassigned(variable)
             continue
 
         if constraint_problem.is_consistently_assigned():
-            for solution_assignment in __backtrack(constraint_problem, inference, find_all_solutions, with_history):
+            for solution_assignment in __backtrack(constraint_problem, context, inference, find_all_solutions):
                 yield solution_assignment
+        elif context.events is not None:
+            context.conflicted(variable)
 
         variable.unassign()
-        if with_history:
-            __actions_history.append((variable, None))
+        if context.is_tracking:
+            context.unassigned(variable)
 
 
 def heuristic_backtracking_search(constraint_problem: ConstraintProblem,
@@ -72,32 +78,25 @@ def heuristic_backtracking_search(constraint_problem: ConstraintProblem,
                                   sort_domain: SortDomain = least_constraining_value,
                                   inference: Optional[Inference] = None,
                                   find_all_solutions: bool = False,
-                                  with_history: bool = False) \
-        -> Union[None, Deque[Tuple[Variable, Any]], Iterator[Dict[Variable, Any]]]:
-    __actions_history.clear()
-    if find_all_solutions and with_history:
-        with_history = False
-
-    if not find_all_solutions:
-        next(__heuristic_backtrack(constraint_problem, primary_select_unassigned_vars,
-                                   secondary_select_unassigned_vars, sort_domain, inference, find_all_solutions,
-                                   with_history))
-        if with_history:
-            return __actions_history
-        return
-
-    return __heuristic_backtrack(constraint_problem, primary_select_unassigned_vars,
-                                 secondary_select_unassigned_vars, sort_domain, inference, find_all_solutions,
-                                 with_history)
-
-
-def __heuristic_backtrack(constraint_problem: ConstraintProblem,
+                                  with_history: bool = False,
+                                  statistics: Optional[SolverStatistics] = None,
+                                  events: Optional[SearchEvents] = None,
+                                  history: Optional[ActionsSink] = None,
+                                  budget: Optional[SearchBudget] = None) \
+        -> Union[None, ActionsSink, Iterator[Dict[Variable, Any]]]:
+    context = __get_search_context(find_all_solutions, with_history, statistics, events, history, budget)
+    searched_problem = context.get_searched_problem(constraint_problem)
+    solutions = __heuristic_backtrack(searched_problem, context, primary_select_unassigned_vars,
+                                      secondary_select_unassigned_vars, sort_domain, inference, find_all_solutions)
+    return __run_search(constraint_problem, solutions, find_all_solutions, context)
+
+
+def __heuristic_backtrack(constraint_problem: ConstraintProblem, context: SearchContext,
                           primary_select_unassigned_vars: SelectUnassignedVariables = minimum_remaining_values,
                           secondary_select_unassigned_vars: SelectUnassignedVariables = degree_heuristic,
                           sort_domain: SortDomain = least_constraining_value,
                           inference: Optional[Inference] = None,
-                          find_all_solutions: bool = False,
-                          with_history: bool = False) -> Optional[Dict[Variable, Any]]:
+                          find_all_solutions: bool = False) -> Optional[Dict[Variable, Any]]:
     selected_unassigned_vars = primary_select_unassigned_vars(constraint_problem, None)
     if secondary_select_unassigned_vars is not None and len(selected_unassigned_vars) > 1:
         selected_unassigned_vars = secondary_select_unassigned_vars(constraint_problem, selected_unassigned_vars)
@@ -106,102 +105,118 @@ def __heuristic_backtrack(constraint_problem: ConstraintProblem,
     sorted_domain = sort_domain(constraint_problem, selected_variable)
     for value in sorted_domain:
         selected_variable.assign(value)
-        if with_history:
-            __actions_history.append((selected_variable, value))
+        if context.is_tracking:
+            context.assigned(selected_variable, value)
 
         if inference is not None and not inference(constraint_problem, selected_variable):
+            if context.events is not None:
+                context.conflicted(selected_variable)
             selected_variable.unassign()
-            if with_history:
-                __actions_history.append((selected_variable, None))
+            if context.is_tracking:
+                context.unassigned(selected_variable)
             continue
 
         if constraint_problem.is_completely_assigned():
             if constraint_problem.is_consistently_assigned():
+                if context.events is not None:
+                    context.events.emit(SearchEvents.SOLUTION, constraint_problem.get_current_assignment())
                 if find_all_solutions:
                     yield constraint_problem.get_current_assignment()
                 else:
                     yield None
+            elif context.events is not None:
+                context.conflicted(selected_variable)
 
             selected_variable.unassign()
-            if with_history:
-                __actions_history.append((selected_variable, None))
+            if context.is_tracking:
+                context.unassigned(selected_variable)
             continue
 
         if constraint_problem.is_consistently_assigned():
-            for solution_assignment in __heuristic_backtrack(constraint_problem, primary_select_unassigned_vars,
+            for solution_assignment in __heuristic_backtrack(constraint_problem, context,
+                                                             primary_select_unassigned_vars,
                                                              secondary_select_unassigned_vars, sort_domain, inference,
-                                                             find_all_solutions, with_history):
+                                                             find_all_solutions):
                 yield solution_assignment
+        elif context.events is not None:
+            context.conflicted(selected_variable)
 
         selected_variable.unassign()
-        if with_history:
-            __actions_history.append((selected_variable, None))
+        if context.is_tracking:
+            context.unassigned(selected_variable)
 
 
 def forward_checking_backtracking_search(constraint_problem: ConstraintProblem, find_all_solutions: bool = False,
-                                         with_history: bool = False) \
-        -> Union[None, Deque[Tuple[Variable, Any]], Iterator[Dict[Variable, Any]]]:
+                                         with_history: bool = False, statistics: Optional[SolverStatistics] = None,
+                                         events: Optional[SearchEvents] = None,
+                                         history: Optional[ActionsSink] = None,
+                                         budget: Optional[SearchBudget] = None) \
+        -> Union[None, ActionsSink, Iterator[Dict[Variable, Any]]]:
     """ Optimized backtracking with forward checking. Instead of implementing forward checking as an Inference,
         It is written here directly.
         Advantage: saves the need to make a function call for forward checking, thus increasing performance.
         Disadvantage: violates DRY, makes the code less modular which might proof harder to maintain. """
 
-    __actions_history.clear()
-    if find_all_solutions and with_history:
-        with_history = False
+    context = __get_search_context(find_all_solutions, with_history, statistics, events, history, budget)
+    searched_problem = context.get_searched_problem(constraint_problem)
+    solutions = __forward_checking_backtrack(searched_problem, context, find_all_solutions)
+    return __run_search(constraint_problem, solutions, find_all_solutions, context)
 
-    if not find_all_solutions:
-        next(__forward_checking_backtrack(constraint_problem, find_all_solutions, with_history))
-        if with_history:
-            return __actions_history
-        return
-
-    return __forward_checking_backtrack(constraint_problem, find_all_solutions, with_history)
 
-
-def __forward_checking_backtrack(constraint_problem: ConstraintProblem, find_all_solutions: bool = False,
-                                 with_history: bool = False) -> Optional[Dict[Variable, Any]]:
+def __forward_checking_backtrack(constraint_problem: ConstraintProblem, context: SearchContext,
+                                 find_all_solutions: bool = False) -> Optional[Dict[Variable, Any]]:
     variable, *_ = constraint_problem.get_unassigned_variables()
     for value in variable.domain:
         variable.assign(value)
-        if with_history:
-            __actions_history.append((variable, value))
+        if context.is_tracking:
+            context.assigned(variable, value)
 
         unassigned_neighbors_frozenset = constraint_problem.get_unassigned_neighbors(variable)
         unsatisfiable_neighbors = filter(lambda unassigned_neighbor:
                                          not constraint_problem.get_consistent_domain(unassigned_neighbor),
                                          unassigned_neighbors_frozenset)
         if any(unsatisfiable_neighbors):
+            if context.events is not None:
+                context.conflicted(variable)
             variable.unassign()
-            if with_history:
-                __actions_history.append((variable, None))
+            if context.is_tracking:
+                context.unassigned(variable)
             continue
 
         if constraint_problem.is_completely_assigned():
             if constraint_problem.is_consistently_assigned():
+                if context.events is not None:
+                    context.events.emit(SearchEvents.SOLUTION, constraint_problem.get_current_assignment())
                 if find_all_solutions:
                     yield constraint_problem.get_current_assignment()
                 else:
                     yield None
+            elif context.events is not None:
+                context.conflicted(variable)
 
             variable.unassign()
-            if with_history:
-                __actions_history.append((variable, None))
+            if context.is_tracking:
+                context.unassigned(variable)
             continue
 
         if constraint_problem.is_consistently_assigned():
-            for solution_assignment in __forward_checking_backtrack(constraint_problem, find_all_solutions,
-                                                                    with_history):
+            for solution_assignment in __forward_checking_backtrack(constraint_problem, context, find_all_solutions):
                 yield solution_assignment
+        elif context.events is not None:
+            context.conflicted(variable)
 
         variable.unassign()
-        if with_history:
-            __actions_history.append((variable, None))
+        if context.is_tracking:
+            context.unassigned(variable)
 
 
 def optimized_heuristic_backtracking_search(constraint_problem: ConstraintProblem,
-                                            find_all_solutions: bool = False, with_history: bool = False) \
-        -> Union[None, Deque[Tuple[Variable, Any]], Iterator[Dict[Variable, Any]]]:
+                                            find_all_solutions: bool = False, with_history: bool = False,
+                                            statistics: Optional[SolverStatistics] = None,
+                                            events: Optional[SearchEvents] = None,
+                                            history: Optional[ActionsSink] = None,
+                                            budget: Optional[SearchBudget] = None) \
+        -> Union[None, ActionsSink, Iterator[Dict[Variable, Any]]]:
     """ Optimized heuristic_backtracking_search. Instead of implementing Minimum Remaining Values, Degree Heuristic,
         and Least Constraining Value as functions, they are written here directly.
         Minimum Remaining Values as a primary selector, Degree Heuristic as a secondary selector.
@@ -210,21 +225,14 @@ def optimized_heuristic_backtracking_search(constraint_problem: ConstraintProble
         Disadvantage: makes the code less modular which might proof harder to maintain, doesn't allow users to
                       implement their own heuristics, or change the order of existing heuristics.
                       Does not allow for inferences. """
-    __actions_history.clear()
-    if find_all_solutions and with_history:
-        with_history = False
-
-    if not find_all_solutions:
-        next(__optimized_heuristic_backtrack(constraint_problem, find_all_solutions, with_history))
-        if with_history:
-            return __actions_history
-        return
-
-    return __optimized_heuristic_backtrack(constraint_problem, find_all_solutions, with_history)
+    context = __get_search_context(find_all_solutions, with_history, statistics, events, history, budget)
+    searched_problem = context.get_searched_problem(constraint_problem)
+    solutions = __optimized_heuristic_backtrack(searched_problem, context, find_all_solutions)
+    return __run_search(constraint_problem, solutions, find_all_solutions, context)
 
 
-def __optimized_heuristic_backtrack(constraint_problem: ConstraintProblem, find_all_solutions: bool = False,
-                                    with_history: bool = False):
+def __optimized_heuristic_backtrack(constraint_problem: ConstraintProblem, context: SearchContext,
+                                    find_all_solutions: bool = False):
     unassigned_variables = constraint_problem.get_unassigned_variables()
     min_variable = min(unassigned_variables, key=lambda var: len(constraint_problem.get_consistent_domain(var)))
     min_remaining_values = len(constraint_problem.get_consistent_domain(min_variable))
@@ -251,66 +259,269 @@ def __optimized_heuristic_backtrack(constraint_problem: ConstraintProblem, find_
 
     for value in sorted_domain:
         selected_variable.assign(value)
-        if with_history:
-            __actions_history.append((selected_variable, value))
+        if context.is_tracking:
+            context.assigned(selected_variable, value)
 
         if constraint_problem.is_completely_assigned():
             if constraint_problem.is_consistently_assigned():
+                if context.events is not None:
+                    context.events.emit(SearchEvents.SOLUTION, constraint_problem.get_current_assignment())
                 if find_all_solutions:
                     yield constraint_problem.get_current_assignment()
                 else:
                     yield None
+            elif context.events is not None:
+                context.conflicted(selected_variable)
 
             selected_variable.unassign()
-            if with_history:
-                __actions_history.append((selected_variable, None))
+            if context.is_tracking:
+                context.unassigned(selected_variable)
             continue
 
         if constraint_problem.is_consistently_assigned():
-            for solution_assignment in __optimized_heuristic_backtrack(constraint_problem, find_all_solutions,
-                                                                       with_history):
+            for solution_assignment in __optimized_heuristic_backtrack(constraint_problem, context,
+                                                                       find_all_solutions):
                 yield solution_assignment
+        elif context.events is not None:
+            context.conflicted(selected_variable)
 
         selected_variable.unassign()
-        if with_history:
-            __actions_history.append((selected_variable, None))
+        if context.is_tracking:
+            context.unassigned(selected_variable)
+
+
+def mac_backtracking_search(constraint_problem: ConstraintProblem, find_all_solutions: bool = False,
+                            with_history: bool = False, statistics: Optional[SolverStatistics] = None,
+                            events: Optional[SearchEvents] = None, history: Optional[ActionsSink] = None,
+                            budget: Optional[SearchBudget] = None) \
+        -> Union[None, ActionsSink, Iterator[Dict[Variable, Any]]]:
+    """ Backtracking which Maintains Arc Consistency (MAC). After each assignment, arc consistency is propagated
+        from the assigned variable only, and every value it prunes is recorded on a trail. On backtrack, the values
+        pruned since the assignment are put back, so later branches (and find_all_solutions) see the original
+        domains. Variables are selected by Minimum Remaining Values over the pruned domains, with Degree Heuristic as
+        a secondary selector. When the search ends, all of the domains are restored. """
+    context = __get_search_context(find_all_solutions, with_history, statistics, events, history, budget)
+    searched_problem = context.get_searched_problem(constraint_problem)
+    solutions = __mac_search(searched_problem, context, find_all_solutions)
+    return __run_search(constraint_problem, solutions, find_all_solutions, context)
+
+
+def __mac_search(constraint_problem: ConstraintProblem, context: SearchContext, find_all_solutions: bool) \
+        -> Iterator[Optional[Dict[Variable, Any]]]:
+    trail = list()
+    try:
+        arcs = deque((variable, neighbor) for variable in constraint_problem.get_unassigned_variables()
+                     for neighbor in constraint_problem.get_neighbors(variable))
+        if context.statistics is not None:
+            context.statistics.queue_pushes += len(arcs)
+        if __propagate_arc_consistency(constraint_problem, context, arcs, trail):
+            for solution_assignment in __mac_backtrack(constraint_problem, context, trail, find_all_solutions):
+                yield solution_assignment
+    finally:
+        __undo_prunings(trail, 0)
+
+
+def __mac_backtrack(constraint_problem: ConstraintProblem, context: SearchContext, trail: List[Tuple[Variable, Any]],
+                    find_all_solutions: bool) -> Iterator[Optional[Dict[Variable, Any]]]:
+    unassigned_variables = constraint_problem.get_unassigned_variables()
+    min_remaining_values = min(variable.domain_size for variable in unassigned_variables)
+    min_variables = [variable for variable in unassigned_variables if variable.domain_size == min_remaining_values]
+    selected_variable = max(min_variables, key=lambda var: len(constraint_problem.get_unassigned_neighbors(var)))
+
+    for value in selected_variable.domain:
+        selected_variable.assign(value)
+        if context.is_tracking:
+            context.assigned(selected_variable, value)
+        trail_length = len(trail)
+
+        variable_constraints = constraint_problem.get_constraints_containing_variable(selected_variable)
+        arcs = deque((unassigned_neighbor, selected_variable) for unassigned_neighbor in
+                     constraint_problem.get_unassigned_neighbors(selected_variable))
+        if context.statistics is not None:
+            context.statistics.queue_pushes += len(arcs)
+        if all(constraint.is_consistent() for constraint in variable_constraints) and \
+                __propagate_arc_consistency(constraint_problem, context, arcs, trail):
+            if constraint_problem.is_completely_assigned():
+                if constraint_problem.is_consistently_assigned():
+                    if context.events is not None:
+                        context.events.emit(SearchEvents.SOLUTION, constraint_problem.get_current_assignment())
+                    if find_all_solutions:
+                        yield constraint_problem.get_current_assignment()
+                    else:
+                        yield None
+            else:
+                for solution_assignment in __mac_backtrack(constraint_problem, context, trail, find_all_solutions):
+                    yield solution_assignment
+        elif context.events is not None:
+            context.conflicted(selected_variable)
+
+        __undo_prunings(trail, trail_length)
+        selected_variable.unassign()
+        if context.is_tracking:
+            context.unassigned(selected_variable)
+
+
+def __propagate_arc_consistency(constraint_problem: ConstraintProblem, context: SearchContext,
+                                arcs: Deque[Tuple[Variable, Variable]], trail: List[Tuple[Variable, Any]]) -> bool:
+    """ AC-3 over the given arcs, whose first variables are unassigned. Pruned values are appended to trail. """
+    current_assignment = constraint_problem.get_current_assignment()
+    queued_arcs = set(arcs)
+    while arcs:
+        arc = arcs.popleft()
+        queued_arcs.discard(arc)
+        variable, neighbor = arc
+        if __revise_arc(constraint_problem, context, variable, neighbor, current_assignment, trail):
+            if not variable.domain_size:
+                return False
+            for other_neighbor in constraint_problem.get_unassigned_neighbors(variable):
+                other_arc = (other_neighbor, variable)
+                if other_neighbor is not neighbor and other_arc not in queued_arcs:
+                    queued_arcs.add(other_arc)
+                    arcs.append(other_arc)
+                    if context.statistics is not None:
+                        context.statistics.queue_pushes += 1
+    return True
+
+
+def __revise_arc(constraint_problem: ConstraintProblem, context: SearchContext, variable: Variable, neighbor: Variable,
+                 current_assignment: Dict[Variable, Any], trail: List[Tuple[Variable, Any]]) -> bool:
+    shared_constraints = constraint_problem.get_constraints_containing_variable(variable) & \
+        constraint_problem.get_constraints_containing_variable(neighbor)
+    neighbor_values = (neighbor.value,) if neighbor else neighbor.domain
+    revised = False
+    for value in variable.domain:
+        current_assignment[variable] = value
+        for neighbor_value in neighbor_values:
+            current_assignment[neighbor] = neighbor_value
+            if all(constraint.is_consistent_with(current_assignment) for constraint in shared_constraints):
+                break
+        else:
+            variable.remove_from_domain(value)
+            trail.append((variable, value))
+            revised = True
+            if context.is_tracking:
+                context.pruned(variable, value)
+    current_assignment[variable], current_assignment[neighbor] = None, neighbor.value
+    return revised
+
+
+def __undo_prunings(trail: List[Tuple[Variable, Any]], trail_length: int) -> None:
+    while trail_length < len(trail):
+        variable, value = trail.pop()
+        variable.add_to_domain(value)
+
+
+def __get_search_context(find_all_solutions: bool, with_history: bool, statistics: Optional[SolverStatistics],
+                         events: Optional[SearchEvents], history: Optional[ActionsSink],
+                         budget: Optional[SearchBudget]) -> SearchContext:
+    """ Actions are recorded to history if given. Otherwise, they are recorded to a new deque if with_history, unless
+        find_all_solutions (whose solutions are returned instead). """
+    return SearchContext(get_actions_sink(with_history and not find_all_solutions, history), statistics, events,
+                         budget)
+
+
+def __run_search(constraint_problem: ConstraintProblem, solutions: Iterator[Optional[Dict[Variable, Any]]],
+                 find_all_solutions: bool, context: SearchContext) \
+        -> Union[None, ActionsSink, Iterator[Dict[Variable, Any]]]:
+    """ Runs solutions until the first solution, or returns it if find_all_solutions. With statistics or events,
+        solutions runs within the "search" phase (see __observe_search). With a budget, solutions stops once it is
+        exhausted (see __search_within_budget). """
+    if context.budget is not None:
+        solutions = __search_within_budget(constraint_problem, solutions, context.budget)
+    if context.statistics is not None or context.events is not None:
+        solutions = __observe_search(constraint_problem, solutions, context)
+    if not find_all_solutions:
+        next(solutions, None)
+        solutions.close()
+        return context.actions_history
+
+    return solutions
+
+
+def __search_within_budget(constraint_problem: ConstraintProblem, solutions: Iterator[Optional[Dict[Variable, Any]]],
+                           budget: SearchBudget) -> Iterator[Optional[Dict[Variable, Any]]]:
+    """ Reports the search's outcome on budget. If the budget is exhausted before any solution is found, the search's
+        best (largest consistent partial) assignment is left assigned. If it is exhausted while searching for all of the
+        solutions, after some were found, the assignment the search started from is restored. """
+    budget.start(constraint_problem)
+    first_solution = None
+    try:
+        for solution_assignment in solutions:
+            if first_solution is None:
+                first_solution = constraint_problem.get_current_assignment()
+                budget.report(SearchBudget.SOLVED, first_solution)
+            yield solution_assignment
+    except BudgetExhaustedError:
+        constraint_problem.unassign_all_variables()
+        if first_solution is None:
+            constraint_problem.assign_variables_from_assignment(budget.get_best_assignment())
+            budget.report(SearchBudget.TIMED_OUT, budget.get_best_assignment())
+        else:
+            constraint_problem.assign_variables_from_assignment(budget.get_start_assignment())
+            budget.report(SearchBudget.SOLVED, first_solution)
+        return
+    if first_solution is None:
+        budget.report(SearchBudget.INFEASIBLE, constraint_problem.get_current_assignment())
+
+
+def __observe_search(constraint_problem: ConstraintProblem, solutions: Iterator[Optional[Dict[Variable, Any]]],
+                     context: SearchContext) -> Iterator[Optional[Dict[Variable, Any]]]:
+    with context.observing("search"):
+        for solution_assignment in solutions:
+            yield solution_assignment
+
+
+def __classic_solutions(classic_backtrack: Callable[[], bool]) -> Iterator[None]:
+    """ Adapts a classic backtrack, which returns whether it found a solution, to the solutions iterator __run_search
+        runs. """
+    if classic_backtrack():
+        yield None
 
 
 def classic_backtracking_search(constraint_problem: ConstraintProblem, inference: Optional[Inference] = None,
-                                with_history: bool = False) -> Optional[Deque[Tuple[Variable, Any]]]:
+                                with_history: bool = False, statistics: Optional[SolverStatistics] = None,
+                                events: Optional[SearchEvents] = None, history: Optional[ActionsSink] = None,
+                                budget: Optional[SearchBudget] = None) \
+        -> Optional[ActionsSink]:
     """ Backtracking which finds a single solution and quits. """
-    __actions_history.clear()
-    __classic_backtrack(constraint_problem, inference, with_history)
-    if with_history:
-        return __actions_history
+    context = __get_search_context(False, with_history, statistics, events, history, budget)
+    searched_problem = context.get_searched_problem(constraint_problem)
+    solutions = __classic_solutions(lambda: __classic_backtrack(searched_problem, context, inference))
+    return __run_search(constraint_problem, solutions, False, context)
 
 
-def __classic_backtrack(constraint_problem: ConstraintProblem, inference: Optional[Inference] = None,
-                        with_history: bool = False) -> bool:
+def __classic_backtrack(constraint_problem: ConstraintProblem, context: SearchContext,
+                        inference: Optional[Inference] = None) -> bool:
     if constraint_problem.is_completely_assigned():
         if constraint_problem.is_consistently_assigned():
+            if context.events is not None:
+                context.events.emit(SearchEvents.SOLUTION, constraint_problem.get_current_assignment())
             return True
+        if context.events is not None:
+            context.conflicted(None)
         return False
 
     selected_variable, *_ = constraint_problem.get_unassigned_variables()
 
     for value in selected_variable.domain:
         selected_variable.assign(value)
-        if with_history:
-            __actions_history.append((selected_variable, value))
+        if context.is_tracking:
+            context.assigned(selected_variable, value)
 
         if inference is not None and not inference(constraint_problem, selected_variable):
+            if context.events is not None:
+                context.conflicted(selected_variable)
             selected_variable.unassign()
-            if with_history:
-                __actions_history.append((selected_variable, None))
+            if context.is_tracking:
+                context.unassigned(selected_variable)
             return False
 
-        if __classic_backtrack(constraint_problem, inference, with_history):
+        if __classic_backtrack(constraint_problem, context, inference):
             return True
 
         selected_variable.unassign()
-        if with_history:
-            __actions_history.append((selected_variable, None))
+        if context.is_tracking:
+            context.unassigned(selected_variable)
 
     return False
 
@@ -322,24 +533,34 @@ def classic_heuristic_backtracking_search(constraint_problem: ConstraintProblem,
                                           degree_heuristic,
                                           sort_domain: SortDomain = least_constraining_value,
                                           inference: Optional[Inference] = None,
-                                          with_history: bool = False) -> Optional[Deque[Tuple[Variable, Any]]]:
+                                          with_history: bool = False,
+                                          statistics: Optional[SolverStatistics] = None,
+                                          events: Optional[SearchEvents] = None,
+                                          history: Optional[ActionsSink] = None,
+                                          budget: Optional[SearchBudget] = None) \
+        -> Optional[ActionsSink]:
     """ Heuristic Backtracking which finds a single solution and quits. """
-    __actions_history.clear()
-    __classic_heuristic_backtrack(constraint_problem, primary_select_unassigned_vars,
-                                  secondary_select_unassigned_vars, sort_domain, inference, with_history)
-    if with_history:
-        return __actions_history
+    context = __get_search_context(False, with_history, statistics, events, history, budget)
+    searched_problem = context.get_searched_problem(constraint_problem)
+    solutions = __classic_solutions(lambda: __classic_heuristic_backtrack(searched_problem, context,
+                                                                          primary_select_unassigned_vars,
+                                                                          secondary_select_unassigned_vars,
+                                                                          sort_domain, inference))
+    return __run_search(constraint_problem, solutions, False, context)
 
 
-def __classic_heuristic_backtrack(constraint_problem: ConstraintProblem,
+def __classic_heuristic_backtrack(constraint_problem: ConstraintProblem, context: SearchContext,
                                   primary_select_unassigned_vars: SelectUnassignedVariables = minimum_remaining_values,
                                   secondary_select_unassigned_vars: SelectUnassignedVariables = degree_heuristic,
                                   sort_domain: SortDomain = least_constraining_value,
-                                  inference: Optional[Inference] = None,
-                                  with_history: bool = False) -> bool:
+                                  inference: Optional[Inference] = None) -> bool:
     if constraint_problem.is_completely_assigned():
         if constraint_problem.is_consistently_assigned():
+            if context.events is not None:
+                context.events.emit(SearchEvents.SOLUTION, constraint_problem.get_current_assignment())
             return True
+        if context.events is not None:
+            context.conflicted(None)
         return False
 
     selected_unassigned_vars = primary_select_unassigned_vars(constraint_problem, None)
@@ -350,21 +571,23 @@ def __classic_heuristic_backtrack(constraint_problem: ConstraintProblem,
     sorted_domain = sort_domain(constraint_problem, selected_variable)
     for value in sorted_domain:
         selected_variable.assign(value)
-        if with_history:
-            __actions_history.append((selected_variable, value))
+        if context.is_tracking:
+            context.assigned(selected_variable, value)
 
         if inference is not None and not inference(constraint_problem, selected_variable):
+            if context.events is not None:
+                context.conflicted(selected_variable)
             selected_variable.unassign()
-            if with_history:
-                __actions_history.append((selected_variable, None))
+            if context.is_tracking:
+                context.unassigned(selected_variable)
             return False
 
-        if __classic_heuristic_backtrack(constraint_problem, primary_select_unassigned_vars,
-                                         secondary_select_unassigned_vars, sort_domain, inference, with_history):
+        if __classic_heuristic_backtrack(constraint_problem, context, primary_select_unassigned_vars,
+                                         secondary_select_unassigned_vars, sort_domain, inference):
             return True
 
         selected_variable.unassign()
-        if with_history:
-            __actions_history.append((selected_variable, None))
+        if context.is_tracking:
+            context.unassigned(selected_variable)
 
     return False
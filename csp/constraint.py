@@ -1,4 +1,5 @@
-from typing import Callable, Iterable, Tuple, Any
+from typing import Callable, Iterable, Tuple, Any, Dict, Set, Optional
+from copy import copy
 from operator import attrgetter
 from csp.variable import Variable
 
@@ -21,7 +22,7 @@ class Constraint:
             self.__variables = tuple(self.__variables)
 
         self.__evaluate_constraint = evaluate_constraint
-        self.__i_consistent_assignments = set()
+        self.__i_consistent_assignments = dict()
         if len(self.__variables) == 1:
             self.__enforce_unary_constraint()
 
@@ -34,6 +35,11 @@ class Constraint:
 
     variables = property(__get_variables)
 
+    def __get_evaluate_constraint(self) -> ConstraintEvaluator:
+        return self.__evaluate_constraint
+
+    evaluate_constraint = property(__get_evaluate_constraint)
+
     @classmethod
     def from_domains(cls, evaluate_constraint: ConstraintEvaluator, *domains) -> Any:
         variables = list()
@@ -50,19 +56,33 @@ class Constraint:
         return cls(variables, evaluate_constraint)
 
     def __bool__(self) -> bool:
-        if self.__i_consistent_assignments:
-            return all(self.__variables) and self.is_consistent() and self.__is_i_consistent_assignment()
         return all(self.__variables) and self.is_consistent()
 
     __value_getter = attrgetter("value")
 
     def is_consistent(self) -> bool:
-        all_values = map(Constraint.__value_getter, self.__variables)
+        all_values = tuple(map(Constraint.__value_getter, self.__variables))
         values_of_assigned_variables = tuple(filter(None.__ne__, all_values))
         if self.__i_consistent_assignments:
-            return self.__evaluate_constraint(values_of_assigned_variables) and self.__is_i_consistent_assignment()
+            return self.__evaluate_constraint(values_of_assigned_variables) and \
+                self.__is_i_consistent_values(all_values)
         return self.__evaluate_constraint(values_of_assigned_variables)
 
+    def is_consistent_with(self, assignment: Dict[Variable, Any]) -> bool:
+        """ Like is_consistent, but evaluates the values assignment maps the constraint's variables to, without
+            reading or changing the variables' state. Variables missing from assignment are considered unassigned. """
+        all_values = tuple(map(assignment.get, self.__variables))
+        values = tuple(value for value in all_values if value is not None)
+        if self.__i_consistent_assignments:
+            return self.__evaluate_constraint(values) and self.__is_i_consistent_values(all_values)
+        return self.__evaluate_constraint(values)
+
+    def is_satisfied_by(self, assignment: Dict[Variable, Any]) -> bool:
+        """ Like bool(constraint), but for the values assignment maps the constraint's variables to. """
+        if any(assignment.get(variable) is None for variable in self.__variables):
+            return False
+        return self.is_consistent_with(assignment)
+
     def get_consistent_domain_values(self, variable: Variable) -> set:
         if variable not in self.__variables:
             raise UncontainedVariableError(self, variable)
@@ -80,19 +100,42 @@ class Constraint:
             variable.assign(original_value)
         return consistent_domain
 
-    def update_i_consistent_assignments(self, i_consistent_assignments: set) -> None:
-        if not i_consistent_assignments:
-            self.__i_consistent_assignments.add(frozenset())
-        for assignment in i_consistent_assignments:
-            self.__i_consistent_assignments.add(frozenset(assignment))
-
-    def __is_i_consistent_assignment(self) -> bool:
-        all_values = map(Constraint.__value_getter, self.__variables)
-        current_assignment = set(filter(None.__ne__, all_values))
-        for assignment in self.__i_consistent_assignments:
-            if assignment.issubset(current_assignment):
-                return True
-        return False
+    def update_i_consistent_assignments(self, i_consistent_assignments: Set[tuple],
+                                        variables: Optional[Iterable[Variable]] = None) -> None:
+        """ Restricts the values variables (by default, all of the constraint's variables) may be assigned with
+            together to i_consistent_assignments, whose tuples hold the values in variables' order. The assignments
+            are indexed by the variables' positions in the constraint, so each check is a set lookup. """
+        if variables is None:
+            positions = tuple(range(len(self.__variables)))
+        else:
+            positions = tuple(map(self.__variables.index, variables))
+        i_consistent_assignments = set(i_consistent_assignments)
+        if positions in self.__i_consistent_assignments:
+            i_consistent_assignments &= self.__i_consistent_assignments[positions]
+        self.__i_consistent_assignments[positions] = i_consistent_assignments
+
+    def instance(self, variables_instances: Dict[Variable, Variable],
+                 evaluate_constraint: Optional[ConstraintEvaluator] = None) -> "Constraint":
+        """ Returns the same constraint over variables_instances' instances of the constraint's variables. The
+            evaluator and the i-consistent assignments are shared, not copied (update_i_consistent_assignments replaces
+            the sets rather than changing them, so updating either constraint doesn't affect the other). If
+            evaluate_constraint is given, the instance evaluates with it instead (e.g. with a wrapper of the evaluator
+            which counts its calls). """
+        constraint = copy(self)
+        constraint.__variables = tuple(map(variables_instances.__getitem__, self.__variables))
+        if evaluate_constraint is not None:
+            constraint.__evaluate_constraint = evaluate_constraint
+        constraint.__i_consistent_assignments = dict(self.__i_consistent_assignments)
+        return constraint
+
+    def __is_i_consistent_values(self, all_values: tuple) -> bool:
+        """ all_values holds the value of each of the constraint's variables, None for unassigned ones. Only the
+            assignments whose variables are all assigned are checked. """
+        for positions, i_consistent_assignments in self.__i_consistent_assignments.items():
+            values = tuple(all_values[position] for position in positions)
+            if None not in values and values not in i_consistent_assignments:
+                return False
+        return True
 
     def __str__(self) -> str:
         state = "\n  constraint is completely assigned: " + str(all(self.__variables)) + \
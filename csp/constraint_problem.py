@@ -1,5 +1,5 @@
 from itertools import filterfalse
-from typing import DefaultDict, Set, FrozenSet, Dict, Any, Iterable, Optional, Deque, Tuple
+from typing import DefaultDict, Set, FrozenSet, Dict, Any, Iterable, Optional, Deque, Tuple, Callable
 from collections import defaultdict
 from operator import methodcaller
 from random import choice
@@ -30,11 +30,17 @@ class ConstraintProblem:
     def is_completely_assigned(self) -> bool:
         return all(self.__variables_to_constraints_map.keys())
 
-    def is_consistently_assigned(self) -> bool:
+    def is_consistently_assigned(self, assignment: Optional[Dict[Variable, Any]] = None) -> bool:
+        """ If assignment is given, it is evaluated instead of the variables' current values, and the variables' state
+            is neither read nor changed. The same goes for the other methods which accept an assignment. """
+        if assignment is not None:
+            return all(constraint.is_consistent_with(assignment) for constraint in self.__constraints)
         is_consistent_results = map(ConstraintProblem.__is_consistent_method_caller, self.__constraints)
         return all(is_consistent_results)
 
-    def is_completely_consistently_assigned(self) -> bool:
+    def is_completely_consistently_assigned(self, assignment: Optional[Dict[Variable, Any]] = None) -> bool:
+        if assignment is not None:
+            return all(constraint.is_satisfied_by(assignment) for constraint in self.__constraints)
         return all(self.__constraints)
 
     def get_variables(self) -> FrozenSet[Variable]:
@@ -62,19 +68,28 @@ class ConstraintProblem:
     def get_constraints(self) -> FrozenSet[Constraint]:
         return self.__constraints
 
-    def get_consistent_constraints(self) -> FrozenSet[Constraint]:
+    def get_consistent_constraints(self, assignment: Optional[Dict[Variable, Any]] = None) -> FrozenSet[Constraint]:
+        if assignment is not None:
+            return frozenset(filter(methodcaller("is_consistent_with", assignment), self.__constraints))
         consistent_constraints = filter(ConstraintProblem.__is_consistent_method_caller, self.__constraints)
         return frozenset(consistent_constraints)
 
-    def get_inconsistent_constraints(self) -> FrozenSet[Constraint]:
+    def get_inconsistent_constraints(self, assignment: Optional[Dict[Variable, Any]] = None) \
+            -> FrozenSet[Constraint]:
+        if assignment is not None:
+            return frozenset(filterfalse(methodcaller("is_consistent_with", assignment), self.__constraints))
         inconsistent_constraints = filterfalse(ConstraintProblem.__is_consistent_method_caller, self.__constraints)
         return frozenset(inconsistent_constraints)
 
-    def get_satisfied_constraints(self) -> FrozenSet[Constraint]:
+    def get_satisfied_constraints(self, assignment: Optional[Dict[Variable, Any]] = None) -> FrozenSet[Constraint]:
+        if assignment is not None:
+            return frozenset(filter(methodcaller("is_satisfied_by", assignment), self.__constraints))
         satisfied_constraints = filter(None, self.__constraints)
         return frozenset(satisfied_constraints)
 
-    def get_unsatisfied_constraints(self) -> FrozenSet[Constraint]:
+    def get_unsatisfied_constraints(self, assignment: Optional[Dict[Variable, Any]] = None) -> FrozenSet[Constraint]:
+        if assignment is not None:
+            return frozenset(filterfalse(methodcaller("is_satisfied_by", assignment), self.__constraints))
         unsatisfied_constraints = filterfalse(None, self.__constraints)
         return frozenset(unsatisfied_constraints)
 
@@ -119,6 +134,53 @@ class ConstraintProblem:
     def get_constraint_graph_as_adjacency_list(self) -> DefaultDict[Variable, Set[Variable]]:
         return self.__constraint_graph
 
+    def instance(self) -> "ConstraintProblem":
+        """ Returns a problem of the same constraints over new instances of the variables (see Variable.instance and
+            Constraint.instance), for solving the same model many times, possibly at the same time, without
+            deepcopying it. The evaluators and the i-consistent assignments are shared. The variables' domains and
+            values are not, so the instance may be solved (and its domains reduced) independently of this problem. The
+            instance's name_to_variable_map maps the names to the instance's variables. The constraint graph is keyed
+            by the variables, so the instance gets its own, remapped to its variables. """
+        variables_instances = {variable: variable.instance() for variable in self.__variables_to_constraints_map}
+        return self.__instance(lambda constraint: constraint.instance(variables_instances), variables_instances)
+
+    def constraints_instance(self, instantiate_constraint: Callable[[Constraint], Constraint]) -> "ConstraintProblem":
+        """ Returns a problem over the same variables, whose constraints are instantiate_constraint's instances of
+            this problem's constraints (e.g. instances which count their checks, see
+            SolverStatistics.get_counting_problem). The variables are kept in the same order, so solvers search the
+            returned problem in the same order they search this one. The constraint graph and name_to_variable_map
+            are shared with this problem, not copied. """
+        return self.__instance(instantiate_constraint)
+
+    def __instance(self, instantiate_constraint: Callable[[Constraint], Constraint],
+                   variables_instances: Optional[Dict[Variable, Variable]] = None) -> "ConstraintProblem":
+        """ Without variables_instances, the instance is of the same variables, and shares the read-only structure
+            over them. add_constraint replaces the structure rather than changing it, so it stays shareable. """
+        constraints_instances = {constraint: instantiate_constraint(constraint) for constraint in self.__constraints}
+        constraint_problem = self.__class__.__new__(self.__class__)
+        constraint_problem.__constraints = frozenset(constraints_instances.values())
+        constraint_problem.__variables_to_constraints_map = defaultdict(set)
+        if variables_instances is None:
+            for variable, constraints in self.__variables_to_constraints_map.items():
+                constraint_problem.__variables_to_constraints_map[variable] = \
+                    {constraints_instances[constraint] for constraint in constraints}
+            constraint_problem.__constraint_graph = self.__constraint_graph
+            constraint_problem.__name_to_variable_map = self.__name_to_variable_map
+            return constraint_problem
+
+        for variable, constraints in self.__variables_to_constraints_map.items():
+            constraint_problem.__variables_to_constraints_map[variables_instances[variable]] = \
+                {constraints_instances[constraint] for constraint in constraints}
+        constraint_problem.__constraint_graph = defaultdict(set)
+        for variable, neighbors in self.__constraint_graph.items():
+            constraint_problem.__constraint_graph[variables_instances[variable]] = \
+                {variables_instances[neighbor] for neighbor in neighbors}
+        constraint_problem.__name_to_variable_map = None
+        if self.__name_to_variable_map is not None:
+            constraint_problem.__name_to_variable_map = {name: variables_instances[variable]
+                                                         for name, variable in self.__name_to_variable_map.items()}
+        return constraint_problem
+
     def add_constraint(self, constraint: Constraint) -> None:
         new_constraints = self.__constraints | {constraint}
         self.__variables_to_constraints_map = _build_variables_to_constraints_mapping(new_constraints)
@@ -1,69 +1,195 @@
-from typing import Dict, Any, Tuple, Deque, FrozenSet, Optional
-from collections import deque
-from itertools import filterfalse
+from contextlib import ExitStack
+from typing import Dict, Any, Tuple, FrozenSet, Optional, Set
 from csp.constraint import Constraint
 from csp.variable import Variable
 from csp.constraint_problem import ConstraintProblem
+from csp.action_history import ActionsSink, get_actions_sink
+from csp.search_budget import SearchBudget
+from csp.solver_statistics import SolverStatistics
+from csp.search_events import SearchEvents
 
 
-def constraints_weighting(constraint_problem: ConstraintProblem, max_tries: int, with_history: bool = False) \
-        -> Optional[Deque[Tuple[Variable, Any]]]:
-    actions_history = None
-    if with_history:
-        actions_history = deque()
+# ///////////////////////////////////////// constraints weighting (breakout) //////////////////////////////////////
+# each constraint has a weight, initially 1. the cost of an assignment is the sum of the weights of its unsatisfied
+# constraints. every step assigns the (variable, value) pair which reduces the cost the most, then increases the
+# weights of the constraints which are still unsatisfied by 1, so the search breaks out of local minima.
+#
+# instead of re-computing the cost of every (variable, value) pair each step, two tables are maintained:
+# 1. violating_values[(constraint, variable)]: the values of variable which would leave constraint unsatisfied,
+#    given the current values of constraint's other variables.
+# 2. penalties[variable][value]: the sum of the weights of the constraints for which value is a violating value.
+# the cost reduction of assigning variable with value is:
+# penalties[variable][variable.value] - penalties[variable][value].
+# assigning a variable only changes the violating values of its neighbors within the constraints they share, and
+# increasing a constraint's weight only changes the penalties of its own violating values.
+# /////////////////////////////////////////////////////////////////////////////////////////////////////////////////
+
+
+def constraints_weighting(constraint_problem: ConstraintProblem, max_tries: int, with_history: bool = False,
+                          statistics: Optional[SolverStatistics] = None, events: Optional[SearchEvents] = None,
+                          history: Optional[ActionsSink] = None,
+                          budget: Optional[SearchBudget] = None) -> Optional[ActionsSink]:
+    actions_history = get_actions_sink(with_history, history)
+    if budget is not None:
+        budget.start(constraint_problem)
+    with ExitStack() as phase_stack:
+        searched_problem = constraint_problem
+        if statistics is not None:
+            searched_problem = statistics.get_counting_problem(constraint_problem)
+            phase_stack.enter_context(statistics.phase("constraints_weighting"))
+        if events is not None:
+            phase_stack.enter_context(events.phase("constraints_weighting"))
+        __constraints_weighting(searched_problem, max_tries, actions_history, statistics, events, budget)
+    if budget is not None:
+        budget.report_assignment(constraint_problem)
+    return actions_history
+
+
+def __constraints_weighting(constraint_problem: ConstraintProblem, max_tries: int,
+                            actions_history: Optional[ActionsSink], statistics: Optional[SolverStatistics],
+                            events: Optional[SearchEvents], budget: Optional[SearchBudget]) -> None:
+    """ Leaves a solution assigned to constraint_problem if one is found, and otherwise the assignment with the fewest
+        unsatisfied constraints of all the steps of all the tries. """
     constraints_weights = {constraint: 1 for constraint in constraint_problem.get_constraints()}
     read_only_variables = constraint_problem.get_assigned_variables()
+    best_unsatisfied_amount, best_assignment = float("inf"), None
 
     for i in range(max_tries):
+        if 0 < i:
+            if statistics is not None:
+                statistics.restarts += 1
+            if events is not None:
+                events.emit(SearchEvents.RESTART)
         constraint_problem.assign_variables_with_random_values(read_only_variables)
+        violating_values, penalties = __initialize_penalties(constraint_problem, constraints_weights,
+                                                             read_only_variables)
+        unsatisfied_constraints = set(constraint_problem.get_unsatisfied_constraints())
         last_reduction = float("inf")
+        stopped = False
         while 0 < last_reduction:
-            if constraint_problem.is_completely_consistently_assigned():
-                return actions_history
+            if not unsatisfied_constraints:
+                if events is not None:
+                    events.emit(SearchEvents.SOLUTION, constraint_problem.get_current_assignment())
+                return
+            if len(unsatisfied_constraints) < best_unsatisfied_amount:
+                best_unsatisfied_amount = len(unsatisfied_constraints)
+                best_assignment = constraint_problem.get_current_assignment()
 
-            reduction, variable, value = __get_best_reduction_variable_value(constraint_problem, constraints_weights,
-                                                                             read_only_variables)
+            if budget is not None and budget.charge_node():
+                stopped = True
+                break
+            reduction, variable, value = __get_best_reduction_variable_value(penalties)
+            if variable is None:
+                stopped = True
+                break
             variable.unassign()
-            if with_history:
+            if actions_history is not None:
                 actions_history.append((variable, None))
+            if events is not None:
+                events.emit(SearchEvents.UNASSIGN, variable)
             variable.assign(value)
-            if with_history:
+            if actions_history is not None:
                 actions_history.append((variable, value))
+            if statistics is not None:
+                statistics.nodes += 1
+            if events is not None:
+                events.emit(SearchEvents.ASSIGN, variable, value)
             last_reduction = reduction
 
-            for unsatisfied_constraint in constraint_problem.get_unsatisfied_constraints():
-                constraints_weights[unsatisfied_constraint] += 1
+            __update_after_assignment(constraint_problem, variable, constraints_weights, read_only_variables,
+                                      violating_values, penalties, unsatisfied_constraints)
+            __increase_unsatisfied_weights(constraints_weights, read_only_variables, violating_values, penalties,
+                                           unsatisfied_constraints)
 
+        if not unsatisfied_constraints:
+            if events is not None:
+                events.emit(SearchEvents.SOLUTION, constraint_problem.get_current_assignment())
+            return
+        if len(unsatisfied_constraints) < best_unsatisfied_amount:
+            best_unsatisfied_amount = len(unsatisfied_constraints)
+            best_assignment = constraint_problem.get_current_assignment()
+        if stopped:
+            break
         if i != max_tries - 1:
             constraint_problem.unassign_all_variables(read_only_variables)
 
-    return actions_history
+    if best_assignment is not None:
+        constraint_problem.unassign_all_variables()
+        constraint_problem.assign_variables_from_assignment(best_assignment)
 
 
-def __get_best_reduction_variable_value(constraint_problem: ConstraintProblem,
-                                        constraints_weights: Dict[Constraint, int],
-                                        read_only_variables: FrozenSet[Variable]) -> Tuple[int, Variable, Any]:
-    pairs_to_weight_reduction = dict()
-    weight = __calculate_weight(constraint_problem, constraints_weights)
-    original_assignment = constraint_problem.get_current_assignment()
-    constraint_problem.unassign_all_variables()
+def __initialize_penalties(constraint_problem: ConstraintProblem, constraints_weights: Dict[Constraint, int],
+                           read_only_variables: FrozenSet[Variable]) \
+        -> Tuple[Dict[Tuple[Constraint, Variable], Set[Any]], Dict[Variable, Dict[Any, int]]]:
+    violating_values = dict()
+    penalties = dict()
     for variable in constraint_problem.get_variables() - read_only_variables:
-        for value in variable.domain:
-            variable.assign(value)
-            curr_weight = __calculate_weight(constraint_problem, constraints_weights)
-            pairs_to_weight_reduction[(variable, value)] = weight - curr_weight
-            variable.unassign()
+        variable_penalties = dict.fromkeys(variable.domain, 0)
+        for constraint in constraint_problem.get_constraints_containing_variable(variable):
+            constraint_violating_values = __get_violating_values(constraint, variable)
+            violating_values[(constraint, variable)] = constraint_violating_values
+            for value in constraint_violating_values:
+                variable_penalties[value] += constraints_weights[constraint]
+        penalties[variable] = variable_penalties
+    return violating_values, penalties
+
+
+def __get_violating_values(constraint: Constraint, variable: Variable) -> Set[Any]:
+    original_value = variable.value
+    constraint_violating_values = set()
+    for value in variable.domain:
+        variable.unassign()
+        variable.assign(value)
+        if not constraint:
+            constraint_violating_values.add(value)
+    variable.unassign()
+    variable.assign(original_value)
+    return constraint_violating_values
+
+
+def __update_after_assignment(constraint_problem: ConstraintProblem, assigned_variable: Variable,
+                              constraints_weights: Dict[Constraint, int], read_only_variables: FrozenSet[Variable],
+                              violating_values: Dict[Tuple[Constraint, Variable], Set[Any]],
+                              penalties: Dict[Variable, Dict[Any, int]], unsatisfied_constraints: Set[Constraint]) \
+        -> None:
+    for constraint in constraint_problem.get_constraints_containing_variable(assigned_variable):
+        if constraint:
+            unsatisfied_constraints.discard(constraint)
+        else:
+            unsatisfied_constraints.add(constraint)
+
+        weight = constraints_weights[constraint]
+        for neighbor in constraint.variables:
+            if neighbor is assigned_variable or neighbor in read_only_variables:
+                continue
+            old_violating_values = violating_values[(constraint, neighbor)]
+            new_violating_values = __get_violating_values(constraint, neighbor)
+            neighbor_penalties = penalties[neighbor]
+            for value in old_violating_values - new_violating_values:
+                neighbor_penalties[value] -= weight
+            for value in new_violating_values - old_violating_values:
+                neighbor_penalties[value] += weight
+            violating_values[(constraint, neighbor)] = new_violating_values
+
 
-    constraint_problem.unassign_all_variables()
-    constraint_problem.assign_variables_from_assignment(original_assignment)
-    max_variable, max_value = max(pairs_to_weight_reduction, key=pairs_to_weight_reduction.get)
-    return pairs_to_weight_reduction[(max_variable, max_value)], max_variable, max_value
+def __increase_unsatisfied_weights(constraints_weights: Dict[Constraint, int], read_only_variables: FrozenSet[Variable],
+                                   violating_values: Dict[Tuple[Constraint, Variable], Set[Any]],
+                                   penalties: Dict[Variable, Dict[Any, int]],
+                                   unsatisfied_constraints: Set[Constraint]) -> None:
+    for unsatisfied_constraint in unsatisfied_constraints:
+        constraints_weights[unsatisfied_constraint] += 1
+        for constraint_variable in unsatisfied_constraint.variables:
+            if constraint_variable not in read_only_variables:
+                variable_penalties = penalties[constraint_variable]
+                for violating_value in violating_values[(unsatisfied_constraint, constraint_variable)]:
+                    variable_penalties[violating_value] += 1
 
 
-def __calculate_weight(constraint_problem: ConstraintProblem, constraints_weights: Dict[Constraint, int]) -> int:
-    weight = 0
-    for variable in constraint_problem.get_variables():
-        unsatisfied_constraints = filterfalse(None, constraint_problem.get_constraints_containing_variable(variable))
-        for unsatisfied_const in unsatisfied_constraints:
-            weight += constraints_weights[unsatisfied_const]
-    return weight
+def __get_best_reduction_variable_value(penalties: Dict[Variable, Dict[Any, int]]) -> Tuple[int, Variable, Any]:
+    best_reduction, best_variable, best_value = float("-inf"), None, None
+    for variable, variable_penalties in penalties.items():
+        current_penalty = variable_penalties[variable.value]
+        for value, penalty in variable_penalties.items():
+            if best_reduction < current_penalty - penalty:
+                best_reduction, best_variable, best_value = current_penalty - penalty, variable, value
+    return best_reduction, best_variable, best_value
@@ -1,17 +1,30 @@
-from typing import List, FrozenSet
-from random import choice, uniform, sample
+from typing import List, FrozenSet, Tuple, Optional
+from operator import getitem
+from random import uniform, sample, randrange, getrandbits
 from csp.variable import Variable
 from csp.constraint_problem import ConstraintProblem
 from csp.genetic_search import GeneticConstraintProblem, Assignment
 
 
+EncodedIndividual = Tuple[int, ...]
+
+_BINARY_DIGITS_TO_BITS = bytes.maketrans(b"01", b"\x00\x01")
+
+
 class GeneralGeneticConstraintProblem(GeneticConstraintProblem):
+    """ Individuals are encoded as tuples holding, for each non read-only variable, the index of its value within
+        the variable's domain. Being immutable and hashable, each individual's fitness is computed once and cached.
+        Fitness is evaluated without touching the variables' state. """
 
     def __init__(self, constraint_problem: ConstraintProblem, mutation_fraction: float,
                  read_only_variables: FrozenSet[Variable] = frozenset()) -> None:
         super(GeneralGeneticConstraintProblem, self).__init__(constraint_problem)
         self.__mutation_fraction = mutation_fraction
-        self.__read_only_variables = read_only_variables
+        self.__read_only_assignment = {variable: variable.value for variable in read_only_variables}
+        self.__variables = tuple(constraint_problem.get_variables() - read_only_variables)
+        self.__domains = tuple(tuple(variable.domain) for variable in self.__variables)
+        self.__values_indices = tuple({value: i for i, value in enumerate(domain)} for domain in self.__domains)
+        self.__fitness_cache = dict()
 
     def __get_mutation_fraction(self) -> float:
         return self.__mutation_fraction
@@ -21,60 +34,73 @@ class GeneralGeneticConstraintProblem(GeneticConstraintProblem):
 
     mutation_fraction = property(__get_mutation_fraction, __set_mutation_fraction)
 
-    def generate_population(self, population_size: int) -> List[Assignment]:
+    def decode_individual(self, individual: EncodedIndividual) -> Assignment:
+        assignment = dict(self.__read_only_assignment)
+        for variable, domain, value_index in zip(self.__variables, self.__domains, individual):
+            assignment[variable] = domain[value_index]
+        return assignment
+
+    def encode_assignment(self, assignment: Assignment) -> EncodedIndividual:
+        return tuple(values_indices[assignment[variable]]
+                     for variable, values_indices in zip(self.__variables, self.__values_indices))
+
+    def generate_population(self, population_size: int) -> List[EncodedIndividual]:
         """ generating individuals by random assignments. """
-        population = list()
-        for i in range(population_size):
-            for variable in self._constraint_problem.get_variables() - self.__read_only_variables:
-                variable.assign(choice(variable.domain))
-            population.append(self._constraint_problem.get_current_assignment())
-            self._constraint_problem.unassign_all_variables()
-        return population
-
-    def calculate_fitness(self, assignment: Assignment) -> int:
+        return [tuple(randrange(len(domain)) for domain in self.__domains) for i in range(population_size)]
+
+    def calculate_fitness(self, individual: EncodedIndividual) -> int:
         """ fitness is the number of consistent constraints.  """
-        self._constraint_problem.unassign_all_variables()
-        self._constraint_problem.assign_variables_from_assignment(assignment)
-        return len(self._constraint_problem.get_consistent_constraints())
+        fitness = self.__fitness_cache.get(individual)
+        if fitness is None:
+            fitness = len(self._constraint_problem.get_consistent_constraints(self.decode_individual(individual)))
+            self.__fitness_cache[individual] = fitness
+        return fitness
+
+    def get_solution(self, population: List[EncodedIndividual]) -> Optional[ConstraintProblem]:
+        """ an individual is a solution iff all constraints are consistent, as individuals are complete. """
+        constraints_amount = len(self._constraint_problem.get_constraints())
+        for individual in population:
+            if self.calculate_fitness(individual) == constraints_amount:
+                self._constraint_problem.unassign_all_variables()
+                self._constraint_problem.assign_variables_from_assignment(self.decode_individual(individual))
+                return self._constraint_problem
+        return None
 
-    def perform_natural_selection(self, population: List[Assignment]) -> List[Assignment]:
-        """ half truncation selection. """
+    def perform_natural_selection(self, population: List[EncodedIndividual]) -> List[EncodedIndividual]:
+        """ half truncation selection. only the survivors' fitnesses are kept cached. """
         population.sort(key=self.calculate_fitness, reverse=True)
-        return population[:len(population) >> 1]
+        survivors = population[:len(population) >> 1]
+        self.__fitness_cache = {individual: self.__fitness_cache[individual] for individual in survivors}
+        return survivors
 
-    def reproduce_next_generation(self, old_generation: List[Assignment]) -> List[Assignment]:
+    def reproduce_next_generation(self, old_generation: List[EncodedIndividual]) -> List[EncodedIndividual]:
+        """ a child has half of each parent's variables and their assigned values. the crossover masks of the whole
+            generation are drawn as a single random int, whose binary digits are translated to a bytes object of 0s
+            and 1s. each child's values are then picked from its parents' values pairs by a zip and a map, with no
+            per variable python code. """
+        children_amount = len(old_generation) << 1
+        genes_amount = len(self.__variables)
+        masks_length = genes_amount * children_amount
+        masks = format(getrandbits(masks_length) if masks_length else 0, "0{}b".format(masks_length))
+        masks = masks.encode().translate(_BINARY_DIGITS_TO_BITS)
         new_generation = list()
-        for i in range(len(old_generation) << 1):
+        for i in range(children_amount):
             parent1, parent2 = sample(old_generation, 2)
-            new_generation.append(self.__reproduce(parent1, parent2))
+            mask = masks[i * genes_amount:(i + 1) * genes_amount]
+            new_generation.append(tuple(map(getitem, zip(parent2, parent1), mask)))
         return new_generation
 
-    def __reproduce(self, parent1: Assignment, parent2: Assignment) -> Assignment:
-        """ a child has half of each parent's variables and their assigned values.
-            choose from which parent to get variable randomly. """
-        child = dict()
-        for variable in self._constraint_problem.get_variables():
-            if uniform(0, 1) < 0.5:
-                child[variable] = parent1[variable]
-            else:
-                child[variable] = parent2[variable]
-        return child
-
-    def mutate_population(self, population: List[Assignment], mutation_probability: float) -> None:
-        for individual in population:
+    def mutate_population(self, population: List[EncodedIndividual], mutation_probability: float) -> None:
+        for i in range(len(population)):
             if uniform(0, 1) < mutation_probability:
-                self.__mutate(individual)
+                population[i] = self.__mutate(population[i])
 
-    def __mutate(self, assignment: Assignment) -> None:
+    def __mutate(self, individual: EncodedIndividual) -> EncodedIndividual:
         """ for each selected mutation variable assign a new value randomly. """
-        variables = assignment.keys()
-        number_of_mutations = int(len(variables) * self.__mutation_fraction)
-        mutation_variables = sample(variables - self.__read_only_variables, number_of_mutations)
-        for variable in mutation_variables:
-            old_value = variable.value
-            variable.unassign()
-            possible_values = variable.domain
-            if len(possible_values) > 1:
-                possible_values.remove(old_value)
-            variable.assign(choice(possible_values))
-
+        number_of_mutations = int(len(individual) * self.__mutation_fraction)
+        mutant = list(individual)
+        for variable_index in sample(range(len(individual)), number_of_mutations):
+            domain_length = len(self.__domains[variable_index])
+            if 1 < domain_length:
+                mutant[variable_index] = (mutant[variable_index] + randrange(1, domain_length)) % domain_length
+        return tuple(mutant)
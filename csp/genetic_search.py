@@ -1,10 +1,16 @@
 from abc import ABCMeta, abstractmethod
-from typing import Dict, Any, List, Optional
+from operator import itemgetter
+from random import Random, seed
+from multiprocessing import Pool
+from typing import Dict, Any, List, Optional, Tuple, Callable
 from csp.variable import Variable
 from csp.constraint_problem import ConstraintProblem
+from csp.search_budget import SearchBudget
 
 
 Assignment = Dict[Variable, Any]
+Individual = Any  # either an Assignment, or an encoding of one which decode_individual translates back
+MigrationTopology = Callable[[int], List[Tuple[int, int]]]  # islands amount -> (source, destination) island pairs
 
 
 class GeneticConstraintProblem(metaclass=ABCMeta):
@@ -18,57 +24,187 @@ class GeneticConstraintProblem(metaclass=ABCMeta):
         return self._constraint_problem
 
     @abstractmethod
-    def generate_population(self, population_size: int) -> List[Assignment]:
+    def generate_population(self, population_size: int) -> List[Individual]:
         pass
 
     @abstractmethod
-    def calculate_fitness(self, assignment: Assignment) -> int:
+    def calculate_fitness(self, individual: Individual) -> int:
         """ High fitness is good fitness. """
         pass
 
     @abstractmethod
-    def perform_natural_selection(self, population: List[Assignment]) -> List[Assignment]:
+    def perform_natural_selection(self, population: List[Individual]) -> List[Individual]:
         pass
 
     @abstractmethod
-    def reproduce_next_generation(self, old_generation: List[Assignment]) -> List[Assignment]:
+    def reproduce_next_generation(self, old_generation: List[Individual]) -> List[Individual]:
         pass
 
     @abstractmethod
-    def mutate_population(self, population: List[Assignment], mutation_probability: float) -> None:
+    def mutate_population(self, population: List[Individual], mutation_probability: float) -> None:
         pass
 
-    def get_solution(self, population: List[Assignment]) -> Optional[ConstraintProblem]:
-        for assignment in population:
-            self._constraint_problem.unassign_all_variables()
-            self._constraint_problem.assign_variables_from_assignment(assignment)
-            if self._constraint_problem.is_completely_consistently_assigned():
+    def decode_individual(self, individual: Individual) -> Assignment:
+        """ Individuals are assignments unless a subclass encodes them otherwise. """
+        return individual
+
+    def encode_assignment(self, assignment: Assignment) -> Individual:
+        """ The inverse of decode_individual. """
+        return assignment
+
+    def get_solution(self, population: List[Individual]) -> Optional[ConstraintProblem]:
+        """ Individuals are evaluated without touching the variables, which are only assigned with a solution. """
+        for individual in population:
+            assignment = self.decode_individual(individual)
+            if self._constraint_problem.is_completely_consistently_assigned(assignment):
+                self._constraint_problem.unassign_all_variables()
+                self._constraint_problem.assign_variables_from_assignment(assignment)
                 return self._constraint_problem
         return None
 
 
 def genetic_local_search(genetic_constraint_problem: GeneticConstraintProblem,
-                         population_size: int, max_generations: int, mutation_probability: float) -> ConstraintProblem:
+                         population_size: int, max_generations: int, mutation_probability: float,
+                         budget: Optional[SearchBudget] = None) -> ConstraintProblem:
+    """ With a budget, a node is charged per generation. """
     constraint_problem = genetic_constraint_problem.get_constraint_problem()
+    if budget is not None:
+        budget.start(constraint_problem)
 
     population = genetic_constraint_problem.generate_population(population_size)
+    population, most_fit_individual, best_fitness, possible_solution = \
+        _evolve(genetic_constraint_problem, population, max_generations, mutation_probability, budget)
+    if possible_solution is None:
+        constraint_problem.unassign_all_variables()
+        constraint_problem.assign_variables_from_assignment(genetic_constraint_problem.decode_individual(
+            most_fit_individual))
+    if budget is not None:
+        budget.report_assignment(constraint_problem)
+    return constraint_problem
+
+
+def ring_migration_topology(islands_amount: int) -> List[Tuple[int, int]]:
+    return [(island, (island + 1) % islands_amount) for island in range(islands_amount)]
+
+
+def fully_connected_migration_topology(islands_amount: int) -> List[Tuple[int, int]]:
+    return [(source, destination) for source in range(islands_amount) for destination in range(islands_amount)
+            if source != destination]
+
+
+def island_genetic_local_search(genetic_constraint_problem: GeneticConstraintProblem, islands_amount: int,
+                                population_size: int, max_generations: int, mutation_probability: float,
+                                migration_interval: int, migrants_amount: int,
+                                migration_topology: MigrationTopology = ring_migration_topology,
+                                processes: Optional[int] = None, random_seed: Optional[int] = None,
+                                budget: Optional[SearchBudget] = None) -> ConstraintProblem:
+    """ Island model genetic_local_search. Each island evolves its own population in a process pool for
+        migration_interval generations, then every (source, destination) island pair of migration_topology sends
+        source's migrants_amount fittest individuals to destination. All the migrants an island receives replace as
+        many of its least fit individuals, so an island with several sources keeps the migrants of each of them.
+        Individuals travel between processes as tuples of values ordered like the variables tuple pickled alongside
+        the problem, so any GeneticConstraintProblem whose encode_assignment and decode_individual agree may be used.
+        genetic_constraint_problem (including its constraints' evaluators) must be picklable. With a budget, a node is
+        charged per round of migration_interval generations, so at least one round runs. """
+    assert 0 < migration_interval, "migration_interval must be a positive integer."
+    assert migrants_amount <= population_size, "migrants_amount is bigger than population_size."
+
+    constraint_problem = genetic_constraint_problem.get_constraint_problem()
+    if budget is not None:
+        budget.start(constraint_problem)
+    variables = tuple(constraint_problem.get_variables())
+    seeds_generator = Random(random_seed)
+    populations = [None] * islands_amount
+    best_fitness, most_fit_values = float("-inf"), None
+    with Pool(processes) as pool:
+        for generation in range(0, max_generations, migration_interval):
+            generations = min(migration_interval, max_generations - generation)
+            tasks = [(genetic_constraint_problem, variables, population, population_size, generations,
+                      mutation_probability, seeds_generator.getrandbits(32)) for population in populations]
+            islands_results = pool.map(_evolve_island, tasks)
+
+            for ranked_population, island_best_fitness, island_most_fit_values, is_solution in islands_results:
+                if is_solution or best_fitness < island_best_fitness:
+                    best_fitness, most_fit_values = island_best_fitness, island_most_fit_values
+                if is_solution:
+                    populations = None
+                    break
+            if populations is None:
+                break
+
+            if budget is not None and budget.charge_node():
+                break
+            populations = [[values for fitness, values in ranked_population]
+                           for ranked_population, *_ in islands_results]
+            incoming_migrants = [list() for i in range(islands_amount)]
+            for source, destination in migration_topology(islands_amount):
+                source_ranked_population = islands_results[source][0]
+                incoming_migrants[destination].extend(values for fitness, values in
+                                                      source_ranked_population[:migrants_amount])
+            for population, migrants in zip(populations, incoming_migrants):
+                migrants = migrants[:len(population)]
+                population[len(population) - len(migrants):] = migrants
+
+    constraint_problem.unassign_all_variables()
+    constraint_problem.assign_variables_from_assignment(dict(zip(variables, most_fit_values)))
+    if budget is not None:
+        budget.report_assignment(constraint_problem)
+    return constraint_problem
+
+
+def _evolve(genetic_constraint_problem: GeneticConstraintProblem, population: List[Individual], generations: int,
+            mutation_probability: float, budget: Optional[SearchBudget] = None) \
+        -> Tuple[List[Individual], Individual, float, Optional[ConstraintProblem]]:
+    """ Returns the last generation, the fittest individual seen and its fitness, and a solution if one was found.
+        Stops early once budget is exhausted. """
     best_fitness = float("-inf")
     most_fit_individual = population[-1]
-    for i in range(max_generations):
+    for i in range(generations):
+        if budget is not None and budget.charge_node():
+            break
         possible_solution = genetic_constraint_problem.get_solution(population)
         if possible_solution is not None:
-            return possible_solution
+            return population, most_fit_individual, best_fitness, possible_solution
         selected_population = genetic_constraint_problem.perform_natural_selection(population)
         new_generation = genetic_constraint_problem.reproduce_next_generation(selected_population)
         genetic_constraint_problem.mutate_population(new_generation, mutation_probability)
         population = new_generation
 
-        curr_most_fit_individual = max(population, key=genetic_constraint_problem.calculate_fitness)
-        curr_best_fitness = genetic_constraint_problem.calculate_fitness(curr_most_fit_individual)
-        if best_fitness < curr_best_fitness:
-            best_fitness = curr_best_fitness
-            most_fit_individual = curr_most_fit_individual
-
-    constraint_problem.unassign_all_variables()
-    constraint_problem.assign_variables_from_assignment(most_fit_individual)
-    return constraint_problem
+        for individual in population:
+            fitness = genetic_constraint_problem.calculate_fitness(individual)
+            if best_fitness < fitness:
+                best_fitness = fitness
+                most_fit_individual = individual
+
+    return population, most_fit_individual, best_fitness, None
+
+
+def _evolve_island(task: Tuple[GeneticConstraintProblem, Tuple[Variable, ...], Optional[List[Tuple[Any, ...]]], int,
+                               int, float, int]) -> Tuple[List[Tuple[int, Tuple[Any, ...]]], float, Tuple[Any, ...],
+                                                          bool]:
+    """ Pool worker. Returns the island's population as (fitness, values) pairs, fittest first, the fittest
+        individual seen as values, its fitness, and whether it is a solution. The process' random module is re-seeded
+        since forked workers inherit identical random states. """
+    genetic_constraint_problem, variables, population_values, population_size, generations, mutation_probability, \
+        task_seed = task
+    seed(task_seed)
+
+    if population_values is None:
+        population = genetic_constraint_problem.generate_population(population_size)
+    else:
+        population = [genetic_constraint_problem.encode_assignment(dict(zip(variables, values)))
+                      for values in population_values]
+    population, most_fit_individual, best_fitness, possible_solution = \
+        _evolve(genetic_constraint_problem, population, generations, mutation_probability)
+    if possible_solution is not None:
+        solution_assignment = possible_solution.get_current_assignment()
+        return list(), float("inf"), tuple(solution_assignment[variable] for variable in variables), True
+
+    def to_values(individual: Individual) -> Tuple[Any, ...]:
+        assignment = genetic_constraint_problem.decode_individual(individual)
+        return tuple(assignment[variable] for variable in variables)
+
+    ranked_population = [(genetic_constraint_problem.calculate_fitness(individual), to_values(individual))
+                         for individual in population]
+    ranked_population.sort(key=itemgetter(0), reverse=True)
+    return ranked_population, best_fitness, to_values(most_fit_individual), False
@@ -1,13 +1,21 @@
 from copy import deepcopy
 from random import choice
-from typing import Callable
+from typing import Callable, Tuple, Any, Optional
+from csp.variable import Variable
 from csp.constraint_problem import ConstraintProblem
+from csp.solver_statistics import SolverStatistics
+from csp.search_events import SearchEvents
+from csp.search_budget import SearchBudget
 
 
 StartStateGenerator = Callable[[ConstraintProblem], None]
 ScoreCalculator = Callable[[ConstraintProblem], int]
 SuccessorGenerator = Callable[[ConstraintProblem], ConstraintProblem]
 
+Move = Tuple[Tuple[Variable, Any, Any], ...]  # (variable, old value, new value) triplets
+MoveGenerator = Callable[[ConstraintProblem], Move]
+ScoreDeltaCalculator = Callable[[ConstraintProblem, Move], int]
+
 
 def generate_start_state_randomly(constraint_problem: ConstraintProblem) -> None:
     constraint_problem.unassign_all_variables()
@@ -31,35 +39,161 @@ def alter_random_variable_value_pair(constraint_problem: ConstraintProblem) -> C
     return successor
 
 
+def apply_move(move: Move) -> None:
+    for variable, old_value, new_value in move:
+        variable.unassign()
+        if new_value is not None:
+            variable.assign(new_value)
+
+
+def undo_move(move: Move) -> None:
+    for variable, old_value, new_value in reversed(move):
+        variable.unassign()
+        if old_value is not None:
+            variable.assign(old_value)
+
+
+def alter_random_variable_value_move(constraint_problem: ConstraintProblem) -> Move:
+    """ The move counterpart of alter_random_variable_value_pair: nothing is copied and nothing is applied. """
+    random_var = choice(tuple(constraint_problem.get_variables()))
+    old_val = random_var.value
+    possible_values = random_var.domain
+    if len(possible_values) > 1:
+        possible_values.remove(old_val)
+    return (random_var, old_val, choice(possible_values)),
+
+
+def consistent_constraints_delta(constraint_problem: ConstraintProblem, move: Move) -> int:
+    """ Applies move in place and returns the change it caused to consistent_constraints_amount.
+        Only the constraints containing the moved variables are evaluated. """
+    affected_constraints = set()
+    for variable, old_value, new_value in move:
+        affected_constraints.update(constraint_problem.get_constraints_containing_variable(variable))
+    consistent_before = sum(1 for constraint in affected_constraints if constraint.is_consistent())
+    apply_move(move)
+    consistent_after = sum(1 for constraint in affected_constraints if constraint.is_consistent())
+    return consistent_after - consistent_before
+
+
 def random_restart_first_choice_hill_climbing(constraint_problem: ConstraintProblem, max_restarts: int,
                                               max_steps: int, max_successors: int,
                                               generate_start_state: StartStateGenerator = generate_start_state_randomly,
                                               generate_successor: SuccessorGenerator = alter_random_variable_value_pair,
-                                              calculate_score: ScoreCalculator = consistent_constraints_amount
-                                              ) -> ConstraintProblem:
+                                              calculate_score: ScoreCalculator = consistent_constraints_amount,
+                                              statistics: Optional[SolverStatistics] = None,
+                                              events: Optional[SearchEvents] = None,
+                                              budget: Optional[SearchBudget] = None) -> ConstraintProblem:
+    if budget is not None:
+        budget.start(constraint_problem)
     generate_start_state(constraint_problem)
     if constraint_problem.is_completely_consistently_assigned():
+        if budget is not None:
+            budget.report_assignment(constraint_problem)
         return constraint_problem
     max_restarts -= 1
 
     best_score = calculate_score(constraint_problem)
-    best_score_problem = deepcopy(constraint_problem)
+    best_score_problem = constraint_problem
+    best_score_assignment = constraint_problem.get_current_assignment()
     for i in range(max_restarts):
+        if budget is not None and budget.is_exhausted():
+            break
         generate_start_state(constraint_problem)
+        if statistics is not None:
+            statistics.restarts += 1
+        if events is not None:
+            events.emit(SearchEvents.RESTART)
         for j in range(max_steps):
             if constraint_problem.is_completely_consistently_assigned():
+                if budget is not None:
+                    budget.report_assignment(constraint_problem)
                 return constraint_problem
+            if budget is not None and budget.charge_node():
+                break
 
             current_score = calculate_score(constraint_problem)
             if best_score < current_score:
                 best_score = current_score
-                best_score_problem = deepcopy(constraint_problem)
+                best_score_problem = constraint_problem
+                best_score_assignment = constraint_problem.get_current_assignment()
 
             for k in range(max_successors):
                 successor = generate_successor(constraint_problem)
                 successor_score = calculate_score(successor)
+                if statistics is not None:
+                    statistics.nodes += 1
                 if current_score < successor_score:
                     constraint_problem = successor
                     break
 
+    best_score_problem.unassign_all_variables()
+    best_score_problem.assign_variables_from_assignment(best_score_assignment)
+    if budget is not None:
+        budget.report_assignment(best_score_problem)
     return best_score_problem
+
+
+def move_based_random_restart_first_choice_hill_climbing(constraint_problem: ConstraintProblem, max_restarts: int,
+                                                         max_steps: int, max_successors: int,
+                                                         generate_start_state: StartStateGenerator =
+                                                         generate_start_state_randomly,
+                                                         generate_move: MoveGenerator =
+                                                         alter_random_variable_value_move,
+                                                         calculate_score: ScoreCalculator =
+                                                         consistent_constraints_amount,
+                                                         calculate_score_delta: ScoreDeltaCalculator =
+                                                         consistent_constraints_delta,
+                                                         statistics: Optional[SolverStatistics] = None,
+                                                         events: Optional[SearchEvents] = None,
+                                                         budget: Optional[SearchBudget] = None) -> ConstraintProblem:
+    """ random_restart_first_choice_hill_climbing which climbs in place: a successor is a move whose score delta is
+        evaluated by calculate_score_delta, and which is undone if it does not improve the score.
+        calculate_score is only used once per restart. """
+    if budget is not None:
+        budget.start(constraint_problem)
+    best_score = float("-inf")
+    best_assignment = None
+    for i in range(max_restarts):
+        if budget is not None and budget.is_exhausted():
+            break
+        generate_start_state(constraint_problem)
+        if 0 < i:
+            if statistics is not None:
+                statistics.restarts += 1
+            if events is not None:
+                events.emit(SearchEvents.RESTART)
+        current_score = calculate_score(constraint_problem)
+        if best_score < current_score:
+            if constraint_problem.is_completely_consistently_assigned():
+                if budget is not None:
+                    budget.report_assignment(constraint_problem)
+                return constraint_problem
+            best_score = current_score
+            best_assignment = constraint_problem.get_current_assignment()
+
+        for j in range(max_steps):
+            if budget is not None and budget.charge_node():
+                break
+            for k in range(max_successors):
+                move = generate_move(constraint_problem)
+                delta = calculate_score_delta(constraint_problem, move)
+                if statistics is not None:
+                    statistics.nodes += 1
+                if 0 < delta:
+                    current_score += delta
+                    if best_score < current_score:
+                        if constraint_problem.is_completely_consistently_assigned():
+                            if budget is not None:
+                                budget.report_assignment(constraint_problem)
+                            return constraint_problem
+                        best_score = current_score
+                        best_assignment = constraint_problem.get_current_assignment()
+                    break
+                undo_move(move)
+
+    if best_assignment is not None and not constraint_problem.is_completely_consistently_assigned():
+        constraint_problem.unassign_all_variables()
+        constraint_problem.assign_variables_from_assignment(best_assignment)
+    if budget is not None:
+        budget.report_assignment(constraint_problem)
+    return constraint_problem
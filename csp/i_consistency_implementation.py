@@ -1,90 +1,223 @@
-from itertools import combinations, product, chain
-from typing import Tuple, FrozenSet, Dict, Iterable
+from sys import getsizeof
+from itertools import combinations, product
+from collections import deque, defaultdict
+from typing import Tuple, FrozenSet, Dict, List, Any, NamedTuple, Iterator, Optional
 from csp.constraint import Constraint
 from csp.variable import Variable
 from csp.constraint_problem import ConstraintProblem
-from csp.constraint_evaluators import OnlyiConsistentAssignment
+from csp.search_budget import SearchBudget
 
 
-def i_consistency(constraint_problem: ConstraintProblem, i: int) -> bool:
+# //////////////////////////////////////////////// i-consistency //////////////////////////////////////////////////////
+# a constraint problem is i-consistent if every consistent assignment to i - 1 variables can be extended to any ith
+# variable. only the (i - 1)-subsets of variables covered by a constraint's scope are considered, as these are the
+# only ones whose allowed tuples can be stored (on the constraints covering them). for i = 2 the subsets are single
+# variables, so enforcing 2-consistency (arc consistency) only prunes domains. for bigger i, values which are not part
+# of any allowed tuple of a subset containing their variable are pruned as well.
+# each covered subset's allowed tuples are kept as a single int bitset over the mixed radix indices of its
+# variables' candidate values (a variable's value is its own index when the subset has one variable), so allowed
+# tuples are never materialized as sets. subsets are revised one at a time from a queue, enumerating their tuples
+# lazily, and a subset whose allowed tuples shrink re-queues only the subsets around it.
+# /////////////////////////////////////////////////////////////////////////////////////////////////////////////////
+
+
+IConsistencyReport = NamedTuple("IConsistencyReport", [("is_consistent", bool),
+                                                       ("stored_subsets", int),
+                                                       ("stored_tuples", int),
+                                                       ("initial_stored_bytes", int)])
+
+Subset = Tuple[Variable, ...]
+
+
+def i_consistency(constraint_problem: ConstraintProblem, i: int, budget: Optional[SearchBudget] = None) -> bool:
+    return i_consistency_with_report(constraint_problem, i, budget).is_consistent
+
+
+def i_consistency_with_report(constraint_problem: ConstraintProblem, i: int, budget: Optional[SearchBudget] = None) \
+        -> IConsistencyReport:
+    """ Enforces i-consistency, like i_consistency, and reports how many subsets' allowed tuples were stored, how many
+        tuples they allow and the memory (in bytes) their bitsets took initially. Revisions only clear bits, so the
+        bitsets never take more than that. With a budget, a node is charged per subset revision. A stopped enforcement
+        still stores the tuples which were not disallowed yet, as the disallowed ones are inconsistent anyway. """
+    assert 0 < i <= len(constraint_problem.get_variables()), \
+        "for i = {0}: i <= 0 or (number of variables in constraint_problem) < i.".format(i)
+    if budget is None:
+        return __i_consistency(constraint_problem, i, None)
+    budget.start(constraint_problem)
+    report = __i_consistency(constraint_problem, i, budget)
+    budget.report_consistency(constraint_problem, report.is_consistent)
+    return report
+
+
+def __i_consistency(constraint_problem: ConstraintProblem, i: int, budget: Optional[SearchBudget]) \
+        -> IConsistencyReport:
     variables = constraint_problem.get_variables()
 
-    assert 0 < i <= len(variables), "for i = {0}: i <= 0 or (number of variables in constraint_problem) < i.".format(i)
+    if i == 1:
+        for variable in constraint_problem.get_unassigned_variables():
+            consistent_domain = constraint_problem.get_consistent_domain(variable)
+            for value in variable.domain:
+                if value not in consistent_domain:
+                    variable.remove_from_domain(value)
+        return IConsistencyReport(__is_domains_consistent(constraint_problem), 0, 0, 0)
+
+    candidates = {variable: (variable.value,) if variable else tuple(variable.domain) for variable in variables}
+    covered_subsets = __get_covered_subsets(constraint_problem, i - 1)
+    allowed_tuples = {subset: (1 << __get_tuples_amount(subset, candidates)) - 1 for subset in covered_subsets}
+    initial_stored_bytes = sum(getsizeof(bitset) for subset, bitset in allowed_tuples.items() if 1 < len(subset))
+
+    subsets_by_variables = {frozenset(subset): subset for subset in covered_subsets}
+    variables_subsets = defaultdict(list)
+    for subset in covered_subsets:
+        for variable in subset:
+            variables_subsets[variable].append(subset)
+
+    subsets_queue = deque(covered_subsets)
+    queued_subsets = set(covered_subsets)
+    current_assignment = constraint_problem.get_current_assignment()
+    while subsets_queue:
+        if budget is not None and budget.charge_node():
+            break
+        subset = subsets_queue.popleft()
+        queued_subsets.discard(subset)
+        if __revise_i(constraint_problem, subset, candidates, allowed_tuples, subsets_by_variables,
+                      current_assignment):
+            if not allowed_tuples[subset]:
+                return IConsistencyReport(False, len(allowed_tuples), 0, initial_stored_bytes)
+            affected_variables = set(subset)
+            for variable in subset:
+                affected_variables.update(constraint_problem.get_neighbors(variable))
+            for affected_variable in affected_variables:
+                for other_subset in variables_subsets[affected_variable]:
+                    if other_subset is not subset and other_subset not in queued_subsets:
+                        queued_subsets.add(other_subset)
+                        subsets_queue.append(other_subset)
+
+    supported_values = {variable: set(candidates[variable]) for variable in variables}
+    for subset, bitset in allowed_tuples.items():
+        subset_supported_values = [set() for variable in subset]
+        for values in __generate_allowed_tuples(subset, candidates, bitset):
+            for position_supported_values, value in zip(subset_supported_values, values):
+                position_supported_values.add(value)
+        for variable, position_supported_values in zip(subset, subset_supported_values):
+            supported_values[variable] &= position_supported_values
+    for variable in variables:
+        dead_values = [value for value in candidates[variable] if value not in supported_values[variable]]
+        if variable and dead_values:
+            return IConsistencyReport(False, len(allowed_tuples), 0, initial_stored_bytes)
+        if not variable:
+            for value in dead_values:
+                variable.remove_from_domain(value)
+    is_consistent = __is_domains_consistent(constraint_problem)
+
+    stored_tuples = 0
+    for subset, bitset in allowed_tuples.items():
+        if 1 < len(subset):
+            subset_allowed_tuples = set(__generate_allowed_tuples(subset, candidates, bitset))
+            stored_tuples += len(subset_allowed_tuples)
+            for constraint in covered_subsets[subset]:
+                constraint.update_i_consistent_assignments(subset_allowed_tuples, subset)
+    stored_subsets = sum(1 for subset in allowed_tuples if 1 < len(subset))
+    return IConsistencyReport(is_consistent, stored_subsets, stored_tuples, initial_stored_bytes)
+
 
-    i_minus_one_sized_subsets = combinations(variables, i - 1)
-    i_subsets_consistent_assignments = __initialize_i_consistency(variables, i_minus_one_sized_subsets)
+def __get_covered_subsets(constraint_problem: ConstraintProblem, subset_size: int) \
+        -> Dict[Subset, List[Constraint]]:
+    """ Maps each subset of subset_size variables within a constraint's scope to the constraints covering it. """
+    covered_subsets = dict()
+    subsets_by_variables = dict()
+    for constraint in constraint_problem.get_constraints():
+        for subset in combinations(constraint.variables, subset_size):
+            subset_variables = frozenset(subset)
+            if len(subset_variables) < subset_size:
+                continue
+            subset = subsets_by_variables.setdefault(subset_variables, subset)
+            covered_subsets.setdefault(subset, list()).append(constraint)
+    return covered_subsets
 
-    reducing_domains = True
-    while reducing_domains:
-        reducing_domains = False
-        for subset, ith_variable in i_subsets_consistent_assignments:
-            if __revise_i(constraint_problem, subset, ith_variable, i_subsets_consistent_assignments):
-                reducing_domains = True
 
+def __get_tuples_amount(subset: Subset, candidates: Dict[Variable, Tuple[Any, ...]]) -> int:
+    tuples_amount = 1
+    for variable in subset:
+        tuples_amount *= len(candidates[variable])
+    return tuples_amount
+
+
+def __get_tuple_index(subset: Subset, candidates: Dict[Variable, Tuple[Any, ...]], indices: Tuple[int, ...]) -> int:
+    tuple_index = 0
+    for variable, index in zip(subset, indices):
+        tuple_index = tuple_index * len(candidates[variable]) + index
+    return tuple_index
+
+
+def __generate_allowed_tuples(subset: Subset, candidates: Dict[Variable, Tuple[Any, ...]], bitset: int) \
+        -> Iterator[tuple]:
+    ranges = [range(len(candidates[variable])) for variable in subset]
+    for tuple_index, indices in enumerate(product(*ranges)):
+        if bitset >> tuple_index & 1:
+            yield tuple(candidates[variable][index] for variable, index in zip(subset, indices))
+
+
+def __revise_i(constraint_problem: ConstraintProblem, subset: Subset, candidates: Dict[Variable, Tuple[Any, ...]],
+               allowed_tuples: Dict[Subset, int], subsets_by_variables: Dict[FrozenSet[Variable], Subset],
+               current_assignment: Dict[Variable, Any]) -> bool:
+    """ Disallows the subset's tuples which are inconsistent, or which can't be extended to one of the subset's
+        neighbors. """
+    subset_constraints = set()
+    for variable in subset:
+        subset_constraints.update(constraint_problem.get_constraints_containing_variable(variable))
+    subset_variables = frozenset(subset)
+    extensions = list()
+    for neighbor in set().union(*map(constraint_problem.get_neighbors, subset)) - subset_variables:
+        neighbor_subsets = [subsets_by_variables[other_subset_variables]
+                            for other_subset_variables in map(frozenset, combinations(subset_variables | {neighbor},
+                                                                                      len(subset)))
+                            if neighbor in other_subset_variables and other_subset_variables in subsets_by_variables]
+        extensions.append((neighbor, constraint_problem.get_constraints_containing_variable(neighbor),
+                           neighbor_subsets))
+
+    bitset = allowed_tuples[subset]
+    revised_bitset = bitset
+    ranges = [range(len(candidates[variable])) for variable in subset]
+    for tuple_index, indices in enumerate(product(*ranges)):
+        if not bitset >> tuple_index & 1:
+            continue
+        for variable, index in zip(subset, indices):
+            current_assignment[variable] = candidates[variable][index]
+        indices_map = dict(zip(subset, indices))
+        if not all(constraint.is_consistent_with(current_assignment) for constraint in subset_constraints) or \
+                not all(__is_extendable(neighbor, neighbor_constraints, neighbor_subsets, candidates, allowed_tuples,
+                                        current_assignment, indices_map)
+                        for neighbor, neighbor_constraints, neighbor_subsets in extensions):
+            revised_bitset &= ~(1 << tuple_index)
+    for variable in subset:
+        current_assignment[variable] = variable.value
+
+    allowed_tuples[subset] = revised_bitset
+    return revised_bitset != bitset
+
+
+def __is_extendable(neighbor: Variable, neighbor_constraints: FrozenSet[Constraint], neighbor_subsets: List[Subset],
+                    candidates: Dict[Variable, Tuple[Any, ...]], allowed_tuples: Dict[Subset, int],
+                    current_assignment: Dict[Variable, Any], indices_map: Dict[Variable, int]) -> bool:
+    is_extendable = False
+    for index, value in enumerate(candidates[neighbor]):
+        indices_map[neighbor] = index
+        if not all(allowed_tuples[subset] >> __get_tuple_index(subset, candidates,
+                                                               tuple(indices_map[variable] for variable in subset)) & 1
+                   for subset in neighbor_subsets):
+            continue
+        current_assignment[neighbor] = value
+        is_extendable = all(constraint.is_consistent_with(current_assignment) for constraint in neighbor_constraints)
+        if is_extendable:
+            break
+    del indices_map[neighbor]
+    current_assignment[neighbor] = neighbor.value
+    return is_extendable
+
+
+def __is_domains_consistent(constraint_problem: ConstraintProblem) -> bool:
     for var in constraint_problem.get_variables():
         if not var.domain or not constraint_problem.get_consistent_domain(var):
             return False
     return True
-
-
-def __initialize_i_consistency(variables: FrozenSet[Variable],
-                               i_minus_one_sized_subsets: Iterable[Tuple[Variable, ...]]) \
-        -> Dict[Tuple[Tuple[Variable, ...], Variable], set]:
-    i_subsets_consistent_assignments = dict()
-    for subset in i_minus_one_sized_subsets:
-        for ith_variable in variables - frozenset(subset):
-            domains = [variable.domain for variable in subset]
-            domains.append(ith_variable.domain)
-            i_subsets_consistent_assignments[(subset, ith_variable)] = set(product(*domains))
-    return i_subsets_consistent_assignments
-
-
-def __revise_i(constraint_problem: ConstraintProblem, subset: Tuple[Variable, ...], ith_variable: Variable,
-               i_subsets_consistent_assignments:  Dict[Tuple[Tuple[Variable, ...], Variable], set]) -> bool:
-    revised = False
-    i_subsets_constraints = map(constraint_problem.get_constraints_containing_variable, subset)
-    i_subsets_constraints = set(chain.from_iterable(i_subsets_constraints))
-    i_subsets_constraints.update(constraint_problem.get_constraints_containing_variable(ith_variable))
-    subset_domain = [variable.domain for variable in subset]
-    for assignment in product(*subset_domain):
-        var_were_assigned = dict()
-        for variable, value in zip(subset, assignment):
-            variable_was_assigned = False if variable.value is None else True
-            var_were_assigned[variable] = variable_was_assigned
-            if not variable_was_assigned:
-                variable.assign(value)
-        ith_variable_was_assigned = False if ith_variable.value is None else True
-        for value in ith_variable.domain:
-            if not ith_variable_was_assigned:
-                ith_variable.assign(value)
-            for constraint in i_subsets_constraints:
-                i_assignment = assignment + (value,)
-                if not constraint.is_consistent() and i_assignment in i_subsets_consistent_assignments[(subset,
-                                                                                                        ith_variable)]:
-                    revised = True
-                    i_subsets_consistent_assignments[(subset, ith_variable)].remove(i_assignment)
-            if not ith_variable_was_assigned:
-                ith_variable.unassign()
-        for variable in subset:
-            if not var_were_assigned[variable]:
-                variable.unassign()
-
-    __reduce_assignment_constraints_domains(constraint_problem, i_subsets_consistent_assignments)
-    return revised
-
-
-def __reduce_assignment_constraints_domains(constraint_problem: ConstraintProblem,
-                                            i_subsets_consistent_assignments:
-                                            Dict[Tuple[Tuple[Variable, ...], Variable], set]) -> None:
-    constraints = constraint_problem.get_constraints()
-    for subset, ith_variable in i_subsets_consistent_assignments:
-        i_variables = frozenset(subset + (ith_variable,))
-        found = False
-        for constraint in constraints:
-            if i_variables.issubset(constraint.variables):
-                found = True
-                constraint.update_i_consistent_assignments(i_subsets_consistent_assignments[(subset, ith_variable)])
-        if not found:
-            i_constraint = OnlyiConsistentAssignment((i_subsets_consistent_assignments[(subset, ith_variable)]))
-            new_constraint = Constraint(i_variables, i_constraint)
-            constraint_problem.add_constraint(new_constraint)
@@ -1,87 +1,225 @@
-from random import choice
-from typing import Any, Deque, Tuple, FrozenSet, Optional
+from random import Random
+from contextlib import ExitStack
+from time import perf_counter
+from multiprocessing import Pool
+from typing import Any, Tuple, Optional, Dict, List, NamedTuple
 from collections import deque
 from csp.variable import Variable
 from csp.constraint_problem import ConstraintProblem
-
-
-__tabu_queue = deque()
+from csp.solver_statistics import SolverStatistics
+from csp.search_events import SearchEvents
+from csp.action_history import ActionsSink, get_actions_sink
+from csp.search_budget import SearchBudget
+
+
+MinConflictsRunStatistics = NamedTuple("MinConflictsRunStatistics", [("seed", Optional[int]),
+                                                                     ("is_solved", bool),
+                                                                     ("steps", int),
+                                                                     ("unsatisfied_constraints", int),
+                                                                     ("elapsed_time", float)])
+
+MinConflictsBatchResult = NamedTuple("MinConflictsBatchResult", [("best_assignment", Dict[Variable, Any]),
+                                                                 ("is_solved", bool),
+                                                                 ("runs", List[MinConflictsRunStatistics])])
+
+
+class MinConflictsSearch:
+    """ A single min-conflicts run. Everything the run needs (tabu queue, random number generator, action history,
+        best assignment found so far, optional solver statistics, search events and budget) lives on the instance, so
+        independent runs never share state. """
+
+    def __init__(self, constraint_problem: ConstraintProblem, tabu_size: int = -1, with_history: bool = False,
+                 seed: Optional[int] = None, statistics: Optional[SolverStatistics] = None,
+                 events: Optional[SearchEvents] = None, history: Optional[ActionsSink] = None,
+                 budget: Optional[SearchBudget] = None) -> None:
+        self.__constraint_problem = constraint_problem
+        self.__searched_problem = constraint_problem if statistics is None else \
+            statistics.get_counting_problem(constraint_problem)
+        self.__read_only_variables = constraint_problem.get_assigned_variables()
+
+        if tabu_size == -1:
+            tabu_size = 0
+        assert tabu_size + len(self.__read_only_variables) < len(constraint_problem.get_variables()), \
+            "tabu_size + len(read_only_variables) is equal or bigger than constraint_problem's variables amount."
+        if tabu_size == 0:
+            tabu_size = -1
+
+        self.__tabu_size = tabu_size
+        self.__tabu_queue = deque()
+        self.__seed = seed
+        self.__random = Random(seed)
+        self.__actions_history = get_actions_sink(with_history, history)
+        self.__steps = 0
+        self.__best_min_conflicts = float("inf")
+        self.__best_min_conflicts_assignment = None
+        self.__statistics = statistics
+        self.__events = events
+        self.__budget = budget
+
+    def get_constraint_problem(self) -> ConstraintProblem:
+        return self.__constraint_problem
+
+    def get_steps(self) -> int:
+        return self.__steps
+
+    def get_best_min_conflicts(self) -> int:
+        return self.__best_min_conflicts
+
+    def get_best_assignment(self) -> Optional[Dict[Variable, Any]]:
+        return self.__best_min_conflicts_assignment
+
+    def get_statistics(self, elapsed_time: float = 0.0) -> MinConflictsRunStatistics:
+        return MinConflictsRunStatistics(self.__seed, self.__best_min_conflicts == 0, self.__steps,
+                                         self.__best_min_conflicts, elapsed_time)
+
+    def run(self, max_steps: int) -> Optional[ActionsSink]:
+        """ Assigns the problem's unassigned variables randomly, then repairs the assignment for at most max_steps.
+            Leaves the best assignment found assigned to the problem's variables. With a budget, the run also stops
+            once the budget is exhausted, and reports its outcome on it. """
+        if self.__budget is not None:
+            self.__budget.start(self.__constraint_problem)
+        if self.__statistics is None and self.__events is None:
+            actions_history = self.__run(max_steps)
+        else:
+            with ExitStack() as phase_stack:
+                if self.__statistics is not None:
+                    phase_stack.enter_context(self.__statistics.phase("min_conflicts"))
+                if self.__events is not None:
+                    phase_stack.enter_context(self.__events.phase("min_conflicts"))
+                actions_history = self.__run(max_steps)
+        if self.__budget is not None:
+            self.__budget.report_assignment(self.__constraint_problem)
+        return actions_history
+
+    def __run(self, max_steps: int) -> Optional[ActionsSink]:
+        self.__assign_variables_with_random_values()
+
+        self.__best_min_conflicts = len(self.__searched_problem.get_unsatisfied_constraints())
+        self.__best_min_conflicts_assignment = self.__constraint_problem.get_current_assignment()
+        for i in range(max_steps):
+            if self.__best_min_conflicts == 0:
+                if self.__events is not None:
+                    self.__events.emit(SearchEvents.SOLUTION, self.__best_min_conflicts_assignment)
+                return self.__actions_history
+            if self.__budget is not None and self.__budget.charge_node():
+                break
+            self.__steps += 1
+            if self.__statistics is not None:
+                self.__statistics.nodes += 1
+
+            conflicted_variable = self.__get_random_conflicted_variable()
+            conflicted_variable.unassign()
+            if self.__actions_history is not None:
+                self.__actions_history.append((conflicted_variable, None))
+            if self.__events is not None:
+                self.__events.emit(SearchEvents.UNASSIGN, conflicted_variable)
+            min_conflicts_value = self.__get_min_conflicts_value(conflicted_variable)
+            conflicted_variable.assign(min_conflicts_value)
+            if self.__actions_history is not None:
+                self.__actions_history.append((conflicted_variable, min_conflicts_value))
+            if self.__events is not None:
+                self.__events.emit(SearchEvents.ASSIGN, conflicted_variable, min_conflicts_value)
+
+            if self.__tabu_size != -1:
+                if len(self.__tabu_queue) == self.__tabu_size:
+                    self.__tabu_queue.popleft()
+                self.__tabu_queue.append(conflicted_variable)
+
+            curr_conflicts_count = len(self.__searched_problem.get_unsatisfied_constraints())
+            if curr_conflicts_count < self.__best_min_conflicts:
+                self.__best_min_conflicts = curr_conflicts_count
+                self.__best_min_conflicts_assignment = self.__constraint_problem.get_current_assignment()
+
+        if self.__best_min_conflicts == 0 and self.__events is not None:
+            self.__events.emit(SearchEvents.SOLUTION, self.__best_min_conflicts_assignment)
+        if self.__best_min_conflicts != 0:
+            self.__constraint_problem.unassign_all_variables()
+            self.__constraint_problem.assign_variables_from_assignment(self.__best_min_conflicts_assignment)
+        return self.__actions_history
+
+    def __assign_variables_with_random_values(self) -> None:
+        for variable in self.__constraint_problem.get_variables() - self.__read_only_variables:
+            variable.unassign()
+            value = self.__random.choice(variable.domain)
+            variable.assign(value)
+            if self.__actions_history is not None:
+                self.__actions_history.append((variable, value))
+            if self.__events is not None:
+                self.__events.emit(SearchEvents.ASSIGN, variable, value)
+
+    def __get_random_conflicted_variable(self) -> Variable:
+        conflicted_variables = set()
+        for constraint in self.__searched_problem.get_unsatisfied_constraints():
+            conflicted_variables.update(constraint.variables)
+        conflicted_variables -= self.__read_only_variables
+        if self.__tabu_size != -1:
+            untabued_conflicted_variables = conflicted_variables.difference(self.__tabu_queue)
+            if untabued_conflicted_variables:
+                return self.__random.choice(tuple(untabued_conflicted_variables))
+        return self.__random.choice(tuple(conflicted_variables))
+
+    def __get_min_conflicts_value(self, conflicted_variable: Variable) -> Any:
+        """ Only the constraints containing conflicted_variable may change their satisfaction, hence only they are
+            counted. """
+        variable_constraints = self.__searched_problem.get_constraints_containing_variable(conflicted_variable)
+        min_conflicts_count = float("inf")
+        min_conflicting_values = list()
+        for value in conflicted_variable.domain:
+            conflicted_variable.assign(value)
+            conflicts_count = sum(1 for constraint in variable_constraints if not constraint)
+            if conflicts_count < min_conflicts_count:
+                min_conflicts_count = conflicts_count
+                min_conflicting_values.clear()
+                min_conflicting_values.append(value)
+            elif conflicts_count == min_conflicts_count:
+                min_conflicting_values.append(value)
+            conflicted_variable.unassign()
+
+        return self.__random.choice(min_conflicting_values)
 
 
 def min_conflicts(constraint_problem: ConstraintProblem, max_steps: int, tabu_size: int = -1,
-                  with_history: bool = False) -> Optional[Deque[Tuple[Variable, Any]]]:
-    __tabu_queue.clear()
-    read_only_variables = constraint_problem.get_assigned_variables()
-
-    if tabu_size == -1:
-        tabu_size = 0
-    assert tabu_size + len(read_only_variables) < len(constraint_problem.get_variables()), \
-        "tabu_size + len(read_only_variables) is equal or bigger than constraint_problem's variables amount."
-    if tabu_size == 0:
-        tabu_size = -1
-
-    actions_history = None
-    if with_history:
-        actions_history = deque()
-    rand_assignmt_history = constraint_problem.assign_variables_with_random_values(read_only_variables, actions_history)
-    if with_history:
-        actions_history.extend(rand_assignmt_history)
-
-    best_min_conflicts = len(constraint_problem.get_unsatisfied_constraints())
-    best_min_conflicts_assignment = constraint_problem.get_current_assignment()
-    for i in range(max_steps):
-        if constraint_problem.is_completely_consistently_assigned():
-            return actions_history
-
-        conflicted_variable = __get_random_conflicted_variable(constraint_problem, read_only_variables, tabu_size)
-        conflicted_variable.unassign()
-        if with_history:
-            actions_history.append((conflicted_variable, None))
-        min_conflicts_value = __get_min_conflicts_value(constraint_problem, conflicted_variable)
-        conflicted_variable.assign(min_conflicts_value)
-        if with_history:
-            actions_history.append((conflicted_variable, min_conflicts_value))
-
-        if len(__tabu_queue) == tabu_size:
-            __tabu_queue.popleft()
-        if __tabu_queue:
-            __tabu_queue.append(conflicted_variable)
-
-        curr_conflicts_count = len(constraint_problem.get_unsatisfied_constraints())
-        if curr_conflicts_count < best_min_conflicts:
-            best_min_conflicts = curr_conflicts_count
-            best_min_conflicts_assignment = constraint_problem.get_current_assignment()
-
+                  with_history: bool = False, statistics: Optional[SolverStatistics] = None,
+                  events: Optional[SearchEvents] = None, history: Optional[ActionsSink] = None,
+                  budget: Optional[SearchBudget] = None) -> Optional[ActionsSink]:
+    return MinConflictsSearch(constraint_problem, tabu_size, with_history, statistics=statistics, events=events,
+                              history=history, budget=budget).run(max_steps)
+
+
+def parallel_min_conflicts(constraint_problem: ConstraintProblem, max_steps: int, restarts: int,
+                           tabu_size: int = -1, seed: Optional[int] = None, processes: Optional[int] = None) \
+        -> MinConflictsBatchResult:
+    """ Runs restarts independent, seeded min-conflicts runs over a process pool. Each run works on its own copy of
+        constraint_problem. The best assignment found (a solution if any run found one, otherwise the one with the
+        fewest unsatisfied constraints) is assigned to constraint_problem's variables and returned alongside every
+        run's statistics. constraint_problem is pickled to the pool's processes, so its constraints' evaluators must
+        be picklable. """
+    assert 0 < restarts, "restarts must be a positive integer."
+
+    seeds_generator = Random(seed)
+    variables = tuple(constraint_problem.get_variables())
+    tasks = [(constraint_problem, variables, max_steps, tabu_size, seeds_generator.getrandbits(32))
+             for i in range(restarts)]
+    with Pool(processes) as pool:
+        runs_results = pool.map(_run_seeded_min_conflicts, tasks)
+
+    best_values, best_statistics = min(runs_results, key=lambda run_result: run_result[1].unsatisfied_constraints)
+    best_assignment = dict(zip(variables, best_values))
     constraint_problem.unassign_all_variables()
-    constraint_problem.assign_variables_from_assignment(best_min_conflicts_assignment)
-    return actions_history
-
-
-def __get_random_conflicted_variable(constraint_problem: ConstraintProblem, read_only_variables: FrozenSet[Variable],
-                                     tabu_size: int) -> Variable:
-    conflicted_variables = set()
-    for constraint in constraint_problem.get_unsatisfied_constraints():
-        conflicted_variables.update(constraint.variables)
-    conflicted_variables -= read_only_variables
-    if tabu_size != -1:
-        untabued_conflicted_variables = conflicted_variables - set(__tabu_queue)
-        return choice(tuple(untabued_conflicted_variables))
-    return choice(tuple(conflicted_variables))
-
-
-def __get_min_conflicts_value(constraint_problem: ConstraintProblem, conflicted_variable: Variable) -> Any:
-    min_conflicts_count = float("inf")
-    min_conflicting_values = list()
-    for value in conflicted_variable.domain:
-        conflicted_variable.assign(value)
-        conflicts_count = len(constraint_problem.get_unsatisfied_constraints())
-        if conflicts_count < min_conflicts_count:
-            min_conflicts_count = conflicts_count
-            min_conflicting_values.clear()
-            min_conflicting_values.append(value)
-        elif conflicts_count == min_conflicts_count:
-            min_conflicting_values.append(value)
-        conflicted_variable.unassign()
-
-    return choice(min_conflicting_values)
-
+    constraint_problem.assign_variables_from_assignment(best_assignment)
+    return MinConflictsBatchResult(best_assignment, best_statistics.is_solved,
+                                   [statistics for values, statistics in runs_results])
+
+
+def _run_seeded_min_conflicts(task: Tuple[ConstraintProblem, Tuple[Variable, ...], int, int, int]) \
+        -> Tuple[Tuple[Any, ...], MinConflictsRunStatistics]:
+    """ Pool worker. variables were pickled along with constraint_problem, so they still refer to its (copied)
+        variables and the values are reported back positionally. """
+    constraint_problem, variables, max_steps, tabu_size, seed = task
+    start_time = perf_counter()
+    min_conflicts_search = MinConflictsSearch(constraint_problem, tabu_size, seed=seed)
+    min_conflicts_search.run(max_steps)
+    elapsed_time = perf_counter() - start_time
+    best_assignment = min_conflicts_search.get_best_assignment()
+    return tuple(best_assignment[variable] for variable in variables), \
+        min_conflicts_search.get_statistics(elapsed_time)
@@ -1,127 +1,253 @@
-from collections import deque
-from itertools import product
-from typing import Deque, Tuple, Any, Dict, List, Set, Optional, FrozenSet
-from random import choice
+from multiprocessing import Pool, cpu_count
+from functools import reduce
+from operator import mul
+from typing import Tuple, Any, Dict, Set, Optional, FrozenSet, NamedTuple, Iterator
 from csp.variable import Variable
-from csp.constraint import Constraint
 from csp.constraint_problem import ConstraintProblem
 from csp.tree_csp_solver_implementation import tree_csp_solver
+from csp.action_history import ActionsSink, get_actions_sink
+from csp.search_budget import SearchBudget
+from csp.solver_statistics import SolverStatistics
 
 
 # ///////////////////////////////////////// cutset conditioning algorithm /////////////////////////////////////////
-# 1. find a cycle cutset, i.e. a set of variables that once removed from the constraint graph, the graph becomes a tree.
-# 2. for each possible assignment to the cycle cutset variables which is consistent within their constraints:
-#   a. remove from the domains of the remaining variables any values that are inconsistent with the partial assignment.
+# 1. find a cycle cutset, i.e. a set of variables that once removed from the constraint graph, the graph becomes a
+#    forest.
+# 2. for each possible assignment to the cycle cutset variables which is consistent within their constraints, generated
+#    lazily by backtracking over the cutset variables (so inconsistent partial assignments are pruned early):
+#   a. solve the remaining forest with the tree csp solver, which only considers values consistent with the cutset's
+#      assignment.
 #   b. if the remaining CSP has a solution, return it together with the assignment for cycle cutset.
 #
 #
-# how to find cycle cutset? finding a minimal cycle cutset is NP-hard. iterative compression might be the best option.
-# but we don't require a minimal cycle cutset, just a cycle cutset.
-# ergo a naive algorithm is implemented:
-# 1. sort constrains by their lengths in descending order (longer to shorter).
-# 2. find all the variables of the first (longest) constraint.
-# 3. remove these variables from the graph, and see if it becomes a tree.
-# 4. if it is a tree:
-# 5.    go to step 2 in the aforementioned (upper) algorithm
-# 6. else:
-# 7.    repeat steps 2 and 3, but this time for first and second longest constraints, and so on...
-# NOTE: this naive algorithm is incomplete (does not guarantee to find a solution).
+# how to find cycle cutset? finding a minimal cycle cutset (a minimum feedback vertex set) is NP-hard, but we don't
+# require a minimal cycle cutset, just a small one. ergo a greedy algorithm is used on the graph of the unassigned
+# variables:
+# 1. repeatedly remove the variables with at most one neighbor, as they can't be on a cycle.
+# 2. if the graph is empty, go to step 4.
+# 3. move a variable with the most neighbors from the graph to the cutset, and go to step 1.
+# 4. going from the last variable added to the cutset to the first, drop from the cutset any variable that leaves the
+#    rest of the graph a forest when put back.
 # /////////////////////////////////////////////////////////////////////////////////////////////////////////////////
 
 
-def naive_cycle_cutset(constraint_problem: ConstraintProblem, with_history: bool = False) \
-        -> Optional[Deque[Tuple[Variable, Any]]]:
-    actions_history = None
-    if with_history:
-        actions_history = deque()
-    variables = constraint_problem.get_variables()
-    read_only_variables = constraint_problem.get_assigned_variables()
-    constraints = list(constraint_problem.get_constraints())
-    constraints.sort(key=lambda constraint: len(constraint.variables), reverse=True)
-    constraint_graph = constraint_problem.get_constraint_graph_as_adjacency_list()
-
-    for i in range(1, len(constraints)):
-        cutset_constraints = constraints[:i]
-        cutset_variables = set()
-        for cutset_const in cutset_constraints:
-            cutset_variables.update(cutset_const.variables)
-        reduced_graph = {var: neighbors for var, neighbors in constraint_graph.items() if var not in cutset_variables}
-        for var in reduced_graph:
-            reduced_graph[var] -= cutset_variables
-
-        if __is_tree(reduced_graph):
-            consistent_assignments_list = __get_consistent_assignments(cutset_variables, cutset_constraints,
-                                                                       read_only_variables)
-            non_cutset_variables = variables - cutset_variables
-            non_cutset_vars_to_original_domains_map = {var: var.domain for var in non_cutset_variables}
-
-            for consist_assignment in consistent_assignments_list:
-                for var, value in zip(cutset_variables, consist_assignment):
-                    if var not in read_only_variables:
-                        var.assign(value)
-                        if with_history:
-                            actions_history.append((var, value))
-                for non_cutset_var in non_cutset_variables:
-                    if non_cutset_var not in read_only_variables:
-                        non_cutset_var.domain = list(constraint_problem.get_consistent_domain(non_cutset_var))
-
-                tree_csp_action_history = tree_csp_solver(constraint_problem, with_history)
-                if with_history:
-                    actions_history.extend(tree_csp_action_history)
-                if constraint_problem.is_completely_consistently_assigned():
-                    return actions_history
-
-                for var in variables:
-                    if var not in read_only_variables:
-                        var.unassign()
-                        if with_history:
-                            actions_history.append((var, None))
-                for var in non_cutset_vars_to_original_domains_map:
-                    if var not in read_only_variables:
-                        var.domain = non_cutset_vars_to_original_domains_map[var]
-
+CycleCutsetReport = NamedTuple("CycleCutsetReport", [("cutset", FrozenSet[Variable]),
+                                                     ("cutset_size", int),
+                                                     ("assignments_amount", int)])
+
+
+def naive_cycle_cutset(constraint_problem: ConstraintProblem, with_history: bool = False,
+                       statistics: Optional[SolverStatistics] = None, history: Optional[ActionsSink] = None,
+                       budget: Optional[SearchBudget] = None) -> Optional[ActionsSink]:
+    """ With statistics, a node is counted, and with a budget, a node is charged, per consistent assignment of the
+        cycle cutset. If the budget is exhausted, the last cutset assignment (a consistent partial assignment) is left
+        assigned. """
+    actions_history = get_actions_sink(with_history, history)
+    if budget is not None:
+        budget.start(constraint_problem)
+    cutset_variables = __order_cutset(constraint_problem, find_cycle_cutset(constraint_problem))
+    if statistics is None:
+        is_solved = __condition_on_cutset(constraint_problem, cutset_variables, actions_history, statistics, budget)
+    else:
+        with statistics.phase("cycle_cutset"):
+            is_solved = __condition_on_cutset(statistics.get_counting_problem(constraint_problem), cutset_variables,
+                                              actions_history, statistics, budget)
+    if budget is not None:
+        budget.report(__get_status(is_solved, budget), constraint_problem.get_current_assignment())
     return actions_history
 
 
-__visited = set()
-
-
-def __is_tree(reduced_graph: Dict[Variable, Set[Variable]]) -> bool:
-    __visited.clear()
-    if not reduced_graph:
-        return False
-    root = choice(tuple(reduced_graph.keys()))
-    if __is_cyclic(reduced_graph, root, None):
-        return False
-    all_nodes = set()
-    for node, neighbor in reduced_graph.items():
-        all_nodes.add(node)
-        all_nodes.update(reduced_graph[node])
-    return len(__visited) == len(all_nodes)
-
-
-def __is_cyclic(reduced_graph: Dict[Variable, Set[Variable]], node: Variable, parent: Optional[Variable]) -> bool:
-    __visited.add(node)
-    for neighbor in reduced_graph[node]:
-        if neighbor not in __visited:
-            if __is_cyclic(reduced_graph, neighbor, node):
-                return True
-        elif neighbor != parent:
+def parallel_cycle_cutset(constraint_problem: ConstraintProblem, processes: Optional[int] = None,
+                          tasks_per_process: int = 4, budget: Optional[SearchBudget] = None) \
+        -> Optional[Dict[Variable, Any]]:
+    """ Cutset conditioning over a process pool. The consistent assignments of a prefix of the cycle cutset, long
+        enough to give about tasks_per_process tasks per process, partition the cutset assignments space. Each worker
+        conditions on the rest of the cutset on its own copy of constraint_problem. The first solution reported back is
+        assigned to constraint_problem's variables and returned, and the remaining workers are terminated. Returns None
+        if there is no solution. constraint_problem is pickled to the pool's processes, so its constraints' evaluators
+        must be picklable. With a budget, a node is charged per partition whose conditioning ended without a
+        solution, and once it is exhausted, None is returned and the remaining workers are terminated. """
+    assert 0 < tasks_per_process, "tasks_per_process must be a positive integer."
+    if budget is not None:
+        budget.start(constraint_problem)
+
+    cutset_variables = __order_cutset(constraint_problem, find_cycle_cutset(constraint_problem))
+    tasks_amount = (processes if processes is not None else cpu_count()) * tasks_per_process
+    prefix_length, prefix_assignments_amount = 0, 1
+    while prefix_length < len(cutset_variables) and prefix_assignments_amount < tasks_amount:
+        prefix_assignments_amount *= len(cutset_variables[prefix_length].domain)
+        prefix_length += 1
+    prefix_variables = cutset_variables[:prefix_length]
+    prefixes_values = [tuple(variable.value for variable in prefix_variables)
+                       for _ in __generate_consistent_assignments(constraint_problem, prefix_variables, None)]
+
+    variables = tuple(constraint_problem.get_variables())
+    tasks = [(constraint_problem, variables, cutset_variables, prefix_values) for prefix_values in prefixes_values]
+    with Pool(processes) as pool:
+        for values in pool.imap_unordered(_solve_cutset_partition, tasks):
+            if values is not None:
+                solution = dict(zip(variables, values))
+                constraint_problem.unassign_all_variables()
+                constraint_problem.assign_variables_from_assignment(solution)
+                if budget is not None:
+                    budget.report(SearchBudget.SOLVED, solution)
+                return solution
+            if budget is not None and budget.charge_node():
+                break
+    if budget is not None:
+        budget.report(__get_status(False, budget), constraint_problem.get_current_assignment())
+    return None
+
+
+def _solve_cutset_partition(task: Tuple[ConstraintProblem, Tuple[Variable, ...], Tuple[Variable, ...], tuple]) \
+        -> Optional[Tuple[Any, ...]]:
+    """ Pool worker. variables and cutset_variables were pickled along with constraint_problem, so they still refer to
+        its (copied) variables and the solution's values are reported back positionally. """
+    constraint_problem, variables, cutset_variables, prefix_values = task
+    for variable, value in zip(cutset_variables, prefix_values):
+        variable.assign(value)
+    if __condition_on_cutset(constraint_problem, cutset_variables[len(prefix_values):], None, None, None):
+        return tuple(variable.value for variable in variables)
+    return None
+
+
+def find_cycle_cutset(constraint_problem: ConstraintProblem) -> FrozenSet[Variable]:
+    """ Returns unassigned variables whose removal leaves the constraint graph of the unassigned variables a forest.
+        The cutset is minimal (no variable can be dropped from it), but not necessarily minimum. """
+    unassigned_variables = constraint_problem.get_unassigned_variables()
+    constraint_graph = constraint_problem.get_constraint_graph_as_adjacency_list()
+    reduced_graph = {variable: constraint_graph[variable] & unassigned_variables for variable in unassigned_variables}
+
+    cutset = list()
+    remaining_graph = {variable: set(neighbors) for variable, neighbors in reduced_graph.items()}
+    while True:
+        __remove_acyclic_variables(remaining_graph)
+        if not remaining_graph:
+            break
+        max_degree_variable = max(remaining_graph, key=lambda variable: len(remaining_graph[variable]))
+        __remove_variable(remaining_graph, max_degree_variable)
+        cutset.append(max_degree_variable)
+
+    cutset_set = set(cutset)
+    for variable in reversed(cutset):
+        cutset_set.remove(variable)
+        if not __is_forest(reduced_graph, cutset_set):
+            cutset_set.add(variable)
+    return frozenset(cutset_set)
+
+
+def get_cycle_cutset_report(constraint_problem: ConstraintProblem) -> CycleCutsetReport:
+    """ Reports the cycle cutset naive_cycle_cutset would condition on and how many assignments it has, an upper
+        bound on the number of tree csp solver calls. """
+    cutset = find_cycle_cutset(constraint_problem)
+    assignments_amount = reduce(mul, (len(variable.domain) for variable in cutset), 1)
+    return CycleCutsetReport(cutset, len(cutset), assignments_amount)
+
+
+def __remove_variable(graph: Dict[Variable, Set[Variable]], variable: Variable) -> None:
+    for neighbor in graph.pop(variable):
+        graph[neighbor].discard(variable)
+
+
+def __remove_acyclic_variables(graph: Dict[Variable, Set[Variable]]) -> None:
+    candidates = [variable for variable, neighbors in graph.items() if len(neighbors) <= 1]
+    while candidates:
+        variable = candidates.pop()
+        if variable not in graph or 1 < len(graph[variable]):
+            continue
+        neighbors = graph[variable]
+        __remove_variable(graph, variable)
+        candidates.extend(neighbors)
+
+
+def __is_forest(graph: Dict[Variable, Set[Variable]], excluded_variables: Set[Variable]) -> bool:
+    """ Union-find over the edges between non excluded variables: an edge within a component closes a cycle. """
+    roots = {variable: variable for variable in graph if variable not in excluded_variables}
+
+    def find(variable: Variable) -> Variable:
+        while roots[variable] is not variable:
+            roots[variable] = roots[roots[variable]]
+            variable = roots[variable]
+        return variable
+
+    visited = set()
+    for variable in roots:
+        visited.add(variable)
+        for neighbor in graph[variable]:
+            if neighbor in excluded_variables or neighbor in visited:
+                continue
+            variable_root, neighbor_root = find(variable), find(neighbor)
+            if variable_root is neighbor_root:
+                return False
+            roots[neighbor_root] = variable_root
+    return True
+
+
+def __order_cutset(constraint_problem: ConstraintProblem, cutset: FrozenSet[Variable]) -> Tuple[Variable, ...]:
+    """ Maximum cardinality order: each next variable is the one with the most neighbors among the variables already
+        ordered, so inconsistent partial assignments of the cutset are detected as early as possible. """
+    constraint_graph = constraint_problem.get_constraint_graph_as_adjacency_list()
+    ordered_neighbors_amounts = dict.fromkeys(cutset, 0)
+    ordered_variables = list()
+    while ordered_neighbors_amounts:
+        variable = max(ordered_neighbors_amounts, key=lambda candidate: (ordered_neighbors_amounts[candidate],
+                                                                          len(constraint_graph[candidate])))
+        del ordered_neighbors_amounts[variable]
+        ordered_variables.append(variable)
+        for neighbor in constraint_graph[variable]:
+            if neighbor in ordered_neighbors_amounts:
+                ordered_neighbors_amounts[neighbor] += 1
+    return tuple(ordered_variables)
+
+
+def __condition_on_cutset(constraint_problem: ConstraintProblem, cutset_variables: Tuple[Variable, ...],
+                          actions_history: Optional[ActionsSink], statistics: Optional[SolverStatistics],
+                          budget: Optional[SearchBudget]) -> bool:
+    """ Solves the forest left by each consistent assignment of cutset_variables until one has a solution, which is
+        left assigned, or until budget is exhausted. """
+    non_cutset_variables = constraint_problem.get_unassigned_variables() - frozenset(cutset_variables)
+    for _ in __generate_consistent_assignments(constraint_problem, cutset_variables, actions_history):
+        if budget is not None and budget.charge_node():
+            return False
+        if statistics is not None:
+            statistics.nodes += 1
+        tree_csp_solver(constraint_problem, history=actions_history)
+        if constraint_problem.is_completely_consistently_assigned():
             return True
+
+        for var in non_cutset_variables:
+            var.unassign()
+            if actions_history is not None:
+                actions_history.append((var, None))
     return False
 
 
-def __get_consistent_assignments(cutset_variables: Set[Variable], cutset_constraints: List[Constraint],
-                                 read_only_variables: FrozenSet[Variable]) -> list:
-    domains = [var.domain for var in cutset_variables]
-    consistent_assignments = list()
-    for assignment in product(*domains):
-        for var, value in zip(cutset_variables, assignment):
-            if var not in read_only_variables:
-                var.assign(value)
-        if all(cutset_constraints):
-            consistent_assignments.append(assignment)
-        for var in cutset_variables:
-            if var not in read_only_variables:
-                var.unassign()
-    return consistent_assignments
+def __get_status(is_solved: bool, budget: SearchBudget) -> str:
+    if is_solved:
+        return SearchBudget.SOLVED
+    return SearchBudget.TIMED_OUT if budget.is_exhausted() else SearchBudget.INFEASIBLE
+
+
+def __generate_consistent_assignments(constraint_problem: ConstraintProblem, cutset_variables: Tuple[Variable, ...],
+                                      actions_history: Optional[ActionsSink]) -> Iterator[None]:
+    """ Backtracks over the cutset variables, assigning them in place and yielding whenever all of them are assigned.
+        A value is pruned as soon as one of its variable's constraints is inconsistent with the partial assignment,
+        so no inconsistent extension of it is ever generated. """
+
+    def extend(depth: int) -> Iterator[None]:
+        if depth == len(cutset_variables):
+            yield
+            return
+        variable = cutset_variables[depth]
+        variable_constraints = constraint_problem.get_constraints_containing_variable(variable)
+        for value in variable.domain:
+            variable.assign(value)
+            if actions_history is not None:
+                actions_history.append((variable, value))
+            if all(constraint.is_consistent() for constraint in variable_constraints):
+                yield from extend(depth + 1)
+            variable.unassign()
+            if actions_history is not None:
+                actions_history.append((variable, None))
+
+    return extend(0)
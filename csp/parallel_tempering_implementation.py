@@ -0,0 +1,203 @@
+from contextlib import ExitStack
+from copy import deepcopy
+from math import exp, ceil
+from random import Random, uniform, seed
+from multiprocessing import Process, Pipe, cpu_count
+from multiprocessing.connection import Connection
+from typing import List, Sequence, Tuple, Optional, Any, Dict
+from csp.variable import Variable
+from csp.constraint_problem import ConstraintProblem
+from csp.search_events import SearchEvents
+from csp.search_budget import SearchBudget
+from csp.hill_climbing_implementations import StartStateGenerator, ScoreCalculator, MoveGenerator, \
+    ScoreDeltaCalculator, generate_start_state_randomly, consistent_constraints_amount, \
+    alter_random_variable_value_move, consistent_constraints_delta, undo_move
+
+
+# //////////////////////////////////////////////// parallel tempering /////////////////////////////////////////////////
+# the replicas are split across worker processes, each of which gets its own copy of the constraint problem once,
+# when it starts, and keeps its replicas resident for the whole run. replicas are annealed in place by moves, so their
+# variables never change, and states are reported back positionally, as tuples holding the values of the variables in
+# a fixed order. each round, a worker is only sent the temperatures of its replicas, and only sends back their scores
+# and the values of the best state each replica reached. adjacent replicas are exchanged by swapping their
+# temperatures rather than their states, so no state ever travels between processes.
+# /////////////////////////////////////////////////////////////////////////////////////////////////////////////////
+
+
+Values = Tuple[Any, ...]
+
+
+def geometric_temperature_ladder(min_temperature: float, max_temperature: float, replicas_amount: int) \
+        -> List[float]:
+    assert 0 < min_temperature <= max_temperature, "temperatures must satisfy 0 < min_temperature <= max_temperature."
+    assert 1 < replicas_amount, "parallel tempering requires at least two replicas."
+    ratio = (max_temperature / min_temperature) ** (1 / (replicas_amount - 1))
+    return [min_temperature * ratio ** i for i in range(replicas_amount)]
+
+
+def parallel_tempering(constraint_problem: ConstraintProblem, max_steps: int, temperatures: Sequence[float],
+                       exchange_interval: int,
+                       generate_start_state: StartStateGenerator = generate_start_state_randomly,
+                       generate_move: MoveGenerator = alter_random_variable_value_move,
+                       calculate_score: ScoreCalculator = consistent_constraints_amount,
+                       calculate_score_delta: ScoreDeltaCalculator = consistent_constraints_delta,
+                       processes: Optional[int] = None, random_seed: Optional[int] = None,
+                       events: Optional[SearchEvents] = None,
+                       budget: Optional[SearchBudget] = None) -> ConstraintProblem:
+    """ Replica exchange simulated annealing. One replica per temperature is annealed at that fixed temperature, like
+        move_based_simulated_annealing does, for exchange_interval steps, then adjacent replicas swap temperatures by
+        the Metropolis criterion. Stops after max_steps steps per replica, or as soon as a replica is a solution.
+        The highest scoring state seen is assigned to constraint_problem, which is returned. The replicas live in
+        processes (at most one per replica) which get constraint_problem when they start, so the constraints'
+        evaluators and the given generators and calculators must be picklable (e.g. module level functions or
+        instances of module level classes). With a budget, a node is charged per round. """
+    assert 1 < len(temperatures), "parallel tempering requires at least two temperatures."
+    assert 0 < exchange_interval, "exchange_interval must be a positive integer."
+    if budget is not None:
+        budget.start(constraint_problem)
+    with ExitStack() as phase_stack:
+        if events is not None:
+            phase_stack.enter_context(events.phase("parallel_tempering"))
+        best_assignment = __parallel_tempering(constraint_problem, max_steps, sorted(temperatures), exchange_interval,
+                                               generate_start_state, generate_move, calculate_score,
+                                               calculate_score_delta, processes, random_seed, budget)
+
+    constraint_problem.unassign_all_variables()
+    constraint_problem.assign_variables_from_assignment(best_assignment)
+    if events is not None and constraint_problem.is_completely_consistently_assigned():
+        events.emit(SearchEvents.SOLUTION, constraint_problem.get_current_assignment())
+    if budget is not None:
+        budget.report_assignment(constraint_problem)
+    return constraint_problem
+
+
+def __parallel_tempering(constraint_problem: ConstraintProblem, max_steps: int, temperatures: List[float],
+                         exchange_interval: int, generate_start_state: StartStateGenerator,
+                         generate_move: MoveGenerator, calculate_score: ScoreCalculator,
+                         calculate_score_delta: ScoreDeltaCalculator, processes: Optional[int],
+                         random_seed: Optional[int], budget: Optional[SearchBudget]) -> Dict[Variable, Any]:
+    """ Returns the highest scoring assignment seen. """
+    variables = tuple(constraint_problem.get_variables())
+    replicas_amount = len(temperatures)
+    workers_amount = min(processes if processes is not None else cpu_count(), replicas_amount)
+    master_random = Random(random_seed)
+    connections = list()
+    workers = list()
+    try:
+        for i in range(workers_amount):
+            connection, worker_connection = Pipe()
+            worker = Process(target=_run_replicas,
+                             args=(worker_connection, constraint_problem, variables,
+                                   len(range(i, replicas_amount, workers_amount)), generate_start_state,
+                                   generate_move, calculate_score, calculate_score_delta,
+                                   master_random.getrandbits(32)),
+                             daemon=True)
+            worker.start()
+            worker_connection.close()
+            connections.append(connection)
+            workers.append(worker)
+
+        scores = [0] * replicas_amount
+        best_score, best_values = float("-inf"), None
+        for j, (score, values, is_solved) in __receive_results(connections, replicas_amount):
+            scores[j] = score
+            if is_solved:
+                return dict(zip(variables, values))
+            if best_score < score:
+                best_score, best_values = score, values
+
+        ladder = list(range(replicas_amount))  # ladder[j] is the replica annealed at temperatures[j]
+        replicas_temperatures = list(temperatures)
+        for i in range(ceil(max_steps / exchange_interval)):
+            if budget is not None and budget.charge_node():
+                break
+            steps = min(exchange_interval, max_steps - i * exchange_interval)
+            for j, connection in enumerate(connections):
+                connection.send([(replicas_temperatures[k], steps)
+                                 for k in range(j, replicas_amount, workers_amount)])
+            for j, (score, round_best_score, round_best_values, is_solved) in \
+                    __receive_results(connections, replicas_amount):
+                scores[j] = score
+                if is_solved:
+                    return dict(zip(variables, round_best_values))
+                if best_score < round_best_score:
+                    best_score, best_values = round_best_score, round_best_values
+
+            for j in range(i % 2, replicas_amount - 1, 2):
+                colder_replica, hotter_replica = ladder[j], ladder[j + 1]
+                exponent = (scores[hotter_replica] - scores[colder_replica]) * \
+                    (1 / temperatures[j] - 1 / temperatures[j + 1])
+                if exponent >= 0 or master_random.uniform(0, 1) < exp(exponent):
+                    ladder[j], ladder[j + 1] = hotter_replica, colder_replica
+                    replicas_temperatures[hotter_replica] = temperatures[j]
+                    replicas_temperatures[colder_replica] = temperatures[j + 1]
+        return dict(zip(variables, best_values))
+    finally:
+        for connection in connections:
+            connection.send(None)
+            connection.close()
+        for worker in workers:
+            worker.join()
+
+
+def _run_replicas(connection: Connection, constraint_problem: ConstraintProblem, variables: Tuple[Variable, ...],
+                  replicas_amount: int, generate_start_state: StartStateGenerator, generate_move: MoveGenerator,
+                  calculate_score: ScoreCalculator, calculate_score_delta: ScoreDeltaCalculator,
+                  worker_seed: int) -> None:
+    """ Worker process: keeps replicas_amount copies of constraint_problem and anneals each of them, every round, at
+        the temperature it is sent, until it is sent None. The process' random module is re-seeded since forked
+        workers inherit identical random states. """
+    seed(worker_seed)
+    replicas = list()
+    start_states = list()
+    for i in range(replicas_amount):
+        replica_problem, replica_variables = deepcopy((constraint_problem, variables))
+        generate_start_state(replica_problem)
+        score = calculate_score(replica_problem)
+        replicas.append([replica_problem, replica_variables, score])
+        start_states.append((score, __get_values(replica_variables),
+                             replica_problem.is_completely_consistently_assigned()))
+    connection.send(start_states)
+
+    task = connection.recv()
+    while task is not None:
+        results = list()
+        for replica, (temperature, steps) in zip(replicas, task):
+            results.append(__anneal_replica(replica, temperature, steps, generate_move, calculate_score_delta))
+        connection.send(results)
+        task = connection.recv()
+    connection.close()
+
+
+def __receive_results(connections: List[Connection], replicas_amount: int) -> List[Tuple[int, tuple]]:
+    """ Receives the results of every worker before any of them is looked at, so no worker is left blocked on
+        sending its results. Worker i holds the replicas i, i + len(connections), i + 2 * len(connections), ... """
+    workers_results = [connection.recv() for connection in connections]
+    return [(j, result) for i, worker_results in enumerate(workers_results)
+            for j, result in zip(range(i, replicas_amount, len(connections)), worker_results)]
+
+
+def __anneal_replica(replica: list, temperature: float, steps: int, generate_move: MoveGenerator,
+                     calculate_score_delta: ScoreDeltaCalculator) -> Tuple[int, int, Values, bool]:
+    """ Fixed temperature move based simulated annealing of a replica in place. Returns its score, and the score and
+        values of the best state it reached, and whether that state is a solution. """
+    replica_problem, replica_variables, curr_score = replica
+    best_score, best_values = curr_score, __get_values(replica_variables)
+    for i in range(steps):
+        move = generate_move(replica_problem)
+        delta = calculate_score_delta(replica_problem, move)
+        if delta > 0 or uniform(0, 1) < exp(delta / temperature):
+            curr_score += delta
+            if best_score < curr_score:
+                best_score, best_values = curr_score, __get_values(replica_variables)
+                if replica_problem.is_completely_consistently_assigned():
+                    replica[2] = curr_score
+                    return curr_score, best_score, best_values, True
+        else:
+            undo_move(move)
+    replica[2] = curr_score
+    return curr_score, best_score, best_values, False
+
+
+def __get_values(variables: Tuple[Variable, ...]) -> Values:
+    return tuple(variable.value for variable in variables)
@@ -1,22 +1,86 @@
+from contextlib import ExitStack
 from collections import deque
+from typing import Dict, List, Tuple, Any, Set, Optional
 from csp.variable import Variable
 from csp.constraint_problem import ConstraintProblem
+from csp.solver_statistics import SolverStatistics
+from csp.search_events import SearchEvents
+from csp.search_budget import SearchBudget
 
 
-def pc2(constraint_problem: ConstraintProblem) -> bool:
-    variable_diffvariable_neighbor_triplets = deque()
+# ////////////////////////////////////////////////////// pc2 //////////////////////////////////////////////////////////
+# path consistency over the constrained pairs of variables only (the edges of the constraint graph), so only
+# triangles of the graph are revised and no O(n^3) triples are ever materialized.
+# the binary relation of each edge (x, y) is a bit matrix: relations[(x, y)][i] is an int whose j-th bit is set iff
+# x's i-th value and y's j-th value are consistent with the constraints x and y share. composing two relations is an
+# or of rows, so revising (x, z) through y is: relations[(x, z)][i] &= OR of relations[(y, z)][j] for j in
+# relations[(x, y)][i]. a queue holds the edges whose relation changed, and processing an edge (x, y) only revises
+# the edges of the triangles it is part of. a value whose row becomes empty has no support, so it is removed from all
+# of its variable's relations. at the end, the dead values are removed from the variables' domains.
+# /////////////////////////////////////////////////////////////////////////////////////////////////////////////////
+
+
+def pc2(constraint_problem: ConstraintProblem, statistics: Optional[SolverStatistics] = None,
+        events: Optional[SearchEvents] = None, budget: Optional[SearchBudget] = None) -> bool:
+    """ With a budget, a node is charged per changed edge. """
+    if budget is not None:
+        budget.start(constraint_problem)
+    with ExitStack() as phase_stack:
+        searched_problem = constraint_problem
+        if statistics is not None:
+            searched_problem = statistics.get_counting_problem(constraint_problem)
+            phase_stack.enter_context(statistics.phase("pc2"))
+        if events is not None:
+            phase_stack.enter_context(events.phase("pc2"))
+        is_consistent = __pc2(searched_problem, statistics, events, budget)
+    if budget is not None:
+        budget.report_consistency(constraint_problem, is_consistent)
+    return is_consistent
+
+
+def __pc2(constraint_problem: ConstraintProblem, statistics: Optional[SolverStatistics],
+          events: Optional[SearchEvents], budget: Optional[SearchBudget]) -> bool:
+    constraint_graph = constraint_problem.get_constraint_graph_as_adjacency_list()
     variables = constraint_problem.get_variables()
-    for var in variables:
-        for neighbor in constraint_problem.get_neighbors(var):
-            for different_variable in variables - {var, neighbor}:
-                variable_diffvariable_neighbor_triplets.append((var, different_variable, neighbor))
+    candidates = {variable: (variable.value,) if variable else tuple(variable.domain) for variable in variables}
+    relations = get_bit_matrix_relations(constraint_problem, candidates)
+    alive_values = {variable: (1 << len(variable_candidates)) - 1 for variable, variable_candidates in
+                    candidates.items()}
 
-    while variable_diffvariable_neighbor_triplets:
-        var, different_variable, neighbor = variable_diffvariable_neighbor_triplets.popleft()
-        if __revise3(constraint_problem, var, neighbor, different_variable):
-            for different_variable in variables - {var, neighbor}:
-                variable_diffvariable_neighbor_triplets.append((different_variable, var, neighbor))
-                variable_diffvariable_neighbor_triplets.append((different_variable, neighbor, var))
+    changed_edges = deque(edge for edge in relations if id(edge[0]) < id(edge[1]))
+    queued_edges = set(changed_edges)
+    for variable in variables:
+        if not __remove_unsupported_values(variable, constraint_graph, relations, alive_values, changed_edges,
+                                           queued_edges):
+            return False
+
+    while changed_edges:
+        if budget is not None and budget.charge_node():
+            break
+        edge = changed_edges.popleft()
+        queued_edges.discard(edge)
+        x, y = edge
+        for z in constraint_graph[x] & constraint_graph[y]:
+            for variable, through_variable in ((x, y), (y, x)):
+                if __revise3(relations, variable, through_variable, z):
+                    __enqueue_edge(variable, z, changed_edges, queued_edges)
+                    for revised_variable in (variable, z):
+                        if not __remove_unsupported_values(revised_variable, constraint_graph, relations,
+                                                           alive_values, changed_edges, queued_edges):
+                            return False
+
+    for variable in variables:
+        dead_values = [value for i, value in enumerate(candidates[variable]) if not alive_values[variable] >> i & 1]
+        if variable:
+            if dead_values:
+                return False
+            continue
+        for value in dead_values:
+            variable.remove_from_domain(value)
+            if statistics is not None:
+                statistics.pruned_values += 1
+            if events is not None:
+                events.emit(SearchEvents.PRUNE, variable, value)
 
     for var in variables:
         if not var.domain or not constraint_problem.get_consistent_domain(var):
@@ -24,31 +88,98 @@ def pc2(constraint_problem: ConstraintProblem) -> bool:
     return True
 
 
-def __revise3(constraints_problem: ConstraintProblem, variable: Variable, neighbor: Variable,
-              different_variable: Variable) -> bool:
-    any_revised = False
-    for variable_value in variable.domain:
-        variable_was_assigned = False if variable.value is None else True
-        if not variable_was_assigned:
-            variable.assign(variable_value)
-
-        curr_revised = False
-        inconsistent_neighbor_values = list()
-        neighbor_was_assigned = False if neighbor.value is None else True
-        for neighbor_value in neighbor.domain:
-            if not neighbor_was_assigned:
-                neighbor.assign(neighbor_value)
-            if not constraints_problem.get_consistent_domain(different_variable):
-                inconsistent_neighbor_values.append(neighbor_value)
-                curr_revised, any_revised = True, True
-            if not neighbor_was_assigned:
-                neighbor.unassign()
-
-        if not variable_was_assigned:
-            variable.unassign()
-        if curr_revised:
-            variable.remove_from_domain(variable_value)
-            for value in inconsistent_neighbor_values:
-                neighbor.remove_from_domain(value)
+def get_bit_matrix_relations(constraint_problem: ConstraintProblem, candidates: Dict[Variable, Tuple[Any, ...]]) \
+        -> Dict[Tuple[Variable, Variable], List[int]]:
+    """ Builds the bit matrices of both directions of every edge of the constraint graph, over the variables'
+        candidate values. The constraints are evaluated once per pair of candidates. """
+    current_assignment = constraint_problem.get_current_assignment()
+    constraint_graph = constraint_problem.get_constraint_graph_as_adjacency_list()
+    relations = dict()
+    for x in candidates:
+        for y in constraint_graph[x]:
+            if (y, x) in relations:
+                continue
+            shared_constraints = constraint_problem.get_constraints_containing_variable(x) & \
+                constraint_problem.get_constraints_containing_variable(y)
+            x_rows = [0] * len(candidates[x])
+            y_rows = [0] * len(candidates[y])
+            for i, x_value in enumerate(candidates[x]):
+                current_assignment[x] = x_value
+                for j, y_value in enumerate(candidates[y]):
+                    current_assignment[y] = y_value
+                    if all(constraint.is_consistent_with(current_assignment) for constraint in shared_constraints):
+                        x_rows[i] |= 1 << j
+                        y_rows[j] |= 1 << i
+            current_assignment[x], current_assignment[y] = x.value, y.value
+            relations[(x, y)], relations[(y, x)] = x_rows, y_rows
+    return relations
 
+
+def __revise3(relations: Dict[Tuple[Variable, Variable], List[int]], variable: Variable, through_variable: Variable,
+              other_variable: Variable) -> bool:
+    """ Restricts the relation of (variable, other_variable) to the pairs which have a common support in
+        through_variable, keeping the transposed relation in sync. """
+    rows = relations[(variable, through_variable)]
+    through_rows = relations[(through_variable, other_variable)]
+    revised_rows = relations[(variable, other_variable)]
+    transposed_rows = relations[(other_variable, variable)]
+    any_revised = False
+    for i, row in enumerate(rows):
+        revised_row = revised_rows[i]
+        if not revised_row:
+            continue
+        composed_row = 0
+        while row:
+            lowest_bit = row & -row
+            composed_row |= through_rows[lowest_bit.bit_length() - 1]
+            row ^= lowest_bit
+        removed_bits = revised_row & ~composed_row
+        if removed_bits:
+            revised_rows[i] = revised_row & composed_row
+            __clear_column(transposed_rows, removed_bits, i)
+            any_revised = True
     return any_revised
+
+
+def __remove_unsupported_values(variable: Variable, constraint_graph: Dict[Variable, Set[Variable]],
+                                relations: Dict[Tuple[Variable, Variable], List[int]], alive_values: Dict[Variable, int],
+                                changed_edges: deque, queued_edges: set) -> bool:
+    """ Kills the variable's values which have no support in one of its relations. Returns False iff its domain is
+        wiped out. """
+    unsupported_values = 0
+    for neighbor in constraint_graph[variable]:
+        for i, row in enumerate(relations[(variable, neighbor)]):
+            if not row and alive_values[variable] >> i & 1:
+                unsupported_values |= 1 << i
+    if not unsupported_values:
+        return True
+
+    alive_values[variable] &= ~unsupported_values
+    for neighbor in constraint_graph[variable]:
+        rows = relations[(variable, neighbor)]
+        transposed_rows = relations[(neighbor, variable)]
+        removed_values = unsupported_values
+        while removed_values:
+            lowest_bit = removed_values & -removed_values
+            i = lowest_bit.bit_length() - 1
+            __clear_column(transposed_rows, rows[i], i)
+            rows[i] = 0
+            removed_values ^= lowest_bit
+        __enqueue_edge(variable, neighbor, changed_edges, queued_edges)
+    return alive_values[variable] != 0
+
+
+def __clear_column(rows: List[int], row_indices: int, column: int) -> None:
+    """ Clears the column's bit in each row whose index is set in row_indices. """
+    column_mask = ~(1 << column)
+    while row_indices:
+        lowest_bit = row_indices & -row_indices
+        rows[lowest_bit.bit_length() - 1] &= column_mask
+        row_indices ^= lowest_bit
+
+
+def __enqueue_edge(variable: Variable, other_variable: Variable, changed_edges: deque, queued_edges: set) -> None:
+    edge = (variable, other_variable) if id(variable) < id(other_variable) else (other_variable, variable)
+    if edge not in queued_edges:
+        queued_edges.add(edge)
+        changed_edges.append(edge)
@@ -0,0 +1,237 @@
+from contextlib import ExitStack
+from multiprocessing import Process, Pipe, cpu_count
+from multiprocessing.connection import Connection
+from typing import List, Tuple, Dict, Optional, Any, Iterator, Iterable
+from csp.variable import Variable
+from csp.constraint_problem import ConstraintProblem
+from csp.pc2_implementation import get_bit_matrix_relations
+from csp.solver_statistics import SolverStatistics
+from csp.search_events import SearchEvents
+from csp.search_budget import SearchBudget
+
+
+# /////////////////////////////////////////// singleton arc consistency ///////////////////////////////////////////////
+# a value is singleton arc consistent if restricting its variable's domain to it and enforcing arc consistency
+# doesn't wipe out any domain. values which are not are removed, and the test is repeated until no value is removed.
+# the constraints are evaluated only once: every edge (x, y) of the constraint graph gets a bit matrix relation
+# (relations[(x, y)][i] has the j-th bit set iff x's i-th value and y's j-th value are consistent), domains are int
+# bitsets, and arc consistency is enforced on these bitsets.
+# propagation state is reused between tests: the arc consistent domains a value's test ended with are kept, and as
+# long as they are contained in the current domains, they are still arc consistent, so the value is not re-tested.
+# /////////////////////////////////////////////////////////////////////////////////////////////////////////////////
+
+
+Relations = Dict[Tuple[int, int], List[int]]
+
+
+def sac(constraint_problem: ConstraintProblem, statistics: Optional[SolverStatistics] = None,
+        events: Optional[SearchEvents] = None, budget: Optional[SearchBudget] = None) -> bool:
+    """ With a budget, a node is charged per value test. """
+    if budget is not None:
+        budget.start(constraint_problem)
+    with ExitStack() as phase_stack:
+        searched_problem = constraint_problem
+        if statistics is not None:
+            searched_problem = statistics.get_counting_problem(constraint_problem)
+            phase_stack.enter_context(statistics.phase("sac"))
+        if events is not None:
+            phase_stack.enter_context(events.phase("sac"))
+        is_consistent = __sac(searched_problem, statistics, events, budget)
+    if budget is not None:
+        budget.report_consistency(constraint_problem, is_consistent)
+    return is_consistent
+
+
+def __sac(constraint_problem: ConstraintProblem, statistics: Optional[SolverStatistics],
+          events: Optional[SearchEvents], budget: Optional[SearchBudget]) -> bool:
+    variables, candidates, neighbors, relations = __initialize_sac(constraint_problem)
+    domains = [(1 << len(variable_candidates)) - 1 for variable_candidates in candidates]
+    if not _propagate(domains, neighbors, relations, range(len(variables))):
+        return False
+
+    closures = dict()
+    removed_any = True
+    while removed_any:
+        removed_any = False
+        for i in range(len(variables)):
+            for value_index in _get_set_bits(domains[i]):
+                if not domains[i] >> value_index & 1:
+                    continue
+                closure = closures.get((i, value_index))
+                if closure is not None and all(not closure_domain & ~domain
+                                               for closure_domain, domain in zip(closure, domains)):
+                    continue
+                if budget is not None and budget.charge_node():
+                    return __apply_domains(constraint_problem, variables, candidates, domains, statistics, events)
+                closure = _get_singleton_closure(domains, neighbors, relations, i, value_index)
+                if closure is not None:
+                    closures[(i, value_index)] = closure
+                    continue
+                domains[i] &= ~(1 << value_index)
+                removed_any = True
+                if not _propagate(domains, neighbors, relations, (i,)):
+                    return False
+
+    return __apply_domains(constraint_problem, variables, candidates, domains, statistics, events)
+
+
+def parallel_sac(constraint_problem: ConstraintProblem, processes: Optional[int] = None,
+                 statistics: Optional[SolverStatistics] = None, events: Optional[SearchEvents] = None,
+                 budget: Optional[SearchBudget] = None) -> bool:
+    """ Singleton arc consistency over worker processes. The variables are split across the processes, which test
+        their variables' values against each round's domains. The values whose test failed are removed, arc
+        consistency is re-established, and rounds are repeated until no value is removed. Only the bit matrix
+        relations (not the constraints) are sent to the processes, once, when they start, so evaluators need not be
+        picklable. Each round only sends the domains. With a budget, a node is charged per round. """
+    if budget is not None:
+        budget.start(constraint_problem)
+    with ExitStack() as phase_stack:
+        searched_problem = constraint_problem
+        if statistics is not None:
+            searched_problem = statistics.get_counting_problem(constraint_problem)
+            phase_stack.enter_context(statistics.phase("parallel_sac"))
+        if events is not None:
+            phase_stack.enter_context(events.phase("parallel_sac"))
+        is_consistent = __parallel_sac(searched_problem, processes, statistics, events, budget)
+    if budget is not None:
+        budget.report_consistency(constraint_problem, is_consistent)
+    return is_consistent
+
+
+def __parallel_sac(constraint_problem: ConstraintProblem, processes: Optional[int],
+                   statistics: Optional[SolverStatistics], events: Optional[SearchEvents],
+                   budget: Optional[SearchBudget]) -> bool:
+    variables, candidates, neighbors, relations = __initialize_sac(constraint_problem)
+    domains = [(1 << len(variable_candidates)) - 1 for variable_candidates in candidates]
+    if not _propagate(domains, neighbors, relations, range(len(variables))):
+        return False
+
+    processes_amount = processes if processes is not None else cpu_count()
+    connections = list()
+    workers = list()
+    try:
+        for i in range(processes_amount):
+            connection, worker_connection = Pipe()
+            worker = Process(target=_test_values,
+                             args=(worker_connection, neighbors, relations, range(i, len(variables), processes_amount)),
+                             daemon=True)
+            worker.start()
+            worker_connection.close()
+            connections.append(connection)
+            workers.append(worker)
+
+        while True:
+            if budget is not None and budget.charge_node():
+                break
+            for connection in connections:
+                connection.send(domains)
+            unsupported_values = [unsupported_value for connection in connections
+                                  for unsupported_value in connection.recv()]
+            if not unsupported_values:
+                break
+            for i, value_index in unsupported_values:
+                domains[i] &= ~(1 << value_index)
+            if not _propagate(domains, neighbors, relations, {i for i, value_index in unsupported_values}):
+                return False
+    finally:
+        for connection in connections:
+            connection.send(None)
+            connection.close()
+        for worker in workers:
+            worker.join()
+
+    return __apply_domains(constraint_problem, variables, candidates, domains, statistics, events)
+
+
+def _test_values(connection: Connection, neighbors: List[List[int]], relations: Relations,
+                 variables_indices: range) -> None:
+    """ Worker process: keeps the graph and the relations, which don't change between rounds, and the indices of the
+        variables whose values it tests. Each round, it is sent the domains and sends back the (variable index, value
+        index) pairs of its variables which are not singleton arc consistent, until it is sent None. """
+    domains = connection.recv()
+    while domains is not None:
+        connection.send([(i, value_index) for i in variables_indices for value_index in _get_set_bits(domains[i])
+                         if _get_singleton_closure(domains, neighbors, relations, i, value_index) is None])
+        domains = connection.recv()
+    connection.close()
+
+
+def _get_singleton_closure(domains: List[int], neighbors: List[List[int]], relations: Relations, i: int,
+                           value_index: int) -> Optional[Tuple[int, ...]]:
+    """ Returns the arc consistent domains reached after restricting the i-th domain to value_index, or None if a
+        domain is wiped out. """
+    test_domains = list(domains)
+    test_domains[i] = 1 << value_index
+    if _propagate(test_domains, neighbors, relations, (i,)):
+        return tuple(test_domains)
+    return None
+
+
+def _propagate(domains: List[int], neighbors: List[List[int]], relations: Relations,
+               changed_variables: Iterable[int]) -> bool:
+    """ Enforces arc consistency on domains in place, starting from the revisions the changed variables cause.
+        Returns False iff a domain is wiped out. """
+    queue = list(changed_variables)
+    queued = set(queue)
+    while queue:
+        j = queue.pop()
+        queued.discard(j)
+        for i in neighbors[j]:
+            rows = relations[(i, j)]
+            j_domain = domains[j]
+            revised_domain = domains[i]
+            for value_index in _get_set_bits(revised_domain):
+                if not rows[value_index] & j_domain:
+                    revised_domain &= ~(1 << value_index)
+            if revised_domain != domains[i]:
+                if not revised_domain:
+                    return False
+                domains[i] = revised_domain
+                if i not in queued:
+                    queued.add(i)
+                    queue.append(i)
+    return True
+
+
+def _get_set_bits(bitset: int) -> Iterator[int]:
+    while bitset:
+        lowest_bit = bitset & -bitset
+        yield lowest_bit.bit_length() - 1
+        bitset ^= lowest_bit
+
+
+def __initialize_sac(constraint_problem: ConstraintProblem) \
+        -> Tuple[Tuple[Variable, ...], List[Tuple[Any, ...]], List[List[int]], Relations]:
+    """ Indexes the variables and builds the bit matrix relations of both directions of every constraint graph edge,
+        with an assigned variable's value as its only candidate. """
+    variables = tuple(constraint_problem.get_variables())
+    variables_indices = {variable: i for i, variable in enumerate(variables)}
+    candidates = [(variable.value,) if variable else tuple(variable.domain) for variable in variables]
+    constraint_graph = constraint_problem.get_constraint_graph_as_adjacency_list()
+    neighbors = [[variables_indices[neighbor] for neighbor in constraint_graph[variable]] for variable in variables]
+
+    variables_relations = get_bit_matrix_relations(constraint_problem, dict(zip(variables, candidates)))
+    relations = {(variables_indices[x], variables_indices[y]): rows for (x, y), rows in variables_relations.items()}
+    return variables, candidates, neighbors, relations
+
+
+def __apply_domains(constraint_problem: ConstraintProblem, variables: Tuple[Variable, ...],
+                    candidates: List[Tuple[Any, ...]], domains: List[int], statistics: Optional[SolverStatistics],
+                    events: Optional[SearchEvents]) -> bool:
+    for variable, variable_candidates, domain in zip(variables, candidates, domains):
+        dead_values = [value for j, value in enumerate(variable_candidates) if not domain >> j & 1]
+        if variable:
+            if dead_values:
+                return False
+            continue
+        for value in dead_values:
+            variable.remove_from_domain(value)
+            if statistics is not None:
+                statistics.pruned_values += 1
+            if events is not None:
+                events.emit(SearchEvents.PRUNE, variable, value)
+
+    for var in constraint_problem.get_variables():
+        if not var.domain or not constraint_problem.get_consistent_domain(var):
+            return False
+    return True
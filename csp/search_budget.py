@@ -0,0 +1,164 @@
+from sys import platform
+from time import perf_counter
+from typing import Dict, Any, Optional, NamedTuple
+from csp.variable import Variable
+from csp.constraint_problem import ConstraintProblem
+try:
+    import resource
+except ImportError:  # not available on Windows, where memory limits are not supported.
+    resource = None
+
+
+SolverResult = NamedTuple("SolverResult", [("status", str),
+                                           ("assignment", Dict[Variable, Any]),
+                                           ("exhausted_limit", Optional[str]),
+                                           ("nodes", int),
+                                           ("elapsed_time", float)])
+
+
+class BudgetExhaustedError(Exception):
+    """ Raised within a search whose budget is exhausted, and caught by the solver which was given the budget. """
+
+    def __init__(self, exhausted_limit: str) -> None:
+        super(BudgetExhaustedError, self).__init__("the search's " + exhausted_limit + " limit is exhausted.")
+        self.exhausted_limit = exhausted_limit
+
+
+class SearchBudget:
+    """ Wall-clock, nodes and memory limits of a single solver run. A solver given a budget charges it once per node
+        (an assignment, a step of local search, or the unit of work the solver documents, e.g. a revision) and stops
+        as soon as one of the limits is exhausted. Only the nodes
+        limit is checked on every node; the time and memory limits are checked every check_interval nodes, so solving
+        within a budget costs (almost) nothing more. When the run ends, the solver reports its outcome on the budget
+        (see get_result):
+        1. SOLVED: assignment is a solution (the first one, if all solutions were searched for).
+        2. INFEASIBLE: a systematic search ended without a solution, or a propagation wiped out a domain, hence there
+                       is no solution.
+        3. CONSISTENT: a propagation (e.g. ac4 or i_consistency) ended without wiping out a domain.
+        4. TIMED_OUT: the run stopped before any of these. exhausted_limit is TIME, NODES or MEMORY if the budget
+                      stopped it, and None if the solver's own limit (steps, tries or restarts of local search) did.
+                      assignment is the best one found: the largest consistent partial assignment for systematic
+                      search, or the assignment with the best score for local search. It is left assigned to the
+                      problem. A propagation which is stopped keeps the values it removed, as they have no support
+                      anyway.
+        memory_limit is the amount of bytes the process' peak resident memory may grow by during the run. A budget may
+        be reused for consecutive runs, each of which starts it over. """
+
+    SOLVED = "solved"
+    INFEASIBLE = "infeasible"
+    CONSISTENT = "consistent"
+    TIMED_OUT = "timed_out"
+
+    TIME = "time"
+    NODES = "nodes"
+    MEMORY = "memory"
+
+    def __init__(self, time_limit: Optional[float] = None, nodes_limit: Optional[int] = None,
+                 memory_limit: Optional[int] = None, check_interval: int = 64) -> None:
+        assert 0 < check_interval, "check_interval must be a positive integer."
+        assert memory_limit is None or resource is not None, "memory limits are not supported on this platform."
+        self.__time_limit = time_limit
+        self.__nodes_limit = nodes_limit
+        self.__memory_limit = memory_limit
+        self.__check_interval = check_interval
+        self.__constraint_problem = None
+        self.__start_time = 0.0
+        self.__deadline = float("inf")
+        self.__start_memory = 0
+        self.__nodes = 0
+        self.__depth = 0
+        self.__best_depth = 0
+        self.__start_assignment = None
+        self.__best_assignment = None
+        self.__exhausted_limit = None
+        self.__result = None
+
+    def start(self, constraint_problem: ConstraintProblem) -> None:
+        self.__constraint_problem = constraint_problem
+        self.__start_time = perf_counter()
+        if self.__time_limit is not None:
+            self.__deadline = self.__start_time + self.__time_limit
+        if self.__memory_limit is not None:
+            self.__start_memory = _get_peak_memory()
+        self.__nodes = 0
+        self.__depth = 0
+        self.__best_depth = 0
+        self.__start_assignment = constraint_problem.get_current_assignment()
+        self.__best_assignment = self.__start_assignment
+        self.__exhausted_limit = None
+        self.__result = None
+
+    def charge_node(self) -> bool:
+        """ Charges a node, and returns whether the budget is exhausted (in which case the node isn't charged). """
+        if self.__nodes_limit is not None and self.__nodes_limit <= self.__nodes:
+            self.__exhausted_limit = SearchBudget.NODES
+            return True
+        self.__nodes += 1
+        if self.__nodes % self.__check_interval == 0:
+            if self.__deadline < perf_counter():
+                self.__exhausted_limit = SearchBudget.TIME
+            elif self.__memory_limit is not None and \
+                    self.__start_memory + self.__memory_limit < _get_peak_memory():
+                self.__exhausted_limit = SearchBudget.MEMORY
+        return self.__exhausted_limit is not None
+
+    def enter_node(self, variable: Variable) -> bool:
+        """ Charges the node of systematic search which assigned variable, keeping track of the largest consistent
+            partial assignment. The classic searches go deeper from inconsistent partial assignments as well, so the
+            whole partial assignment is checked, though only when the node is charged and the search is deeper than
+            ever. """
+        if self.charge_node():
+            return True
+        self.__depth += 1
+        if self.__best_depth < self.__depth and self.__constraint_problem.is_consistently_assigned():
+            self.__best_depth = self.__depth
+            self.__best_assignment = self.__constraint_problem.get_current_assignment()
+        return False
+
+    def leave_node(self) -> None:
+        self.__depth -= 1
+
+    def is_exhausted(self) -> bool:
+        return self.__exhausted_limit is not None
+
+    def get_exhausted_limit(self) -> Optional[str]:
+        return self.__exhausted_limit
+
+    def get_start_assignment(self) -> Optional[Dict[Variable, Any]]:
+        return self.__start_assignment
+
+    def get_best_assignment(self) -> Optional[Dict[Variable, Any]]:
+        """ The largest consistent partial assignment systematic search reached (the assignment it started from, if
+            none). """
+        return self.__best_assignment
+
+    def report(self, status: str, assignment: Dict[Variable, Any]) -> SolverResult:
+        self.__result = SolverResult(status, assignment, self.__exhausted_limit, self.__nodes,
+                                     perf_counter() - self.__start_time)
+        return self.__result
+
+    def report_assignment(self, constraint_problem: ConstraintProblem) -> SolverResult:
+        """ Reports the outcome of a local search, whose best assignment is assigned to constraint_problem. """
+        status = SearchBudget.SOLVED if constraint_problem.is_completely_consistently_assigned() else \
+            SearchBudget.TIMED_OUT
+        return self.report(status, constraint_problem.get_current_assignment())
+
+    def report_consistency(self, constraint_problem: ConstraintProblem, is_consistent: bool) -> SolverResult:
+        """ Reports the outcome of a propagation, which returned is_consistent. """
+        if not is_consistent:
+            status = SearchBudget.INFEASIBLE
+        elif self.__exhausted_limit is not None:
+            status = SearchBudget.TIMED_OUT
+        else:
+            status = SearchBudget.CONSISTENT
+        return self.report(status, constraint_problem.get_current_assignment())
+
+    def get_result(self) -> Optional[SolverResult]:
+        """ The outcome of the last run, or None if it hasn't ended (or found its first solution) yet. """
+        return self.__result
+
+
+def _get_peak_memory() -> int:
+    """ The process' peak resident memory, in bytes. """
+    peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak_memory if platform == "darwin" else peak_memory * 1024
@@ -0,0 +1,82 @@
+from contextlib import contextmanager, ExitStack
+from typing import Iterator, Optional, Any
+from csp.variable import Variable
+from csp.constraint_problem import ConstraintProblem
+from csp.solver_statistics import SolverStatistics
+from csp.search_events import SearchEvents
+from csp.action_history import ActionsSink
+from csp.search_budget import SearchBudget, BudgetExhaustedError
+
+
+class SearchContext:
+    """ The state of a single solver invocation: the sink its actions are recorded to, and its optional statistics,
+        events and budget. A solver keeps its state in its context (and in locals), never in module globals, so
+        searches may run at the same time, as interleaved generators or in threads, as long as each has its own
+        constraint problem. A context is tracking iff it has any of the four. Solvers test is_tracking once per action,
+        so an untracked search costs a single attribute read per assignment. The solver searches the problem
+        get_searched_problem returns, and constraint_problem is the problem it was given. """
+
+    __slots__ = ("actions_history", "statistics", "events", "budget", "is_tracking", "constraint_problem")
+
+    def __init__(self, actions_history: Optional[ActionsSink] = None, statistics: Optional[SolverStatistics] = None,
+                 events: Optional[SearchEvents] = None, budget: Optional[SearchBudget] = None) -> None:
+        self.actions_history = actions_history
+        self.statistics = statistics
+        self.events = events
+        self.budget = budget
+        self.is_tracking = actions_history is not None or statistics is not None or self.events is not None or \
+            budget is not None
+        self.constraint_problem = None
+
+    def get_searched_problem(self, constraint_problem: ConstraintProblem) -> ConstraintProblem:
+        """ Returns the problem the solver searches in order to solve constraint_problem: constraint_problem itself,
+            or its counting problem if there are statistics (see SolverStatistics.get_counting_problem). """
+        self.constraint_problem = constraint_problem
+        if self.statistics is None:
+            return constraint_problem
+        return self.statistics.get_counting_problem(constraint_problem)
+
+    def assigned(self, variable: Variable, value: Any) -> None:
+        if self.actions_history is not None:
+            self.actions_history.append((variable, value))
+        if self.statistics is not None:
+            self.statistics.enter_node()
+        if self.events is not None:
+            self.events.emit(SearchEvents.ASSIGN, variable, value)
+        if self.budget is not None and self.budget.enter_node(variable):
+            raise BudgetExhaustedError(self.budget.get_exhausted_limit())
+
+    def unassigned(self, variable: Variable) -> None:
+        if self.actions_history is not None:
+            self.actions_history.append((variable, None))
+        if self.statistics is not None:
+            self.statistics.leave_node()
+        if self.events is not None:
+            self.events.emit(SearchEvents.UNASSIGN, variable)
+        if self.budget is not None:
+            self.budget.leave_node()
+
+    def pruned(self, variable: Variable, value: Any) -> None:
+        if self.statistics is not None:
+            self.statistics.pruned_values += 1
+        if self.events is not None:
+            self.events.emit(SearchEvents.PRUNE, variable, value)
+
+    def conflicted(self, variable: Optional[Variable]) -> None:
+        """ Fires a conflict event for variable's failed assignment (for the complete assignment, if variable is None),
+            with the inconsistent constraints of the problem being solved. These are the solved problem's own
+            constraints (not the counting problem's), so the checks made for the event are not counted. """
+        constraints = self.constraint_problem.get_constraints() if variable is None else \
+            self.constraint_problem.get_constraints_containing_variable(variable)
+        self.events.emit(SearchEvents.CONFLICT, variable,
+                         tuple(constraint for constraint in constraints if not constraint.is_consistent()))
+
+    @contextmanager
+    def observing(self, phase_name: str) -> Iterator[None]:
+        """ The phase_name phase: times the phase on statistics, and fires the phase's start and end events. """
+        with ExitStack() as phase_stack:
+            if self.statistics is not None:
+                phase_stack.enter_context(self.statistics.phase(phase_name))
+            if self.events is not None:
+                phase_stack.enter_context(self.events.phase(phase_name))
+            yield
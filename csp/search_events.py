@@ -0,0 +1,55 @@
+from contextlib import contextmanager
+from collections import defaultdict
+from typing import Callable, Iterator, Any
+
+
+SearchListener = Callable[..., None]
+
+
+class SearchEvents:
+    """ Listeners registry of the events a solver fires while it runs, when it is given a SearchEvents. Solvers check
+        for it with a single 'is not None' test, so solving without one costs (almost) nothing. The events and the
+        arguments their listeners are called with:
+        1. ASSIGN: (variable, value) - search assigned variable with value.
+        2. UNASSIGN: (variable,) - search undid variable's assignment.
+        3. PRUNE: (variable, value) - propagation removed value from variable's domain.
+        4. CONFLICT: (variable, constraints) - variable's assignment failed. constraints holds the constraints
+                     containing variable which are inconsistent, and is empty if an inference failed instead.
+        5. SOLUTION: (assignment,) - search found a solution, assignment maps the variables to their values.
+        6. RESTART: () - local search restarted.
+        7. PHASE_START / PHASE_END: (phase_name,) - a solver phase (e.g. "search", "ac3") started / ended. """
+
+    ASSIGN = "assign"
+    UNASSIGN = "unassign"
+    PRUNE = "prune"
+    CONFLICT = "conflict"
+    SOLUTION = "solution"
+    RESTART = "restart"
+    PHASE_START = "phase_start"
+    PHASE_END = "phase_end"
+
+    __events = frozenset({ASSIGN, UNASSIGN, PRUNE, CONFLICT, SOLUTION, RESTART, PHASE_START, PHASE_END})
+
+    def __init__(self) -> None:
+        self.__listeners = defaultdict(list)
+
+    def add_listener(self, event: str, listener: SearchListener) -> None:
+        assert event in SearchEvents.__events, "'{0}' is not a search event.".format(event)
+        self.__listeners[event].append(listener)
+
+    def remove_listener(self, event: str, listener: SearchListener) -> None:
+        self.__listeners[event].remove(listener)
+        if not self.__listeners[event]:
+            del self.__listeners[event]
+
+    def emit(self, event: str, *args: Any) -> None:
+        for listener in self.__listeners.get(event, ()):
+            listener(*args)
+
+    @contextmanager
+    def phase(self, phase_name: str) -> Iterator[None]:
+        self.emit(SearchEvents.PHASE_START, phase_name)
+        try:
+            yield
+        finally:
+            self.emit(SearchEvents.PHASE_END, phase_name)
@@ -1,36 +1,120 @@
-from copy import deepcopy
 from math import exp
 from random import uniform
+from typing import Optional
 from csp.constraint_problem import ConstraintProblem
+from csp.search_budget import SearchBudget
+from csp.solver_statistics import SolverStatistics
+from csp.search_events import SearchEvents
 from csp.hill_climbing_implementations import StartStateGenerator, ScoreCalculator, SuccessorGenerator, \
-    generate_start_state_randomly, consistent_constraints_amount, alter_random_variable_value_pair
+    generate_start_state_randomly, consistent_constraints_amount, alter_random_variable_value_pair, MoveGenerator, \
+    ScoreDeltaCalculator, alter_random_variable_value_move, consistent_constraints_delta, undo_move
 
 
 def simulated_annealing(constraint_problem: ConstraintProblem, max_steps: int, temperature: float, cooling_rate: float,
                         generate_start_state: StartStateGenerator = generate_start_state_randomly,
                         generate_successor: SuccessorGenerator = alter_random_variable_value_pair,
-                        calculate_score: ScoreCalculator = consistent_constraints_amount) -> ConstraintProblem:
+                        calculate_score: ScoreCalculator = consistent_constraints_amount,
+                        statistics: Optional[SolverStatistics] = None, events: Optional[SearchEvents] = None,
+                        budget: Optional[SearchBudget] = None) -> ConstraintProblem:
+    if budget is not None:
+        budget.start(constraint_problem)
     generate_start_state(constraint_problem)
     if constraint_problem.is_completely_consistently_assigned():
+        if events is not None:
+            events.emit(SearchEvents.SOLUTION, constraint_problem.get_current_assignment())
+        if budget is not None:
+            budget.report_assignment(constraint_problem)
         return constraint_problem
     max_steps -= 1
 
-    best_score = calculate_score(constraint_problem)
-    best_score_problem = deepcopy(constraint_problem)
+    curr_score = calculate_score(constraint_problem)
+    best_score = curr_score
+    best_score_problem = constraint_problem
+    best_score_assignment = constraint_problem.get_current_assignment()
     for i in range(max_steps):
         if constraint_problem.is_completely_consistently_assigned():
+            if events is not None:
+                events.emit(SearchEvents.SOLUTION, constraint_problem.get_current_assignment())
+            if budget is not None:
+                budget.report_assignment(constraint_problem)
             return constraint_problem
-
-        curr_score = calculate_score(constraint_problem)
-        if best_score < curr_score:
-            best_score = curr_score
-            best_score_problem = deepcopy(constraint_problem)
+        if budget is not None and budget.charge_node():
+            break
 
         successor = generate_successor(constraint_problem)
         successor_score = calculate_score(successor)
+        if statistics is not None:
+            statistics.nodes += 1
         delta = successor_score - curr_score
         if delta > 0 or uniform(0, 1) < exp(delta / temperature):
             constraint_problem = successor
+            curr_score = successor_score
+            if best_score < curr_score:
+                best_score = curr_score
+                best_score_problem = constraint_problem
+                best_score_assignment = constraint_problem.get_current_assignment()
         temperature *= cooling_rate
 
+    best_score_problem.unassign_all_variables()
+    best_score_problem.assign_variables_from_assignment(best_score_assignment)
+    if budget is not None:
+        budget.report_assignment(best_score_problem)
     return best_score_problem
+
+
+def move_based_simulated_annealing(constraint_problem: ConstraintProblem, max_steps: int, temperature: float,
+                                   cooling_rate: float,
+                                   generate_start_state: StartStateGenerator = generate_start_state_randomly,
+                                   generate_move: MoveGenerator = alter_random_variable_value_move,
+                                   calculate_score: ScoreCalculator = consistent_constraints_amount,
+                                   calculate_score_delta: ScoreDeltaCalculator = consistent_constraints_delta,
+                                   statistics: Optional[SolverStatistics] = None,
+                                   events: Optional[SearchEvents] = None,
+                                   budget: Optional[SearchBudget] = None) -> ConstraintProblem:
+    """ simulated_annealing which anneals in place: a successor is a move whose score delta is evaluated by
+        calculate_score_delta, and which is undone if rejected. calculate_score is only used for the start state.
+        Unlike simulated_annealing's, the events include an ASSIGN per variable of every accepted move. """
+    if budget is not None:
+        budget.start(constraint_problem)
+    generate_start_state(constraint_problem)
+    if constraint_problem.is_completely_consistently_assigned():
+        if events is not None:
+            events.emit(SearchEvents.SOLUTION, constraint_problem.get_current_assignment())
+        if budget is not None:
+            budget.report_assignment(constraint_problem)
+        return constraint_problem
+    max_steps -= 1
+
+    curr_score = calculate_score(constraint_problem)
+    best_score = curr_score
+    best_assignment = constraint_problem.get_current_assignment()
+    for i in range(max_steps):
+        if budget is not None and budget.charge_node():
+            break
+        move = generate_move(constraint_problem)
+        delta = calculate_score_delta(constraint_problem, move)
+        if statistics is not None:
+            statistics.nodes += 1
+        if delta > 0 or uniform(0, 1) < exp(delta / temperature):
+            curr_score += delta
+            if events is not None:
+                for variable, old_value, new_value in move:
+                    events.emit(SearchEvents.ASSIGN, variable, new_value)
+            if best_score < curr_score:
+                if constraint_problem.is_completely_consistently_assigned():
+                    if events is not None:
+                        events.emit(SearchEvents.SOLUTION, constraint_problem.get_current_assignment())
+                    if budget is not None:
+                        budget.report_assignment(constraint_problem)
+                    return constraint_problem
+                best_score = curr_score
+                best_assignment = constraint_problem.get_current_assignment()
+        else:
+            undo_move(move)
+        temperature *= cooling_rate
+
+    constraint_problem.unassign_all_variables()
+    constraint_problem.assign_variables_from_assignment(best_assignment)
+    if budget is not None:
+        budget.report_assignment(constraint_problem)
+    return constraint_problem
@@ -0,0 +1,83 @@
+from time import perf_counter
+from contextlib import contextmanager
+from collections import defaultdict
+from typing import Dict, Iterator, Any
+from csp.constraint import Constraint, ConstraintEvaluator
+from csp.constraint_problem import ConstraintProblem
+
+
+class SolverStatistics:
+    """ Counters a solver fills while it runs, when it is given one. Solvers check for a SolverStatistics with a single
+        'is not None' test, so solving without one costs (almost) nothing.
+        1. nodes: assignments tried (search nodes, or steps of local search).
+        2. backtracks: assignments undone.
+        3. constraint_checks: is_consistent / is_consistent_with calls of the counting problem's constraints, each of
+                              which calls the constraint's evaluator once.
+        4. pruned_values: values removed from domains by propagation.
+        5. queue_pushes: arcs pushed on propagation queues.
+        6. restarts: restarts of local search.
+        7. peak_depth: the maximal amount of variables assigned by search at the same time.
+        8. phases_times: seconds spent in each named phase. phases may be nested, so their times may overlap. """
+
+    __slots__ = ("nodes", "backtracks", "constraint_checks", "pruned_values", "queue_pushes", "restarts", "peak_depth",
+                 "depth", "phases_times")
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        self.nodes = 0
+        self.backtracks = 0
+        self.constraint_checks = 0
+        self.pruned_values = 0
+        self.queue_pushes = 0
+        self.restarts = 0
+        self.peak_depth = 0
+        self.depth = 0
+        self.phases_times = defaultdict(float)
+
+    def enter_node(self) -> None:
+        self.nodes += 1
+        self.depth += 1
+        if self.peak_depth < self.depth:
+            self.peak_depth = self.depth
+
+    def leave_node(self) -> None:
+        self.backtracks += 1
+        self.depth -= 1
+
+    @contextmanager
+    def phase(self, phase_name: str) -> Iterator[None]:
+        start_time = perf_counter()
+        try:
+            yield
+        finally:
+            self.phases_times[phase_name] += perf_counter() - start_time
+
+    def get_counting_problem(self, constraint_problem: ConstraintProblem) -> ConstraintProblem:
+        """ Returns a problem over constraint_problem's variables, whose constraints are instances of its constraints
+            (see Constraint.instance) which count their checks on the statistics. A solver searches
+            the counting problem instead of constraint_problem, so constraint_problem's constraints are never changed:
+            they stay picklable, and solves over the same constraints count on their own statistics. """
+        return constraint_problem.constraints_instance(self.__get_counting_constraint)
+
+    def __get_counting_constraint(self, constraint: Constraint) -> Constraint:
+        return constraint.instance({variable: variable for variable in constraint.variables},
+                                   self.__get_counting_evaluator(constraint.evaluate_constraint))
+
+    def __get_counting_evaluator(self, evaluate_constraint: ConstraintEvaluator) -> ConstraintEvaluator:
+        """ Every check evaluates its constraint exactly once, so checks are counted by the evaluator's wrapper. """
+
+        def counting_evaluate_constraint(values: tuple) -> bool:
+            self.constraint_checks += 1
+            return evaluate_constraint(values)
+
+        return counting_evaluate_constraint
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"nodes": self.nodes, "backtracks": self.backtracks, "constraint_checks": self.constraint_checks,
+                "pruned_values": self.pruned_values, "queue_pushes": self.queue_pushes, "restarts": self.restarts,
+                "peak_depth": self.peak_depth, "phases_times": dict(self.phases_times)}
+
+    def __str__(self) -> str:
+        return "\n".join(name + ": " + str(value) for name, value in self.as_dict().items())
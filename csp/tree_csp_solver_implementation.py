@@ -1,62 +1,109 @@
-from typing import Deque, Tuple, Any, List, Optional
-from collections import deque, defaultdict
+from typing import Tuple, Any, List, Optional, Dict, Set, FrozenSet
 from csp.variable import Variable
 from csp.constraint_problem import ConstraintProblem
+from csp.action_history import ActionsSink, get_actions_sink
+from csp.solver_statistics import SolverStatistics
 
 
-def tree_csp_solver(constraint_problem: ConstraintProblem, with_history: bool = False) \
-        -> Optional[Deque[Tuple[Variable, Any]]]:
-    actions_history = None
-    if with_history:
-        actions_history = deque()
-    topological_sorted_unassigned_variables = __kahn_topological_sort(constraint_problem)
-    if not topological_sorted_unassigned_variables:
-        return actions_history
-
-    for i in range(len(topological_sorted_unassigned_variables) - 1, 0, -1):
-        for value in topological_sorted_unassigned_variables[i].domain:
-            topological_sorted_unassigned_variables[i].assign(value)
-            if not constraint_problem.get_consistent_domain(topological_sorted_unassigned_variables[i-1]):
-                topological_sorted_unassigned_variables[i].remove_from_domain(value)
-            topological_sorted_unassigned_variables[i].unassign()
-        if not topological_sorted_unassigned_variables[i].domain:
-            return actions_history
-
-    for variable in topological_sorted_unassigned_variables:
-        consistent_domain = constraint_problem.get_consistent_domain(variable)
-        if not consistent_domain:
-            return actions_history
-        value, *_ = consistent_domain
+# ///////////////////////////////////////////// tree csp solver /////////////////////////////////////////////////////
+# solves a constraint problem whose unassigned variables form a tree (or a forest) in O(n * d^2):
+# 1. root each tree of the forest and order its variables breadth first, so every parent precedes its children.
+# 2. restrict each variable's domain to the values consistent with the already assigned variables.
+# 3. precompute for every (parent, child) edge which child values support each parent value.
+# 4. directional arc consistency: going from the last variable to the first, remove from each parent's domain the
+#    values which have no support in its child's domain.
+# 5. going from the first variable to the last, assign roots with any value of their domains and every other variable
+#    with a value of its domain which supports its parent's value. no backtracking is needed.
+# /////////////////////////////////////////////////////////////////////////////////////////////////////////////////
+
+
+def tree_csp_solver(constraint_problem: ConstraintProblem, with_history: bool = False,
+                    statistics: Optional[SolverStatistics] = None,
+                    history: Optional[ActionsSink] = None) -> Optional[ActionsSink]:
+    """ With statistics, a node is counted per assigned variable. """
+    actions_history = get_actions_sink(with_history, history)
+    if statistics is None:
+        __tree_csp_solver(constraint_problem, actions_history, statistics)
+    else:
+        with statistics.phase("tree_csp_solver"):
+            __tree_csp_solver(statistics.get_counting_problem(constraint_problem), actions_history, statistics)
+    return actions_history
+
+
+def __tree_csp_solver(constraint_problem: ConstraintProblem, actions_history: Optional[ActionsSink],
+                      statistics: Optional[SolverStatistics]) -> None:
+    unassigned_variables = constraint_problem.get_unassigned_variables()
+    rooted_forest = __root_forest(constraint_problem, unassigned_variables)
+    if rooted_forest is None:
+        return
+    ordered_variables, parents = rooted_forest
+
+    domains = {variable: constraint_problem.get_consistent_domain(variable) for variable in ordered_variables}
+    supports = {variable: __get_supports(constraint_problem, parents[variable], variable, domains)
+                for variable in ordered_variables if parents[variable] is not None}
+
+    for variable in reversed(ordered_variables):
+        if not domains[variable]:
+            return
+        parent = parents[variable]
+        if parent is not None:
+            variable_supports = supports[variable]
+            domains[parent] = {parent_value for parent_value in domains[parent]
+                               if not variable_supports[parent_value].isdisjoint(domains[variable])}
+
+    for variable in ordered_variables:
+        parent = parents[variable]
+        if parent is None:
+            value = next(iter(domains[variable]))
+        else:
+            value = next(iter(supports[variable][parent.value] & domains[variable]))
         variable.assign(value)
-        if with_history:
+        if actions_history is not None:
             actions_history.append((variable, value))
+        if statistics is not None:
+            statistics.nodes += 1
 
-    return actions_history
+
+def __root_forest(constraint_problem: ConstraintProblem, unassigned_variables: FrozenSet[Variable]) \
+        -> Optional[Tuple[List[Variable], Dict[Variable, Optional[Variable]]]]:
+    """ Returns the unassigned variables in breadth first order together with their parents (None for roots),
+        or None if the unassigned variables contain a cycle. """
+    constraint_graph = constraint_problem.get_constraint_graph_as_adjacency_list()
+    parents = dict()
+    ordered_variables = list()
+    for root in unassigned_variables:
+        if root in parents:
+            continue
+        parents[root] = None
+        ordered_variables.append(root)
+        tree_index = len(ordered_variables) - 1
+        while tree_index < len(ordered_variables):
+            variable = ordered_variables[tree_index]
+            tree_index += 1
+            for neighbor in constraint_graph[variable]:
+                if neighbor not in unassigned_variables or neighbor is parents[variable]:
+                    continue
+                if neighbor in parents:
+                    return None
+                parents[neighbor] = variable
+                ordered_variables.append(neighbor)
+    return ordered_variables, parents
 
 
-def __kahn_topological_sort(constraint_problem: ConstraintProblem) -> List[Variable]:
-    variables = constraint_problem.get_unassigned_variables()
-    directed_graph = defaultdict(set)
-    for var in variables:
-        for neighbor in constraint_problem.get_unassigned_neighbors(var):
-            if var not in directed_graph[neighbor]:
-                directed_graph[var].add(neighbor)
-
-    in_degree = {var: 0 for var in variables}
-    for var in variables:
-        for neighbor in directed_graph[var]:
-            in_degree[neighbor] += 1
-
-    zero_in_degree_variables = set(filter(lambda variable: in_degree[variable] == 0, in_degree.keys()))
-    topologically_sorted_unassigned_variables = list()
-    while zero_in_degree_variables:
-        var = zero_in_degree_variables.pop()
-        topologically_sorted_unassigned_variables.append(var)
-        for neighbor in directed_graph[var]:
-            in_degree[neighbor] -= 1
-            if in_degree[neighbor] == 0:
-                zero_in_degree_variables.add(neighbor)
-
-    if len(topologically_sorted_unassigned_variables) != len(variables):
-        return list()
-    return topologically_sorted_unassigned_variables
+def __get_supports(constraint_problem: ConstraintProblem, parent: Variable, child: Variable,
+                   domains: Dict[Variable, Set[Any]]) -> Dict[Any, Set[Any]]:
+    """ Maps each value of parent's domain to the values of child's domain consistent with it. """
+    shared_constraints = constraint_problem.get_constraints_containing_variable(parent) & \
+        constraint_problem.get_constraints_containing_variable(child)
+    supports = dict()
+    for parent_value in domains[parent]:
+        parent.assign(parent_value)
+        parent_value_supports = set()
+        for child_value in domains[child]:
+            child.assign(child_value)
+            if all(constraint.is_consistent() for constraint in shared_constraints):
+                parent_value_supports.add(child_value)
+            child.unassign()
+        parent.unassign()
+        supports[parent_value] = parent_value_supports
+    return supports
@@ -0,0 +1,248 @@
+from typing import Tuple, Any, List, Optional, Dict, Set, Callable, NamedTuple
+from collections import defaultdict
+from csp.variable import Variable
+from csp.constraint import Constraint
+from csp.constraint_problem import ConstraintProblem
+from csp.action_history import ActionsSink, get_actions_sink
+from csp.search_budget import SearchBudget
+from csp.solver_statistics import SolverStatistics
+
+
+# ///////////////////////////////////////// tree decomposition (join tree clustering) /////////////////////////////////
+# solves a constraint problem in time and memory exponential only in the treewidth of its constraint graph:
+# 1. eliminate the unassigned variables one by one in a heuristic order (min-fill or min-degree). when a variable is
+#    eliminated, its bag is the variable and its remaining neighbors, which are then connected to each other.
+#    the bag's parent is the bag of the first eliminated variable among these neighbors. the bags form a join tree
+#    (a forest if the graph is disconnected) in which every parent comes after its children.
+# 2. every constraint is placed in the bag of the first eliminated variable of its scope, which contains its whole
+#    (unassigned) scope. each bag's relation is the set of its variables' values consistent with its constraints.
+# 3. going from the first bag to the last, each tuple of a bag's relation is weighted by the number of ways to extend
+#    it over the bag's subtree, i.e. the product of its children's messages, and each bag sends its parent the sums of
+#    its weights grouped by their values of the variables the two bags share.
+# 4. the number of solutions is the product of the roots' weights sums. a solution is found going from the last bag
+#    to the first, picking in each bag a tuple with a positive weight which agrees with its parent's tuple.
+# /////////////////////////////////////////////////////////////////////////////////////////////////////////////////
+
+
+ConstraintGraph = Dict[Variable, Set[Variable]]
+EliminationOrderer = Callable[[ConstraintGraph], List[Variable]]
+
+TreeDecomposition = NamedTuple("TreeDecomposition", [("bags", List[Tuple[Variable, ...]]),
+                                                     ("parents", List[Optional[int]]),
+                                                     ("width", int)])
+
+
+def min_degree_elimination_order(constraint_graph: ConstraintGraph) -> List[Variable]:
+    """ Repeatedly eliminates the variable with the fewest remaining neighbors. """
+    return __get_greedy_elimination_order(constraint_graph, lambda graph, variable: len(graph[variable]))
+
+
+def min_fill_elimination_order(constraint_graph: ConstraintGraph) -> List[Variable]:
+    """ Repeatedly eliminates the variable whose elimination adds the fewest edges between its neighbors. """
+    return __get_greedy_elimination_order(constraint_graph, __get_fill_in_edges_amount)
+
+
+def tree_decompose(constraint_problem: ConstraintProblem,
+                   elimination_order: EliminationOrderer = min_fill_elimination_order) -> TreeDecomposition:
+    """ Decomposes the constraint graph of constraint_problem's unassigned variables. The i-th bag starts with the
+        i-th eliminated variable, and its parent's index is bigger than i. """
+    unassigned_variables = constraint_problem.get_unassigned_variables()
+    constraint_graph = constraint_problem.get_constraint_graph_as_adjacency_list()
+    reduced_graph = {variable: constraint_graph[variable] & unassigned_variables for variable in unassigned_variables}
+    order = elimination_order({variable: set(neighbors) for variable, neighbors in reduced_graph.items()})
+    positions = {variable: i for i, variable in enumerate(order)}
+
+    bags = list()
+    parents = list()
+    for variable in order:
+        neighbors = reduced_graph.pop(variable)
+        for neighbor in neighbors:
+            reduced_graph[neighbor] = (reduced_graph[neighbor] | neighbors) - {neighbor, variable}
+        bags.append((variable,) + tuple(neighbors))
+        parents.append(positions[min(neighbors, key=positions.get)] if neighbors else None)
+    width = max(map(len, bags)) - 1 if bags else 0
+    return TreeDecomposition(bags, parents, width)
+
+
+def tree_decomposition_solver(constraint_problem: ConstraintProblem,
+                              elimination_order: EliminationOrderer = min_fill_elimination_order,
+                              with_history: bool = False, statistics: Optional[SolverStatistics] = None,
+                              history: Optional[ActionsSink] = None,
+                              budget: Optional[SearchBudget] = None) -> Optional[ActionsSink]:
+    """ With statistics, a node is counted, and with a budget, a node is charged, per bag whose weights (and message
+        to its parent) are computed. If the budget is exhausted, the variables are left as they were. """
+    actions_history = get_actions_sink(with_history, history)
+    if budget is not None:
+        budget.start(constraint_problem)
+
+    decomposition, weights = __get_weights(constraint_problem, elimination_order, statistics, budget)
+    if weights is None:
+        if budget is not None:
+            status = SearchBudget.TIMED_OUT if budget.is_exhausted() else SearchBudget.INFEASIBLE
+            budget.report(status, constraint_problem.get_current_assignment())
+        return actions_history
+
+    bags, parents, _ = decomposition
+    chosen_tuples = [None] * len(bags)
+    for i in reversed(range(len(bags))):
+        parent = parents[i]
+        if parent is None:
+            chosen_tuples[i] = next(iter(weights[i]))
+        else:
+            separator_indices, parent_separator_indices = __get_separator_indices(bags[i], bags[parent])
+            parent_values = tuple(chosen_tuples[parent][j] for j in parent_separator_indices)
+            chosen_tuples[i] = next(values for values in weights[i]
+                                    if tuple(values[j] for j in separator_indices) == parent_values)
+
+    for bag, values in zip(bags, chosen_tuples):
+        bag[0].assign(values[0])
+        if actions_history is not None:
+            actions_history.append((bag[0], values[0]))
+    if budget is not None:
+        budget.report(SearchBudget.SOLVED, constraint_problem.get_current_assignment())
+    return actions_history
+
+
+def count_solutions_with_tree_decomposition(constraint_problem: ConstraintProblem,
+                                            elimination_order: EliminationOrderer = min_fill_elimination_order,
+                                            statistics: Optional[SolverStatistics] = None,
+                                            budget: Optional[SearchBudget] = None) -> Optional[int]:
+    """ Counts the consistent complete assignments extending the current assignment of constraint_problem. With
+        statistics, a node is counted per bag. With a budget, a node is charged per bag, and None is returned if the
+        budget is exhausted. The budget's result is SOLVED if there are solutions, and INFEASIBLE if there are
+        none. """
+    if budget is not None:
+        budget.start(constraint_problem)
+    decomposition, weights = __get_weights(constraint_problem, elimination_order, statistics, budget)
+    solutions_amount = 0
+    if weights is not None:
+        solutions_amount = 1
+        for bag_weights, parent in zip(weights, decomposition.parents):
+            if parent is None:
+                solutions_amount *= sum(bag_weights.values())
+
+    if budget is None:
+        return solutions_amount
+    if budget.is_exhausted():
+        budget.report(SearchBudget.TIMED_OUT, constraint_problem.get_current_assignment())
+        return None
+    status = SearchBudget.SOLVED if solutions_amount else SearchBudget.INFEASIBLE
+    budget.report(status, constraint_problem.get_current_assignment())
+    return solutions_amount
+
+
+def __get_weights(constraint_problem: ConstraintProblem, elimination_order: EliminationOrderer,
+                  statistics: Optional[SolverStatistics], budget: Optional[SearchBudget]) \
+        -> Tuple[TreeDecomposition, Optional[List[Dict[tuple, int]]]]:
+    """ Returns the decomposition and, for each bag, its relation's tuples mapped to their positive weights, or None
+        instead of the weights if constraint_problem has no solution or budget is exhausted. """
+    if statistics is None:
+        return __compute_weights(constraint_problem, elimination_order, statistics, budget)
+    with statistics.phase("tree_decomposition"):
+        return __compute_weights(statistics.get_counting_problem(constraint_problem), elimination_order, statistics,
+                                 budget)
+
+
+def __compute_weights(constraint_problem: ConstraintProblem, elimination_order: EliminationOrderer,
+                      statistics: Optional[SolverStatistics], budget: Optional[SearchBudget]) \
+        -> Tuple[TreeDecomposition, Optional[List[Dict[tuple, int]]]]:
+    decomposition = tree_decompose(constraint_problem, elimination_order)
+    bags, parents, _ = decomposition
+    positions = {bag[0]: i for i, bag in enumerate(bags)}
+
+    bags_constraints = [list() for bag in bags]
+    for constraint in constraint_problem.get_constraints():
+        scope_positions = [positions[variable] for variable in constraint.variables if variable in positions]
+        if scope_positions:
+            bags_constraints[min(scope_positions)].append(constraint)
+        elif not constraint.is_consistent():
+            return decomposition, None
+
+    domains = {bag[0]: constraint_problem.get_consistent_domain(bag[0]) for bag in bags}
+    children = [list() for bag in bags]
+    messages = [None] * len(bags)
+    weights = list()
+    for i, bag in enumerate(bags):
+        if budget is not None and budget.charge_node():
+            return decomposition, None
+        if statistics is not None:
+            statistics.nodes += 1
+        children_separators = [(child, __get_separator_indices(bags[child], bag)[1]) for child in children[i]]
+        bag_weights = dict()
+        for values in __get_bag_relation(bag, bags_constraints[i], domains):
+            weight = 1
+            for child, child_separator_indices in children_separators:
+                weight *= messages[child].get(tuple(values[j] for j in child_separator_indices), 0)
+                if not weight:
+                    break
+            if weight:
+                bag_weights[values] = weight
+        if not bag_weights:
+            return decomposition, None
+        weights.append(bag_weights)
+
+        parent = parents[i]
+        if parent is not None:
+            separator_indices, _ = __get_separator_indices(bag, bags[parent])
+            message = defaultdict(int)
+            for values, weight in bag_weights.items():
+                message[tuple(values[j] for j in separator_indices)] += weight
+            messages[i] = message
+            children[parent].append(i)
+    return decomposition, weights
+
+
+def __get_bag_relation(bag: Tuple[Variable, ...], bag_constraints: List[Constraint],
+                       domains: Dict[Variable, Set[Any]]) -> List[tuple]:
+    """ Backtracks over the bag's variables, checking each constraint as soon as the last of its unassigned variables
+        is assigned. """
+    bag_positions = {variable: i for i, variable in enumerate(bag)}
+    checks = [list() for variable in bag]
+    for constraint in bag_constraints:
+        checks[max(bag_positions[variable] for variable in constraint.variables if variable in bag_positions)] \
+            .append(constraint)
+
+    relation = list()
+
+    def extend(depth: int) -> None:
+        if depth == len(bag):
+            relation.append(tuple(variable.value for variable in bag))
+            return
+        variable = bag[depth]
+        for value in domains[variable]:
+            variable.assign(value)
+            if all(constraint.is_consistent() for constraint in checks[depth]):
+                extend(depth + 1)
+            variable.unassign()
+
+    extend(0)
+    return relation
+
+
+def __get_separator_indices(child_bag: Tuple[Variable, ...], parent_bag: Tuple[Variable, ...]) \
+        -> Tuple[Tuple[int, ...], Tuple[int, ...]]:
+    """ Returns the indices of the variables shared by both bags within the child's bag and within the parent's bag,
+        in the same order. """
+    parent_positions = {variable: i for i, variable in enumerate(parent_bag)}
+    shared_indices = [(i, parent_positions[variable]) for i, variable in enumerate(child_bag)
+                      if variable in parent_positions]
+    return tuple(i for i, j in shared_indices), tuple(j for i, j in shared_indices)
+
+
+def __get_greedy_elimination_order(constraint_graph: ConstraintGraph,
+                                   calculate_cost: Callable[[ConstraintGraph, Variable], int]) -> List[Variable]:
+    order = list()
+    while constraint_graph:
+        variable = min(constraint_graph, key=lambda candidate: calculate_cost(constraint_graph, candidate))
+        neighbors = constraint_graph.pop(variable)
+        for neighbor in neighbors:
+            constraint_graph[neighbor].discard(variable)
+            constraint_graph[neighbor].update(neighbors - {neighbor})
+        order.append(variable)
+    return order
+
+
+def __get_fill_in_edges_amount(constraint_graph: ConstraintGraph, variable: Variable) -> int:
+    neighbors = tuple(constraint_graph[variable])
+    return sum(1 for i, neighbor in enumerate(neighbors) for other_neighbor in neighbors[i + 1:]
+               if other_neighbor not in constraint_graph[neighbor])
@@ -53,6 +53,12 @@ class Variable:
 
     domain = property(__get_domain, __set_domain)
 
+    def __get_domain_size(self) -> int:
+        """ The length of the domain, without copying it as domain does. """
+        return len(self.__domain)
+
+    domain_size = property(__get_domain_size)
+
     def __get_value(self) -> Any:
         return deepcopy(self.__value)
 
@@ -71,6 +77,18 @@ class Variable:
     def remove_from_domain(self, value: Any) -> None:
         self.__domain.remove(value)
 
+    def add_to_domain(self, value: Any) -> None:
+        """ Undoes remove_from_domain. The value is appended to the end of the domain. """
+        self.__domain.append(value)
+
+    def instance(self) -> "Variable":
+        """ Returns a new variable with the same domain and value, whose state is independent of this variable's.
+            Unlike deepcopy, the domain's values themselves are shared, so they must not be mutated. """
+        variable = self.__class__.__new__(self.__class__)
+        variable.__domain = list(self.__domain)
+        variable.__value = self.__value
+        return variable
+
     def __str__(self) -> str:
         return "(variable's value: " + str(self.value) + ". variable's domain: " + str(self.__domain) + ")"
 
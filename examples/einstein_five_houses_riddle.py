@@ -1,5 +1,4 @@
 import time
-import copy
 import csp
 from examples.performance_testing import measure_performance
 
@@ -295,7 +294,7 @@ measure_performance(2, "einstein_problem", general_genetic_einstein_problem,
                     "genetic_local_search", 100, 100, 0.1)
 
 
-ac3_einstein_problem = copy.deepcopy(einstein_problem)
+ac3_einstein_problem = einstein_problem.instance()
 ac3_einstein_problem.unassign_all_variables()
 ac3_start_time = time.process_time()
 ac3_is_arc_consistent = csp.ac3(ac3_einstein_problem)
@@ -325,7 +324,7 @@ if ac3_is_arc_consistent:
                         "genetic_local_search", 100, 100, 0.1)
 
 
-ac4_einstein_problem = copy.deepcopy(einstein_problem)
+ac4_einstein_problem = einstein_problem.instance()
 ac4_einstein_problem.unassign_all_variables()
 ac4_start_time = time.process_time()
 ac4_is_arc_consistent = csp.ac4(ac4_einstein_problem)
@@ -355,7 +354,7 @@ if ac4_is_arc_consistent:
                         "genetic_local_search", 100, 100, 0.1)
 
 
-pc2_einstein_problem = copy.deepcopy(einstein_problem)
+pc2_einstein_problem = einstein_problem.instance()
 pc2_einstein_problem.unassign_all_variables()
 pc2_start_time = time.process_time()
 pc2_is_path_consistent = csp.pc2(pc2_einstein_problem)
@@ -389,7 +388,7 @@ if pc2_is_path_consistent:
                         "genetic_local_search", 100, 100, 0.1)
 
 
-two_consistency_einstein_problem = copy.deepcopy(einstein_problem)
+two_consistency_einstein_problem = einstein_problem.instance()
 two_consistency_einstein_problem.unassign_all_variables()
 two_consistency_start_time = time.process_time()
 is_two_consistent = csp.i_consistency(two_consistency_einstein_problem, 2)
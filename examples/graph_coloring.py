@@ -1,4 +1,3 @@
-import copy
 import time
 import csp
 from examples.performance_testing import measure_performance
@@ -69,7 +68,7 @@ measure_performance(2, "map_coloring_problem", general_genetic_map_coloring_prob
                     "genetic_local_search", 100, 100, 0.1)
 
 
-ac3_map_coloring_problem = copy.deepcopy(map_coloring_problem)
+ac3_map_coloring_problem = map_coloring_problem.instance()
 ac3_map_coloring_problem.unassign_all_variables()
 ac3_start_time = time.process_time()
 ac3_is_arc_consistent = csp.ac3(ac3_map_coloring_problem)
@@ -103,7 +102,7 @@ if ac3_is_arc_consistent:
                         "genetic_local_search", 100, 100, 0.1)
 
 
-ac4_map_coloring_problem = copy.deepcopy(map_coloring_problem)
+ac4_map_coloring_problem = map_coloring_problem.instance()
 ac4_map_coloring_problem.unassign_all_variables()
 ac4_start_time = time.process_time()
 ac4_is_arc_consistent = csp.ac4(ac4_map_coloring_problem)
@@ -137,7 +136,7 @@ if ac4_is_arc_consistent:
                         "genetic_local_search", 100, 100, 0.1)
 
 
-pc2_map_coloring_problem = copy.deepcopy(map_coloring_problem)
+pc2_map_coloring_problem = map_coloring_problem.instance()
 pc2_map_coloring_problem.unassign_all_variables()
 pc2_start_time = time.process_time()
 pc2_is_path_consistent = csp.pc2(pc2_map_coloring_problem)
@@ -171,7 +170,7 @@ if pc2_is_path_consistent:
                         "genetic_local_search", 100, 100, 0.1)
 
 
-two_consistency_map_coloring_problem = copy.deepcopy(map_coloring_problem)
+two_consistency_map_coloring_problem = map_coloring_problem.instance()
 two_consistency_map_coloring_problem.unassign_all_variables()
 two_consistency_start_time = time.process_time()
 is_two_consistent = csp.i_consistency(two_consistency_map_coloring_problem, 2)
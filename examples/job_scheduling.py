@@ -1,5 +1,4 @@
 import time
-import copy
 import csp
 from examples.performance_testing import measure_performance
 
@@ -114,7 +113,7 @@ measure_performance(2, "car_assembly_problem", general_genetic_car_assembly_prob
                     "genetic_local_search", 100, 100, 0.1)
 
 
-ac3_car_assembly_problem = copy.deepcopy(car_assembly_problem)
+ac3_car_assembly_problem = car_assembly_problem.instance()
 ac3_car_assembly_problem.unassign_all_variables()
 ac3_start_time = time.process_time()
 ac3_is_arc_consistent = csp.ac3(ac3_car_assembly_problem)
@@ -148,7 +147,7 @@ if ac3_is_arc_consistent:
                         "genetic_local_search", 100, 100, 0.1)
 
 
-ac4_car_assembly_problem = copy.deepcopy(car_assembly_problem)
+ac4_car_assembly_problem = car_assembly_problem.instance()
 ac4_car_assembly_problem.unassign_all_variables()
 ac4_start_time = time.process_time()
 ac4_is_arc_consistent = csp.ac4(ac4_car_assembly_problem)
@@ -182,7 +181,7 @@ if ac4_is_arc_consistent:
                         "genetic_local_search", 100, 100, 0.1)
 
 
-pc2_car_assembly_problem = copy.deepcopy(car_assembly_problem)
+pc2_car_assembly_problem = car_assembly_problem.instance()
 pc2_car_assembly_problem.unassign_all_variables()
 pc2_start_time = time.process_time()
 pc2_is_path_consistent = csp.pc2(pc2_car_assembly_problem)
@@ -217,7 +216,7 @@ if pc2_is_path_consistent:
                         "genetic_local_search", 100, 100, 0.1)
 
 
-two_consistency_car_assembly_problem = copy.deepcopy(car_assembly_problem)
+two_consistency_car_assembly_problem = car_assembly_problem.instance()
 two_consistency_car_assembly_problem.unassign_all_variables()
 two_consistency_start_time = time.process_time()
 is_two_consistent = csp.i_consistency(two_consistency_car_assembly_problem, 2)
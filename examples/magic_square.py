@@ -1,5 +1,4 @@
 import time
-import copy
 import csp
 from examples.performance_testing import measure_performance
 
@@ -156,7 +155,7 @@ measure_performance(2, "general_genetic_magic_square_problem", general_genetic_m
                     "genetic_local_search", 1000, 1000, 0.1)
 
 
-ac3_magic_square_problem = copy.deepcopy(magic_square_problem)
+ac3_magic_square_problem = magic_square_problem.instance()
 ac3_magic_square_problem.unassign_all_variables()
 ac3_start_time = time.process_time()
 ac3_is_arc_consistent = csp.ac3(ac3_magic_square_problem)
@@ -189,7 +188,7 @@ if ac3_is_arc_consistent:
     measure_performance(2, "general_genetic_ac3_magic_square_problem", general_genetic_ac3_magic_square_problem,
                         "genetic_local_search", 1000, 100, 0.1)
 
-ac4_magic_square_problem = copy.deepcopy(magic_square_problem)
+ac4_magic_square_problem = magic_square_problem.instance()
 ac4_magic_square_problem.unassign_all_variables()
 ac4_start_time = time.process_time()
 ac4_is_arc_consistent = csp.ac4(ac4_magic_square_problem)
@@ -222,7 +221,7 @@ if ac4_is_arc_consistent:
     measure_performance(2, "general_genetic_ac4_magic_square_problem", general_genetic_ac4_magic_square_problem,
                         "genetic_local_search", 100, 1000, 0.1)
 
-pc2_magic_square_problem = copy.deepcopy(magic_square_problem)
+pc2_magic_square_problem = magic_square_problem.instance()
 pc2_magic_square_problem.unassign_all_variables()
 pc2_start_time = time.process_time()
 pc2_is_path_consistent = csp.pc2(pc2_magic_square_problem)
@@ -255,7 +254,7 @@ if pc2_is_path_consistent:
     measure_performance(2, "general_genetic_pc2_magic_square_problem", general_genetic_pc2_magic_square_problem,
                         "genetic_local_search", 1000, 1000, 0.1)
 
-two_consistency_magic_square_problem = copy.deepcopy(magic_square_problem)
+two_consistency_magic_square_problem = magic_square_problem.instance()
 two_consistency_magic_square_problem.unassign_all_variables()
 two_consistency_start_time = time.process_time()
 is_two_consistent = csp.i_consistency(two_consistency_magic_square_problem, 2)
@@ -1,5 +1,4 @@
 import time
-import copy
 import csp
 from examples.performance_testing import measure_performance
 
@@ -82,7 +81,7 @@ measure_performance(2, "n_queens_problem", general_genetic_n_queens_problem,
                     "genetic_local_search", 100, 100, 0.1)
 
 
-ac3_n_queens_problem = copy.deepcopy(n_queens_problem)
+ac3_n_queens_problem = n_queens_problem.instance()
 ac3_n_queens_problem.unassign_all_variables()
 ac3_start_time = time.process_time()
 ac3_is_arc_consistent = csp.ac3(ac3_n_queens_problem)
@@ -116,7 +115,7 @@ if ac3_is_arc_consistent:
                         "genetic_local_search", 100, 100, 0.1)
 
 
-ac4_n_queens_problem = copy.deepcopy(n_queens_problem)
+ac4_n_queens_problem = n_queens_problem.instance()
 ac4_n_queens_problem.unassign_all_variables()
 ac4_start_time = time.process_time()
 ac4_is_arc_consistent = csp.ac4(ac4_n_queens_problem)
@@ -150,7 +149,7 @@ if ac4_is_arc_consistent:
                         "genetic_local_search", 100, 100, 0.1)
 
 
-pc2_n_queens_problem = copy.deepcopy(n_queens_problem)
+pc2_n_queens_problem = n_queens_problem.instance()
 pc2_n_queens_problem.unassign_all_variables()
 pc2_start_time = time.process_time()
 pc2_is_path_consistent = csp.pc2(pc2_n_queens_problem)
@@ -184,7 +183,7 @@ if pc2_is_path_consistent:
                         "genetic_local_search", 100, 100, 0.1)
 
 
-two_consistency_n_queens_problem = copy.deepcopy(n_queens_problem)
+two_consistency_n_queens_problem = n_queens_problem.instance()
 two_consistency_n_queens_problem.unassign_all_variables()
 two_consistency_start_time = time.process_time()
 is_two_consistent = csp.i_consistency(two_consistency_n_queens_problem, 2)
@@ -8,6 +8,7 @@ def measure_performance(tests_amount: int, problem_name: str, problem, constrain
         read_only_variables = kwargs.pop("read_only_variables")
     except KeyError:
         pass
+    statistics = kwargs.get("statistics")
 
     if isinstance(problem, csp.GeneticConstraintProblem):
         const_problem = problem.get_constraint_problem()
@@ -60,3 +61,5 @@ def measure_performance(tests_amount: int, problem_name: str, problem, constrain
     if hasattr(solution, "__len__"):
         print("solution lengths (number of assignment and unassignment actions):", histories_lengths)
     print("time results (seconds):", time_results)
+    if statistics is not None:
+        print("solver statistics (summed over all tests):", statistics.as_dict())
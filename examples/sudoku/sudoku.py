@@ -1,5 +1,4 @@
 import math
-import copy
 import time
 import csp
 from examples.performance_testing import measure_performance
@@ -8,10 +7,10 @@ from examples.sudoku.sudoku_utilities import construct_sudoku_problem, print_sol
 
 
 sudoku_problem = construct_sudoku_problem("9x9_easy.txt")
-ac3_sudoku_problem = copy.deepcopy(sudoku_problem)
-ac4_sudoku_problem = copy.deepcopy(sudoku_problem)
-pc2_sudoku_problem = copy.deepcopy(sudoku_problem)
-two_consistency_sudoku_problem = copy.deepcopy(sudoku_problem)
+ac3_sudoku_problem = sudoku_problem.instance()
+ac4_sudoku_problem = sudoku_problem.instance()
+pc2_sudoku_problem = sudoku_problem.instance()
+two_consistency_sudoku_problem = sudoku_problem.instance()
 
 
 name_to_var_map = sudoku_problem.get_name_to_variable_map()
@@ -267,14 +267,12 @@ class GeneticSudokuConstraintProblem(csp.GeneticConstraintProblem):
 
     def calculate_fitness(self, assignment: csp.Assignment) -> int:
         """ calculate state score by the number of unique values in each row and column. """
-        self._constraint_problem.unassign_all_variables()
-        self._constraint_problem.assign_variables_from_assignment(assignment)
         name_to_var_map = self._constraint_problem.get_name_to_variable_map()
         score = 0
         for row in _get_rows_indices(self.__grid_len):
-            score += len(set((name_to_var_map[(i, j)].value for i, j in row)))
+            score += len(set((assignment[name_to_var_map[(i, j)]] for i, j in row)))
         for column in _get_columns_indices(self.__grid_len):
-            score += len(set((name_to_var_map[(i, j)].value for i, j in column)))
+            score += len(set((assignment[name_to_var_map[(i, j)]] for i, j in column)))
         return score
 
     def perform_natural_selection(self, population: List[csp.Assignment]) -> List[csp.Assignment]:
@@ -298,19 +296,13 @@ class GeneticSudokuConstraintProblem(csp.GeneticConstraintProblem):
         parent2_block_indices = block_indices[crossover_point:]
 
         child = dict()
-        self._constraint_problem.unassign_all_variables()
-        self._constraint_problem.assign_variables_from_assignment(parent1)
-        parent1_name_to_var_map = self._constraint_problem.get_name_to_variable_map()
+        name_to_var_map = self._constraint_problem.get_name_to_variable_map()
         for block in parent1_block_indices:
             for s, t in block:
-                child[parent1_name_to_var_map[(s, t)]] = parent1_name_to_var_map[(s, t)].value
-
-        self._constraint_problem.unassign_all_variables()
-        self._constraint_problem.assign_variables_from_assignment(parent2)
-        parent2_name_to_var_map = self._constraint_problem.get_name_to_variable_map()
+                child[name_to_var_map[(s, t)]] = parent1[name_to_var_map[(s, t)]]
         for block in parent2_block_indices:
             for s, t in block:
-                child[parent2_name_to_var_map[(s, t)]] = parent2_name_to_var_map[(s, t)].value
+                child[name_to_var_map[(s, t)]] = parent2[name_to_var_map[(s, t)]]
 
         return child
 
@@ -329,27 +321,19 @@ class GeneticSudokuConstraintProblem(csp.GeneticConstraintProblem):
                 if (i, j) not in self.__read_only_names:
                     block_variables.append((i, j))
 
-        self._constraint_problem.unassign_all_variables()
-        self._constraint_problem.assign_variables_from_assignment(individual)
-
         shuffle(block_variables)
         for a, b in block_variables:
             for u, v in block_variables:
                 if (a, b) == (u, v):
                     continue
-                if self.__have_been_swapped(a, b, u, v):
+                if self.__have_been_swapped(individual, a, b, u, v):
                     return
 
-    def __have_been_swapped(self, a, b, u, v) -> bool:
+    def __have_been_swapped(self, individual: csp.Assignment, a, b, u, v) -> bool:
         name_to_var_map = self._constraint_problem.get_name_to_variable_map()
-        if name_to_var_map[(a, b)].value in name_to_var_map[(u, v)].domain and \
-                name_to_var_map[(u, v)].value in name_to_var_map[(a, b)].domain:
-            a_b_value = name_to_var_map[(a, b)].value
-            u_v_value = name_to_var_map[(u, v)].value
-            name_to_var_map[(a, b)].unassign()
-            name_to_var_map[(u, v)].unassign()
-            name_to_var_map[(a, b)].assign(u_v_value)
-            name_to_var_map[(u, v)].assign(a_b_value)
+        a_b_variable, u_v_variable = name_to_var_map[(a, b)], name_to_var_map[(u, v)]
+        if individual[a_b_variable] in u_v_variable.domain and individual[u_v_variable] in a_b_variable.domain:
+            individual[a_b_variable], individual[u_v_variable] = individual[u_v_variable], individual[a_b_variable]
             return True
         return False
 
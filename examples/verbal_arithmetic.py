@@ -1,5 +1,4 @@
 import time
-import copy
 import csp
 from examples.performance_testing import measure_performance
 
@@ -191,7 +190,7 @@ general_genetic_verbal_arithmetic_problem = csp.GeneralGeneticConstraintProblem(
 measure_performance(2, "verbal_arithmetic_problem", general_genetic_verbal_arithmetic_problem,
                     "genetic_local_search", 100, 100, 0.1)
 
-ac3_verbal_arithmetic_problem = copy.deepcopy(verbal_arithmetic_problem)
+ac3_verbal_arithmetic_problem = verbal_arithmetic_problem.instance()
 ac3_verbal_arithmetic_problem.unassign_all_variables()
 ac3_start_time = time.process_time()
 ac3_is_arc_consistent = csp.ac3(ac3_verbal_arithmetic_problem)
@@ -224,7 +223,7 @@ if ac3_is_arc_consistent:
     measure_performance(2, "ac3_verbal_arithmetic_problem", general_genetic_verbal_arithmetic_problem,
                         "genetic_local_search", 100, 100, 0.1)
 
-ac4_verbal_arithmetic_problem = copy.deepcopy(verbal_arithmetic_problem)
+ac4_verbal_arithmetic_problem = verbal_arithmetic_problem.instance()
 ac4_verbal_arithmetic_problem.unassign_all_variables()
 ac4_start_time = time.process_time()
 ac4_is_arc_consistent = csp.ac4(ac4_verbal_arithmetic_problem)
@@ -257,7 +256,7 @@ if ac4_is_arc_consistent:
     measure_performance(2, "ac4_verbal_arithmetic_problem", general_genetic_verbal_arithmetic_problem,
                         "genetic_local_search", 100, 100, 0.1)
 
-pc2_verbal_arithmetic_problem = copy.deepcopy(verbal_arithmetic_problem)
+pc2_verbal_arithmetic_problem = verbal_arithmetic_problem.instance()
 pc2_verbal_arithmetic_problem.unassign_all_variables()
 pc2_start_time = time.process_time()
 pc2_is_path_consistent = csp.pc2(pc2_verbal_arithmetic_problem)
@@ -290,7 +289,7 @@ if pc2_is_path_consistent:
     measure_performance(2, "pc2_verbal_arithmetic_problem", general_genetic_verbal_arithmetic_problem,
                         "genetic_local_search", 100, 100, 0.1)
 
-two_consistency_verbal_arithmetic_problem = copy.deepcopy(verbal_arithmetic_problem)
+two_consistency_verbal_arithmetic_problem = verbal_arithmetic_problem.instance()
 two_consistency_verbal_arithmetic_problem.unassign_all_variables()
 two_consistency_start_time = time.process_time()
 is_two_consistent = csp.i_consistency(two_consistency_verbal_arithmetic_problem, 2)
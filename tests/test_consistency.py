@@ -108,11 +108,96 @@ class TestConsistency(unittest.TestCase):
         for var in self.const_problem3.get_variables():
             self.assertIn(var.domain, wanted_reduced_domains)
 
+    def test_ac4_non_binary_scope(self):
+        x, y, z = csp.Variable((1, 2, 3)), csp.Variable((1, 2, 3)), csp.Variable((1, 2, 3))
+
+        def increasing(values: tuple) -> bool:
+            return all(values[i] < values[i + 1] for i in range(len(values) - 1))
+
+        const_problem = csp.ConstraintProblem((csp.Constraint((x, y, z), increasing),))
+        self.assertTrue(csp.ac4(const_problem))
+        self.assertEqual((x.domain, y.domain, z.domain), ([1], [2], [3]))
+
     def test_pc2(self):
         self.const_problem1.unassign_all_variables()
         res = csp.pc2(self.const_problem1)
         self.assertFalse(res)
 
+    def test_pc2_two(self):
+        res = csp.pc2(self.const_problem3)
+        self.assertTrue(res)
+        wanted_reduced_domains = [[1, 2], [2, 3]]
+        for var in self.const_problem3.get_variables():
+            self.assertIn(var.domain, wanted_reduced_domains)
+
+    def test_sac(self):
+        self.const_problem1.unassign_all_variables()
+        self.assertTrue(csp.ac4(self.const_problem1))
+        self.assertFalse(csp.sac(self.const_problem1))
+
+    def test_sac_two(self):
+        res = csp.sac(self.const_problem2)
+        self.assertTrue(res)
+        reduced_all_values = set()
+        for var in self.const_problem2.get_variables():
+            for val in var.domain:
+                reduced_all_values.add(val)
+        self.assertEqual(reduced_all_values, {2, 4})
+
+    def test_parallel_sac(self):
+        self.const_problem1.unassign_all_variables()
+        self.assertFalse(csp.parallel_sac(self.const_problem1, processes=2))
+        self.assertTrue(csp.parallel_sac(self.const_problem3, processes=2))
+        wanted_reduced_domains = [[1, 2], [2, 3]]
+        for var in self.const_problem3.get_variables():
+            self.assertIn(var.domain, wanted_reduced_domains)
+
+    def test_consistency_events(self):
+        for phase_name, enforce_consistency in (("ac4", csp.ac4), ("pc2", csp.pc2), ("sac", csp.sac),
+                                                ("parallel_sac", csp.parallel_sac)):
+            const_problem = self.const_problem3.instance()
+            fired_events = list()
+            events = csp.SearchEvents()
+            for event in (csp.SearchEvents.PRUNE, csp.SearchEvents.PHASE_START, csp.SearchEvents.PHASE_END):
+                events.add_listener(event, lambda *args, fired_event=event: fired_events.append((fired_event, args)))
+            self.assertTrue(enforce_consistency(const_problem, events=events))
+            self.assertEqual((csp.SearchEvents.PHASE_START, (phase_name,)), fired_events[0])
+            self.assertEqual((csp.SearchEvents.PHASE_END, (phase_name,)), fired_events[-1])
+            x, y = sorted(const_problem.get_variables(), key=lambda variable: variable.domain)
+            self.assertEqual({(csp.SearchEvents.PRUNE, (x, 3)), (csp.SearchEvents.PRUNE, (y, 1))},
+                             set(fired_events[1:-1]))
+
+    def test_consistency_statistics(self):
+        for phase_name, enforce_consistency in (("ac4", csp.ac4), ("pc2", csp.pc2), ("sac", csp.sac),
+                                                ("parallel_sac", csp.parallel_sac)):
+            const_problem = self.const_problem3.instance()
+            statistics = csp.SolverStatistics()
+            self.assertTrue(enforce_consistency(const_problem, statistics=statistics))
+            self.assertLess(0, statistics.constraint_checks)
+            self.assertEqual(2, statistics.pruned_values)
+            self.assertIn(phase_name, statistics.phases_times)
+            for constraint in const_problem.get_constraints():
+                self.assertNotIn("is_consistent", vars(constraint))
+
+    def test_consistency_budget(self):
+        enforcements = [(lambda cp, budget: csp.ac3(cp, budget=budget), self.const_problem1, True),
+                        (lambda cp, budget: csp.ac4(cp, budget=budget), self.const_problem3, True),
+                        (lambda cp, budget: csp.pc2(cp, budget=budget), self.const_problem1, False),
+                        (lambda cp, budget: csp.sac(cp, budget=budget), self.const_problem1, False),
+                        (lambda cp, budget: csp.parallel_sac(cp, 2, budget=budget), self.const_problem1, False),
+                        (lambda cp, budget: csp.i_consistency(cp, 3, budget), self.const_problem1, False)]
+        for enforce_consistency, const_problem, is_consistent in enforcements:
+            budget = csp.SearchBudget()
+            self.assertEqual(is_consistent, enforce_consistency(const_problem.instance(), budget))
+            expected_status = csp.SearchBudget.CONSISTENT if is_consistent else csp.SearchBudget.INFEASIBLE
+            self.assertEqual(expected_status, budget.get_result().status)
+
+            budget = csp.SearchBudget(nodes_limit=0)
+            self.assertTrue(enforce_consistency(const_problem.instance(), budget))
+            self.assertEqual(csp.SearchBudget.TIMED_OUT, budget.get_result().status)
+            self.assertEqual(csp.SearchBudget.NODES, budget.get_result().exhausted_limit)
+            self.assertEqual(0, budget.get_result().nodes)
+
     def test_i_consistency_one(self):
         rand_var = random.choice(tuple(self.const_problem1.get_variables()))
         rand_var.assign(random.choice(rand_var.domain))
@@ -123,7 +208,9 @@ class TestConsistency(unittest.TestCase):
 
     def test_i_consistency_two(self):
         res = csp.i_consistency(self.const_problem1, 2)
-        self.assertFalse(res)
+        self.assertTrue(res)
+        for var in self.const_problem1.get_variables():
+            self.assertEqual(len(var.domain), 2)
 
     def test_i_consistency_three(self):
         res = csp.i_consistency(self.const_problem1, 3)
@@ -135,7 +222,12 @@ class TestConsistency(unittest.TestCase):
 
     def test_i_consistency_five(self):
         res = csp.i_consistency(self.const_problem2, 2)
-        self.assertFalse(res)
+        self.assertTrue(res)
+        reduced_all_values = set()
+        for var in self.const_problem2.get_variables():
+            for val in var.domain:
+                reduced_all_values.add(val)
+        self.assertEqual(reduced_all_values, {2, 4})
 
     def test_i_consistency_six(self):
         res = csp.i_consistency(self.const_problem3, 1)
@@ -145,6 +237,15 @@ class TestConsistency(unittest.TestCase):
         res = csp.i_consistency(self.const_problem3, 2)
         self.assertTrue(res)
 
+    def test_i_consistency_report(self):
+        self.const_problem1.unassign_all_variables()
+        report = csp.i_consistency_with_report(self.const_problem2, 3)
+        self.assertTrue(report.is_consistent)
+        self.assertEqual((report.stored_subsets, report.stored_tuples), (2, 3))
+        report = csp.i_consistency_with_report(self.const_problem1, 3)
+        self.assertFalse(report.is_consistent)
+        self.assertLess(0, report.initial_stored_bytes)
+
     def test_i_consistency_eight(self):
         self.assertRaises(AssertionError, csp.i_consistency, self.const_problem1, 17)
 
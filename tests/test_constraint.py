@@ -43,6 +43,59 @@ class TestConstraint(unittest.TestCase):
         var3.assign(17)
         self.assertTrue(const)
 
+    def test_update_i_consistent_assignments(self):
+        var1 = csp.Variable([i for i in range(5)])
+        var2 = csp.Variable([i for i in range(5)])
+        var3 = csp.Variable([i for i in range(5)])
+        const = csp.Constraint([var1, var2, var3], csp.always_satisfied)
+        const.update_i_consistent_assignments({(1, 2), (3, 4)}, [var3, var1])
+        var1.assign(2)
+        self.assertTrue(const.is_consistent())
+        var3.assign(1)
+        self.assertTrue(const.is_consistent())
+        self.assertFalse(const.is_consistent_with({var1: 1, var3: 2}))
+        var2.assign(0)
+        self.assertTrue(const)
+        const.update_i_consistent_assignments({(3, 4)}, [var3, var1])
+        self.assertFalse(const)
+
+    def test_instance(self):
+        var1 = csp.Variable([i for i in range(5)])
+        var2 = csp.Variable([i for i in range(5)])
+        const = csp.Constraint([var1, var2], csp.all_diff_constraint_evaluator)
+        const.update_i_consistent_assignments({(1, 2), (3, 4)})
+        var1_instance, var2_instance = var1.instance(), var2.instance()
+        const_instance = const.instance({var1: var1_instance, var2: var2_instance})
+        self.assertEqual((var1_instance, var2_instance), const_instance.variables)
+        const_instance.update_i_consistent_assignments({(1, 2)})
+        self.assertFalse(const_instance.is_consistent_with({var1_instance: 3, var2_instance: 4}))
+        self.assertTrue(const.is_consistent_with({var1: 3, var2: 4}))
+        var1_instance.assign(1)
+        self.assertTrue(const_instance.is_consistent())
+        self.assertTrue(const.is_consistent())
+        self.assertFalse(var1)
+
+    def test_instance_with_evaluator(self):
+        var1 = csp.Variable([i for i in range(5)])
+        var2 = csp.Variable([i for i in range(5)])
+        const = csp.Constraint([var1, var2], csp.all_diff_constraint_evaluator)
+        self.assertIs(csp.all_diff_constraint_evaluator, const.evaluate_constraint)
+        evaluated_values = list()
+
+        def recording_evaluator(values):
+            evaluated_values.append(values)
+            return const.evaluate_constraint(values)
+
+        const_instance = const.instance({var1: var1, var2: var2}, recording_evaluator)
+        self.assertEqual(const.variables, const_instance.variables)
+        self.assertIs(recording_evaluator, const_instance.evaluate_constraint)
+        self.assertEqual(4, len(const_instance.get_consistent_domain_values(var1)) - 1)
+        self.assertTrue(const_instance.is_consistent_with({var1: 1, var2: 2}))
+        self.assertEqual(6, len(evaluated_values))
+        const.is_consistent()
+        self.assertEqual(6, len(evaluated_values))
+        self.assertIs(csp.all_diff_constraint_evaluator, const.evaluate_constraint)
+
     def test_UncontainedVariableError(self):
         var1 = csp.Variable([i for i in range(5)], 4)
         var2 = csp.Variable([i for i in range(5, 10)], 6)
@@ -231,6 +231,60 @@ class TestConstraintProblem(unittest.TestCase):
         self.assertTrue(self.const_problem.is_completely_consistently_assigned())
         self.assertFalse(self.const_problem.is_completely_unassigned())
 
+    def test_evaluate_assignment_without_assigning(self):
+        colors = {"wa": "red", "nt": "green", "sa": "blue", "q": "red", "nsw": "green", "v": "red", "t": "blue"}
+        my_assignment = {self.variables[name]: color for name, color in colors.items()}
+        self.assertTrue(self.const_problem.is_completely_consistently_assigned(my_assignment))
+        self.assertTrue(self.const_problem.is_consistently_assigned(my_assignment))
+        self.assertEqual(len(self.const_problem.get_satisfied_constraints(my_assignment)), len(self.constraints))
+        my_assignment[self.variables["nt"]] = "red"
+        self.assertFalse(self.const_problem.is_completely_consistently_assigned(my_assignment))
+        self.assertEqual(len(self.const_problem.get_inconsistent_constraints(my_assignment)), 2)
+        self.assertEqual(len(self.const_problem.get_unsatisfied_constraints(my_assignment)), 2)
+        del my_assignment[self.variables["t"]]
+        self.assertEqual(len(self.const_problem.get_consistent_constraints(my_assignment)), len(self.constraints) - 2)
+        self.assertEqual(len(self.const_problem.get_unsatisfied_constraints(my_assignment)), 3)
+        self.assertTrue(self.const_problem.is_completely_unassigned())
+
+    def test_instance(self):
+        self.variables["sa"].assign("red")
+        problem_instance = self.const_problem.instance()
+        instance_variables = problem_instance.get_name_to_variable_map()
+        self.assertTrue(problem_instance.get_variables().isdisjoint(self.const_problem.get_variables()))
+        self.assertEqual(problem_instance.get_variables(), frozenset(instance_variables.values()))
+        self.assertEqual("red", instance_variables["sa"].value)
+        self.assertEqual(problem_instance.get_neighbors(instance_variables["sa"]),
+                         {instance_variables[name] for name in ("wa", "nt", "q", "nsw", "v")})
+        self.assertEqual(len(problem_instance.get_constraints_containing_variable(instance_variables["nsw"])), 3)
+
+        csp.backtracking_search(problem_instance)
+        self.assertTrue(problem_instance.is_completely_consistently_assigned())
+        self.assertEqual(self.const_problem.get_assigned_variables(), {self.variables["sa"]})
+        problem_instance.get_name_to_variable_map()["wa"].remove_from_domain("blue")
+        self.assertEqual(len(self.variables["wa"].domain), 3)
+
+    def test_constraints_instance(self):
+        instantiated_constraints = dict()
+
+        def instantiate_constraint(constraint):
+            constraint_instance = constraint.instance({variable: variable for variable in constraint.variables})
+            instantiated_constraints[constraint_instance] = constraint
+            return constraint_instance
+
+        problem_instance = self.const_problem.constraints_instance(instantiate_constraint)
+        self.assertEqual(problem_instance.get_constraints(), frozenset(instantiated_constraints))
+        self.assertEqual(list(problem_instance.get_variables()), list(self.const_problem.get_variables()))
+        self.assertIs(problem_instance.get_name_to_variable_map()["sa"], self.variables["sa"])
+        self.assertIs(problem_instance.get_constraint_graph_as_adjacency_list(),
+                      self.const_problem.get_constraint_graph_as_adjacency_list())
+        for variable in self.const_problem.get_variables():
+            self.assertEqual(problem_instance.get_neighbors(variable), self.const_problem.get_neighbors(variable))
+            self.assertEqual({instantiated_constraints[constraint] for constraint in
+                              problem_instance.get_constraints_containing_variable(variable)},
+                             self.const_problem.get_constraints_containing_variable(variable))
+        self.variables["sa"].assign("red")
+        self.assertEqual(problem_instance.get_assigned_variables(), {self.variables["sa"]})
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,8 +1,44 @@
+import os
+import copy
+import pickle
+import itertools
+import collections
 import random
+import tempfile
 import unittest
+import multiprocessing
+from itertools import zip_longest
+from concurrent.futures import ThreadPoolExecutor
 import csp
 
 
+class IslandMarkingGeneticConstraintProblem(csp.GeneticConstraintProblem):
+    """ Each island's individuals are copies of a single random assignment, which marks the island. Evolution keeps
+        the individuals as they are, and the marks of every population natural selection is performed on are recorded
+        to received_marks. """
+
+    def __init__(self, constraint_problem, received_marks):
+        super(IslandMarkingGeneticConstraintProblem, self).__init__(constraint_problem)
+        self.received_marks = received_marks
+
+    def generate_population(self, population_size):
+        mark = random.randrange(1000)
+        return [dict.fromkeys(self._constraint_problem.get_variables(), mark) for i in range(population_size)]
+
+    def calculate_fitness(self, individual):
+        return 0
+
+    def perform_natural_selection(self, population):
+        self.received_marks.append(frozenset(value for individual in population for value in individual.values()))
+        return population
+
+    def reproduce_next_generation(self, old_generation):
+        return list(old_generation)
+
+    def mutate_population(self, population, mutation_probability):
+        pass
+
+
 class TestGraphColoring(unittest.TestCase):
 
     def setUp(self):
@@ -69,15 +105,395 @@ class TestGraphColoring(unittest.TestCase):
         csp.heuristic_backtracking_search(self.const_problem1)
         self.assertTrue(self.const_problem1.is_completely_consistently_assigned())
 
+    def test_mac_backtracking(self):
+        domains = {variable: sorted(variable.domain) for variable in self.const_problem1.get_variables()}
+        csp.mac_backtracking_search(self.const_problem1)
+        self.assertTrue(self.const_problem1.is_completely_consistently_assigned())
+        for variable in self.const_problem1.get_variables():
+            self.assertEqual(domains[variable], sorted(variable.domain))
+
+    def test_mac_backtracking_all_solutions(self):
+        self.const_problem1.unassign_all_variables()
+        solutions = list(csp.mac_backtracking_search(self.const_problem1, find_all_solutions=True))
+        self.assertEqual(18, len(solutions))
+        self.assertEqual(18, len({frozenset(solution.items()) for solution in solutions}))
+
+    def test_solver_statistics(self):
+        self.const_problem1.unassign_all_variables()
+        statistics = csp.SolverStatistics()
+        csp.backtracking_search(self.const_problem1, statistics=statistics)
+        self.assertTrue(self.const_problem1.is_completely_consistently_assigned())
+        self.assertEqual(7, statistics.depth)
+        self.assertEqual(7, statistics.peak_depth)
+        self.assertEqual(statistics.nodes - statistics.backtracks, statistics.depth)
+        self.assertLess(0, statistics.constraint_checks)
+        self.assertIn("search", statistics.phases_times)
+
+        constraint_checks = statistics.constraint_checks
+        self.const_problem1.is_consistently_assigned()
+        self.assertEqual(constraint_checks, statistics.constraint_checks)
+
+        self.const_problem1.unassign_all_variables()
+        statistics.reset()
+        solutions = list(csp.mac_backtracking_search(self.const_problem1, find_all_solutions=True,
+                                                     statistics=statistics))
+        self.assertEqual(18, len(solutions))
+        self.assertEqual(0, statistics.depth)
+        self.assertLess(0, statistics.pruned_values)
+        self.assertLess(0, statistics.queue_pushes)
+
+    def test_solver_statistics_leave_constraints_unchanged(self):
+        self.const_problem1.unassign_all_variables()
+        statistics, ac3_statistics, single_ac3_statistics = (csp.SolverStatistics() for i in range(3))
+        solutions_amount = 0
+        for solution in csp.backtracking_search(self.const_problem1, find_all_solutions=True, statistics=statistics):
+            for constraint in self.const_problem1.get_constraints():
+                self.assertNotIn("is_consistent", vars(constraint))
+            pickle.dumps(self.const_problem1)
+            constraint_checks = statistics.constraint_checks
+            self.assertTrue(self.const_problem1.is_consistently_assigned())
+            self.assertTrue(csp.ac3(self.const_problem1, statistics=ac3_statistics))
+            self.assertEqual(constraint_checks, statistics.constraint_checks)
+            solutions_amount += 1
+        self.assertEqual(18, solutions_amount)
+        self.assertLess(0, statistics.constraint_checks)
+
+        self.const_problem1.assign_variables_from_assignment(solution)
+        self.assertTrue(csp.ac3(self.const_problem1, statistics=single_ac3_statistics))
+        self.assertEqual(solutions_amount * single_ac3_statistics.constraint_checks, ac3_statistics.constraint_checks)
+
+    def test_solver_statistics_of_structural_solvers(self):
+        solvers = [("tree_csp_solver", self.const_problem2, lambda cp, statistics:
+                    csp.tree_csp_solver(cp, statistics=statistics)),
+                   ("cycle_cutset", self.const_problem1, lambda cp, statistics:
+                    csp.naive_cycle_cutset(cp, statistics=statistics)),
+                   ("tree_decomposition", self.const_problem1, lambda cp, statistics:
+                    csp.tree_decomposition_solver(cp, statistics=statistics))]
+        for phase_name, const_problem, solve in solvers:
+            const_problem.unassign_all_variables()
+            statistics = csp.SolverStatistics()
+            solve(const_problem, statistics)
+            self.assertTrue(const_problem.is_completely_consistently_assigned())
+            self.assertLess(0, statistics.nodes)
+            self.assertLess(0, statistics.constraint_checks)
+            self.assertIn(phase_name, statistics.phases_times)
+        self.assertEqual(len(self.const_problem1.get_variables()), statistics.nodes)
+
+        self.const_problem1.unassign_all_variables()
+        statistics = csp.SolverStatistics()
+        self.assertEqual(18, csp.count_solutions_with_tree_decomposition(self.const_problem1, statistics=statistics))
+        self.assertEqual(len(self.const_problem1.get_variables()), statistics.nodes)
+        self.assertLess(0, statistics.constraint_checks)
+
+    def test_solver_statistics_of_local_searches(self):
+        self.name_to_variable_map["wa"].domain = ["red"]
+        self.name_to_variable_map["nt"].domain = ["red"]
+        for anneal in (csp.simulated_annealing, csp.move_based_simulated_annealing):
+            statistics = csp.SolverStatistics()
+            anneal(self.const_problem1, 20, 0.5, 0.9, statistics=statistics)
+            self.assertEqual(19, statistics.nodes)
+
+        self.const_problem1.unassign_all_variables()
+        statistics = csp.SolverStatistics()
+        csp.constraints_weighting(self.const_problem1, 3, statistics=statistics)
+        self.assertLess(0, statistics.nodes)
+        self.assertEqual(2, statistics.restarts)
+        self.assertLess(0, statistics.constraint_checks)
+        self.assertIn("constraints_weighting", statistics.phases_times)
+        for constraint in self.const_problem1.get_constraints():
+            self.assertNotIn("is_consistent", vars(constraint))
+
+    def test_search_events(self):
+        self.const_problem1.unassign_all_variables()
+        events = csp.SearchEvents()
+        fired_events = list()
+        for event in (csp.SearchEvents.ASSIGN, csp.SearchEvents.UNASSIGN, csp.SearchEvents.CONFLICT,
+                      csp.SearchEvents.SOLUTION, csp.SearchEvents.PHASE_START, csp.SearchEvents.PHASE_END):
+            events.add_listener(event, lambda *args, fired_event=event: fired_events.append((fired_event, args)))
+        csp.backtracking_search(self.const_problem1, events=events)
+        self.assertTrue(self.const_problem1.is_completely_consistently_assigned())
+        self.assertEqual((csp.SearchEvents.PHASE_START, ("search",)), fired_events[0])
+        self.assertEqual((csp.SearchEvents.PHASE_END, ("search",)), fired_events[-1])
+        solution_events = [args for event, args in fired_events if event == csp.SearchEvents.SOLUTION]
+        self.assertEqual([(self.const_problem1.get_current_assignment(),)], solution_events)
+        assignments = sum(1 for event, args in fired_events if event == csp.SearchEvents.ASSIGN)
+        unassignments = sum(1 for event, args in fired_events if event == csp.SearchEvents.UNASSIGN)
+        self.assertEqual(7, assignments - unassignments)
+        for event, args in fired_events:
+            if event == csp.SearchEvents.CONFLICT:
+                variable, constraints = args
+                self.assertTrue(constraints)
+                self.assertTrue(all(variable in constraint.variables for constraint in constraints))
+
+        self.const_problem1.unassign_all_variables()
+        pruned_values = list()
+        events = csp.SearchEvents()
+        events.add_listener(csp.SearchEvents.PRUNE, lambda variable, value: pruned_values.append(value))
+        csp.mac_backtracking_search(self.const_problem1, events=events)
+        self.assertTrue(self.const_problem1.is_completely_consistently_assigned())
+        self.assertTrue(pruned_values)
+
+    def test_search_events_leave_statistics_unchanged(self):
+        # a single constraint, so the checks don't depend on the order constraints are checked in
+        variables = [csp.Variable((1, 2)) for i in range(3)]
+        const_problem = csp.ConstraintProblem((csp.Constraint(variables, csp.all_diff_constraint_evaluator),))
+        statistics, events_statistics = csp.SolverStatistics(), csp.SolverStatistics()
+        conflicts = list()
+        events = csp.SearchEvents()
+        events.add_listener(csp.SearchEvents.CONFLICT, lambda variable, constraints: conflicts.append(constraints))
+        for run_statistics, run_events in ((statistics, None), (events_statistics, events)):
+            const_problem.unassign_all_variables()
+            self.assertFalse(list(csp.backtracking_search(const_problem, find_all_solutions=True,
+                                                          statistics=run_statistics, events=run_events)))
+        self.assertTrue(conflicts)
+        self.assertLess(0, statistics.constraint_checks)
+        self.assertEqual(statistics.constraint_checks, events_statistics.constraint_checks)
+
+    def test_local_search_events(self):
+        self.const_problem1.unassign_all_variables()
+        fired_events = list()
+        events = csp.SearchEvents()
+        for event in (csp.SearchEvents.ASSIGN, csp.SearchEvents.SOLUTION, csp.SearchEvents.PHASE_START,
+                      csp.SearchEvents.PHASE_END):
+            events.add_listener(event, lambda *args, fired_event=event: fired_events.append((fired_event, args)))
+        csp.constraints_weighting(self.const_problem1, 1000, events=events)
+        self.assertTrue(self.const_problem1.is_completely_consistently_assigned())
+        self.assertEqual((csp.SearchEvents.PHASE_START, ("constraints_weighting",)), fired_events[0])
+        self.assertEqual((csp.SearchEvents.PHASE_END, ("constraints_weighting",)), fired_events[-1])
+        self.assertEqual((csp.SearchEvents.SOLUTION, (self.const_problem1.get_current_assignment(),)),
+                         fired_events[-2])
+
+        start_assignments = list()
+
+        def recording_start_state(constraint_problem):
+            csp.generate_start_state_randomly(constraint_problem)
+            start_assignments.append(constraint_problem.get_current_assignment())
+
+        assignment = dict()
+        solutions = list()
+        events = csp.SearchEvents()
+        events.add_listener(csp.SearchEvents.ASSIGN, assignment.__setitem__)
+        events.add_listener(csp.SearchEvents.SOLUTION, solutions.append)
+        self.const_problem1.unassign_all_variables()
+        csp.move_based_simulated_annealing(self.const_problem1, 1000, 0.5, 0.99999,
+                                           generate_start_state=recording_start_state, events=events)
+        self.assertTrue(self.const_problem1.is_completely_consistently_assigned())
+        self.assertEqual([self.const_problem1.get_current_assignment()], solutions)
+        self.assertEqual(self.const_problem1.get_current_assignment(), {**start_assignments[0], **assignment})
+
+    def test_action_history(self):
+        self.const_problem1.unassign_all_variables()
+        codec = csp.ActionCodec(tuple(self.const_problem1.get_variables()))
+        actions_history = list(csp.backtracking_search(self.const_problem1, with_history=True))
+        self.const_problem1.unassign_all_variables()
+        ring_buffer = csp.RingBufferActionHistory(codec, 4)
+        self.assertIs(ring_buffer, csp.backtracking_search(self.const_problem1, history=ring_buffer))
+        self.assertEqual(len(actions_history), ring_buffer.get_appended_amount())
+        self.assertEqual(actions_history[-4:], list(ring_buffer))
+        ring_buffer.clear()
+        ring_buffer.extend(actions_history[:3])
+        self.assertEqual(3, len(ring_buffer))
+        self.assertEqual(3, ring_buffer.get_appended_amount())
+        self.assertEqual(actions_history[:3], list(ring_buffer))
+
+        self.const_problem1.unassign_all_variables()
+        with tempfile.TemporaryDirectory() as directory_name:
+            file_name = os.path.join(directory_name, "history.gz")
+            with csp.GzipActionHistory(codec, file_name, buffer_size=3) as gzip_history:
+                csp.mac_backtracking_search(self.const_problem1, history=gzip_history)
+            solution = self.const_problem1.get_current_assignment()
+            self.const_problem1.unassign_all_variables()
+            csp.replay_actions(csp.read_action_history(codec, file_name, buffer_size=5))
+        self.assertEqual(solution, self.const_problem1.get_current_assignment())
+
+        class ExtendOnlyActionHistory(csp.ActionHistory):
+            def extend(self, actions):
+                pass
+
+        self.assertRaises(TypeError, csp.ActionHistory, codec)
+        self.assertRaises(TypeError, ExtendOnlyActionHistory, codec)
+
+    def test_concurrent_searches(self):
+        self.const_problem1.unassign_all_variables()
+        first_history = csp.backtracking_search(self.const_problem1, with_history=True)
+        first_history_length = len(first_history)
+        self.const_problem1.unassign_all_variables()
+        second_history = csp.backtracking_search(self.const_problem1, with_history=True)
+        self.assertIsNot(first_history, second_history)
+        self.assertEqual(first_history_length, len(first_history))
+
+        self.const_problem1.unassign_all_variables()
+        other_problem = copy.deepcopy(self.const_problem1)
+        first_statistics, second_statistics = csp.SolverStatistics(), csp.SolverStatistics()
+        first_solutions = csp.mac_backtracking_search(self.const_problem1, True, statistics=first_statistics)
+        second_solutions = csp.backtracking_search(other_problem, find_all_solutions=True,
+                                                   statistics=second_statistics)
+        solutions_pairs = list(zip_longest(first_solutions, second_solutions))
+        self.assertEqual(18, len(solutions_pairs))
+        self.assertTrue(all(first_solution and second_solution for first_solution, second_solution in solutions_pairs))
+        self.assertEqual(first_statistics.nodes - first_statistics.backtracks, 0)
+        self.assertEqual(second_statistics.nodes - second_statistics.backtracks, 0)
+
+        problems = [copy.deepcopy(self.const_problem1) for _ in range(4)]
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            histories = list(executor.map(lambda problem: csp.forward_checking_backtracking_search(
+                problem, with_history=True), problems))
+        self.assertEqual(4, len(frozenset(map(id, histories))))
+        self.assertTrue(all(problem.is_completely_consistently_assigned() for problem in problems))
+
+    def test_search_budget(self):
+        self.const_problem1.unassign_all_variables()
+        budget = csp.SearchBudget(nodes_limit=3)
+        csp.backtracking_search(self.const_problem1, budget=budget)
+        result = budget.get_result()
+        self.assertEqual(csp.SearchBudget.TIMED_OUT, result.status)
+        self.assertEqual(csp.SearchBudget.NODES, result.exhausted_limit)
+        self.assertEqual(result.assignment, self.const_problem1.get_current_assignment())
+        self.assertTrue(self.const_problem1.is_consistently_assigned())
+        self.assertLessEqual(len(self.const_problem1.get_assigned_variables()), 3)
+        self.assertEqual(3, result.nodes)
+
+        self.const_problem1.unassign_all_variables()
+        budget = csp.SearchBudget(time_limit=0, check_interval=1)
+        csp.classic_heuristic_backtracking_search(self.const_problem1, budget=budget)
+        self.assertEqual(csp.SearchBudget.TIME, budget.get_result().exhausted_limit)
+        self.assertEqual(1, budget.get_result().nodes)
+
+        self.const_problem1.unassign_all_variables()
+        budget = csp.SearchBudget(time_limit=60, nodes_limit=10 ** 6)
+        csp.mac_backtracking_search(self.const_problem1, budget=budget)
+        self.assertEqual(csp.SearchBudget.SOLVED, budget.get_result().status)
+        self.assertIsNone(budget.get_result().exhausted_limit)
+        self.assertTrue(self.const_problem1.is_completely_consistently_assigned())
+
+        self.const_problem1.unassign_all_variables()
+        budget = csp.SearchBudget(nodes_limit=20)
+        solutions = list(csp.forward_checking_backtracking_search(self.const_problem1, True, budget=budget))
+        self.assertTrue(0 < len(solutions) < 18)
+        self.assertEqual(csp.SearchBudget.SOLVED, budget.get_result().status)
+        self.assertEqual(csp.SearchBudget.NODES, budget.get_result().exhausted_limit)
+        self.assertTrue(self.const_problem1.is_completely_unassigned())
+
+        triangle_variables = csp.Variable.from_domain(3, ["red", "green"])
+        triangle_constraint = csp.Constraint(triangle_variables, csp.all_diff_constraint_evaluator)
+        triangle_problem = csp.ConstraintProblem([triangle_constraint])
+        budget = csp.SearchBudget(nodes_limit=100)
+        csp.backtracking_search(triangle_problem, budget=budget)
+        self.assertEqual(csp.SearchBudget.INFEASIBLE, budget.get_result().status)
+
+        self.const_problem1.unassign_all_variables()
+        budget = csp.SearchBudget(nodes_limit=0)
+        csp.min_conflicts(self.const_problem1, 100, budget=budget)
+        result = budget.get_result()
+        self.assertEqual(result.assignment, self.const_problem1.get_current_assignment())
+        if result.status != csp.SearchBudget.SOLVED:
+            self.assertEqual(csp.SearchBudget.TIMED_OUT, result.status)
+            self.assertEqual(csp.SearchBudget.NODES, result.exhausted_limit)
+
+    def test_search_budget_stops_solvers(self):
+        self.name_to_variable_map["wa"].domain = ["red"]
+        self.name_to_variable_map["nt"].domain = ["red"]
+        genetic_problem = csp.GeneralGeneticConstraintProblem(self.const_problem1, 0.1)
+        solvers = [lambda budget: csp.naive_cycle_cutset(self.const_problem1, budget=budget),
+                   lambda budget: csp.parallel_cycle_cutset(self.const_problem1, processes=2, budget=budget),
+                   lambda budget: csp.tree_decomposition_solver(self.const_problem1, budget=budget),
+                   lambda budget: csp.count_solutions_with_tree_decomposition(self.const_problem1, budget=budget)]
+        for solve in solvers:
+            self.const_problem1.unassign_all_variables()
+            budget = csp.SearchBudget()
+            solve(budget)
+            self.assertEqual(csp.SearchBudget.INFEASIBLE, budget.get_result().status)
+            self.assertLess(0, budget.get_result().nodes)
+
+            self.const_problem1.unassign_all_variables()
+            budget = csp.SearchBudget(nodes_limit=0)
+            solve(budget)
+            self.assertEqual(csp.SearchBudget.TIMED_OUT, budget.get_result().status)
+            self.assertEqual(csp.SearchBudget.NODES, budget.get_result().exhausted_limit)
+            self.assertEqual(0, budget.get_result().nodes)
+
+        self.const_problem1.unassign_all_variables()
+        self.assertIsNone(csp.count_solutions_with_tree_decomposition(self.const_problem1,
+                                                                      budget=csp.SearchBudget(nodes_limit=0)))
+
+        genetic_solvers = [lambda budget: csp.genetic_local_search(genetic_problem, 10, 20, 0.1, budget=budget),
+                           lambda budget: csp.island_genetic_local_search(genetic_problem, 2, 10, 5, 0.1, 5, 1,
+                                                                          processes=2, random_seed=0, budget=budget)]
+        for solve in genetic_solvers:
+            budget = csp.SearchBudget(nodes_limit=0)
+            self.assertIs(self.const_problem1, solve(budget))
+            self.assertEqual(csp.SearchBudget.TIMED_OUT, budget.get_result().status)
+            self.assertEqual(csp.SearchBudget.NODES, budget.get_result().exhausted_limit)
+            self.assertEqual(0, budget.get_result().nodes)
+            self.assertEqual(budget.get_result().assignment, self.const_problem1.get_current_assignment())
+
+    def test_search_budget_best_assignment(self):
+        for nodes_limit in range(2, 7):
+            x, y, z, w = csp.Variable.from_domain(4, ["red", "green"])
+            constraints = [csp.Constraint(pair, csp.all_diff_constraint_evaluator) for pair in ((x, y), (y, z), (x, z))]
+            constraints.append(csp.Constraint([w], csp.always_satisfied))
+            const_problem = csp.ConstraintProblem(constraints)
+            budget = csp.SearchBudget(nodes_limit=nodes_limit)
+            csp.classic_backtracking_search(const_problem, budget=budget)
+            result = budget.get_result()
+            self.assertEqual(csp.SearchBudget.TIMED_OUT, result.status)
+            self.assertEqual(result.assignment, const_problem.get_current_assignment())
+            self.assertTrue(const_problem.is_consistently_assigned())
+            self.assertLessEqual(len(const_problem.get_assigned_variables()), nodes_limit)
+
     def test_min_conflicts(self):
         csp.min_conflicts(self.const_problem1, 100)
         self.assertTrue(self.const_problem1.is_completely_consistently_assigned())
 
+    def test_parallel_min_conflicts(self):
+        result = csp.parallel_min_conflicts(self.const_problem1, 100, 4, seed=0, processes=2)
+        self.assertTrue(result.is_solved)
+        self.assertEqual(len(result.runs), 4)
+        self.assertTrue(self.const_problem1.is_completely_consistently_assigned())
+
     def test_constraint_weighting(self):
         self.const_problem1.unassign_all_variables()
         csp.constraints_weighting(self.const_problem1, 1000)
         self.assertTrue(self.const_problem1.is_completely_consistently_assigned())
 
+    def test_constraint_weighting_restores_best_assignment(self):
+        name_to_variable_map = csp.Variable.from_names_to_equal_domain(self.name_to_variable_map, ["red", "green"])
+        constraints = [csp.Constraint([name_to_variable_map[name] for name in constraint_names],
+                                      csp.all_diff_constraint_evaluator)
+                       for constraint_names in (("sa", "wa"), ("sa", "nt"), ("sa", "q"), ("sa", "nsw"), ("sa", "v"),
+                                                ("wa", "nt"), ("nt", "q"), ("q", "nsw"), ("nsw", "v"), ("t",))]
+        const_problem = csp.ConstraintProblem(constraints)
+        unsatisfied_amounts = list()
+        events = csp.SearchEvents()
+        events.add_listener(csp.SearchEvents.ASSIGN, lambda variable, value: unsatisfied_amounts.append(
+            len(const_problem.get_unsatisfied_constraints())))
+        for i in range(10):
+            unsatisfied_amounts.clear()
+            const_problem.unassign_all_variables()
+            budget = csp.SearchBudget(nodes_limit=50)
+            csp.constraints_weighting(const_problem, 3, events=events, budget=budget)
+            self.assertTrue(const_problem.is_completely_assigned())
+            self.assertLessEqual(len(const_problem.get_unsatisfied_constraints()), min(unsatisfied_amounts))
+            self.assertEqual(csp.SearchBudget.TIMED_OUT, budget.get_result().status)
+            self.assertEqual(budget.get_result().assignment, const_problem.get_current_assignment())
+
+    def test_constraint_weighting_solves_eight_queens(self):
+        queens = [csp.Variable(range(8)) for i in range(8)]
+
+        def get_non_attacking_evaluator(distance):
+            return lambda rows: len(rows) < 2 or (rows[0] != rows[1] and abs(rows[0] - rows[1]) != distance)
+
+        constraints = [csp.Constraint((queens[i], queens[j]), get_non_attacking_evaluator(j - i))
+                       for i, j in itertools.combinations(range(8), 2)]
+        const_problem = csp.ConstraintProblem(constraints)
+        for seed in range(10):
+            random.seed(seed)
+            const_problem.unassign_all_variables()
+            budget = csp.SearchBudget(nodes_limit=1000)
+            csp.constraints_weighting(const_problem, 100, budget=budget)
+            self.assertEqual(csp.SearchBudget.SOLVED, budget.get_result().status)
+            self.assertTrue(const_problem.is_completely_consistently_assigned())
+
     def test_hill_climber(self):
         const_prob = csp.random_restart_first_choice_hill_climbing(self.const_problem1, 100, 100, 100)
         self.assertTrue(const_prob.is_completely_consistently_assigned())
@@ -86,6 +502,82 @@ class TestGraphColoring(unittest.TestCase):
         const_prob = csp.simulated_annealing(self.const_problem1, 1000, 0.5, 0.99999)
         self.assertTrue(const_prob.is_completely_consistently_assigned())
 
+    def test_simulated_annealer_restores_best_state(self):
+        scored = []
+
+        def recording_score(constraint_problem):
+            score = csp.consistent_constraints_amount(constraint_problem)
+            scored.append((score, constraint_problem))
+            return score
+
+        random.seed(0)
+        const_prob = csp.simulated_annealing(self.const_problem1, 20, 5.0, 0.9, calculate_score=recording_score)
+        self.assertTrue(const_prob.is_completely_assigned())
+        best_score = max(score for score, scored_problem in scored)
+        best_score_problem = next(scored_problem for score, scored_problem in scored if score == best_score)
+        self.assertEqual(best_score, csp.consistent_constraints_amount(const_prob))
+        self.assertIs(best_score_problem, const_prob)
+
+    def test_parallel_tempering(self):
+        temperatures = csp.geometric_temperature_ladder(0.1, 2.0, 4)
+        phases = list()
+        events = csp.SearchEvents()
+        events.add_listener(csp.SearchEvents.PHASE_START, phases.append)
+        const_prob = csp.parallel_tempering(self.const_problem1, 1000, temperatures, 50, processes=2, random_seed=0,
+                                            events=events)
+        self.assertIs(self.const_problem1, const_prob)
+        self.assertTrue(const_prob.is_completely_consistently_assigned())
+        self.assertEqual(["parallel_tempering"], phases)
+
+    def test_parallel_tempering_budget(self):
+        self.name_to_variable_map["wa"].domain = ["red"]
+        self.name_to_variable_map["nt"].domain = ["red"]
+        temperatures = csp.geometric_temperature_ladder(0.1, 2.0, 3)
+        for nodes_limit in (0, 2):
+            budget = csp.SearchBudget(nodes_limit=nodes_limit)
+            const_prob = csp.parallel_tempering(self.const_problem1, 1000, temperatures, 10, processes=2,
+                                                random_seed=0, budget=budget)
+            self.assertIs(self.const_problem1, const_prob)
+            self.assertEqual(csp.SearchBudget.TIMED_OUT, budget.get_result().status)
+            self.assertEqual(csp.SearchBudget.NODES, budget.get_result().exhausted_limit)
+            self.assertEqual(nodes_limit, budget.get_result().nodes)
+            self.assertEqual(7, len(const_prob.get_assigned_variables()))
+
+    def test_move_based_hill_climber(self):
+        const_prob = csp.move_based_random_restart_first_choice_hill_climbing(self.const_problem1, 100, 100, 100)
+        self.assertIs(const_prob, self.const_problem1)
+        self.assertTrue(const_prob.is_completely_consistently_assigned())
+
+    def test_move_based_hill_climber_keeps_last_step(self):
+        wa = self.name_to_variable_map["wa"]
+
+        def all_red_start_state(constraint_problem):
+            constraint_problem.unassign_all_variables()
+            for variable in constraint_problem.get_variables():
+                variable.assign("red")
+
+        def recolor_wa_move(constraint_problem):
+            return (wa, wa.value, "green"),
+
+        const_prob = csp.move_based_random_restart_first_choice_hill_climbing(
+            self.const_problem1, 1, 1, 1, generate_start_state=all_red_start_state, generate_move=recolor_wa_move)
+        self.assertFalse(const_prob.is_completely_consistently_assigned())
+        self.assertEqual("green", wa.value)
+
+    def test_move_based_simulated_annealer(self):
+        const_prob = csp.move_based_simulated_annealing(self.const_problem1, 1000, 0.5, 0.99999)
+        self.assertIs(const_prob, self.const_problem1)
+        self.assertTrue(const_prob.is_completely_consistently_assigned())
+
+    def test_consistent_constraints_delta(self):
+        csp.generate_start_state_randomly(self.const_problem1)
+        score = csp.consistent_constraints_amount(self.const_problem1)
+        move = csp.alter_random_variable_value_move(self.const_problem1)
+        delta = csp.consistent_constraints_delta(self.const_problem1, move)
+        self.assertEqual(score + delta, csp.consistent_constraints_amount(self.const_problem1))
+        csp.undo_move(move)
+        self.assertEqual(score, csp.consistent_constraints_amount(self.const_problem1))
+
     def test_genetic_local_search(self):
         common_genetic_constraint_problem = csp.GeneralGeneticConstraintProblem(self.const_problem1, 0.1)
         rand_var = random.choice(list(common_genetic_constraint_problem.get_constraint_problem().get_variables()))
@@ -94,14 +586,164 @@ class TestGraphColoring(unittest.TestCase):
         solution = csp.genetic_local_search(common_genetic_constraint_problem, 100, 10, 0.1)
         self.assertTrue(solution.is_completely_consistently_assigned())
 
+    def test_general_genetic_encoding(self):
+        wa = self.name_to_variable_map["wa"]
+        wa.assign("red")
+        genetic_problem = csp.GeneralGeneticConstraintProblem(self.const_problem1, 0.1, frozenset({wa}))
+        for individual in genetic_problem.generate_population(20):
+            assignment = genetic_problem.decode_individual(individual)
+            self.assertEqual(set(self.const_problem1.get_variables()), set(assignment))
+            self.assertEqual("red", assignment[wa])
+            self.assertEqual(individual, genetic_problem.encode_assignment(assignment))
+        self.const_problem1.assign_variables_with_random_values(frozenset({wa}))
+        assignment = self.const_problem1.get_current_assignment()
+        self.assertEqual(assignment, genetic_problem.decode_individual(genetic_problem.encode_assignment(assignment)))
+
+    def test_general_genetic_crossover(self):
+        random.seed(0)
+        genetic_problem = csp.GeneralGeneticConstraintProblem(self.const_problem1, 0.1)
+        parent1, parent2 = (0, 1, 2, 0, 1, 2, 0), (1, 2, 0, 1, 2, 0, 1)
+        children = genetic_problem.reproduce_next_generation([parent1, parent2] * 10)
+        self.assertEqual(40, len(children))
+        for child in children:
+            self.assertEqual(7, len(child))
+            for i, value in enumerate(child):
+                self.assertIn(value, (parent1[i], parent2[i]))
+        self.assertTrue(any(child not in (parent1, parent2) for child in children))
+        for i in range(7):
+            self.assertEqual({parent1[i], parent2[i]}, {child[i] for child in children})
+
+    def test_general_genetic_fitness_cache(self):
+        genetic_problem = csp.GeneralGeneticConstraintProblem(self.const_problem1, 0.1)
+        evaluated = []
+        get_consistent_constraints = self.const_problem1.get_consistent_constraints
+
+        def counting_get_consistent_constraints(assignment=None):
+            evaluated.append(assignment)
+            return get_consistent_constraints(assignment)
+
+        self.const_problem1.get_consistent_constraints = counting_get_consistent_constraints
+        population = list(set(genetic_problem.generate_population(40)))
+        for individual in population:
+            genetic_problem.calculate_fitness(individual)
+            genetic_problem.calculate_fitness(individual)
+        self.assertEqual(len(population), len(evaluated))
+        survivors = genetic_problem.perform_natural_selection(list(population))
+        self.assertEqual(len(population) >> 1, len(survivors))
+        del evaluated[:]
+        for individual in survivors:
+            genetic_problem.calculate_fitness(individual)
+        self.assertEqual([], evaluated)
+        dead = [individual for individual in population if individual not in survivors]
+        for individual in dead:
+            genetic_problem.calculate_fitness(individual)
+        self.assertEqual(len(dead), len(evaluated))
+
+    def test_island_genetic_local_search(self):
+        common_genetic_constraint_problem = csp.GeneralGeneticConstraintProblem(self.const_problem1, 0.1)
+        solution = csp.island_genetic_local_search(common_genetic_constraint_problem, 3, 50, 20, 0.1, 5, 2,
+                                                   processes=2, random_seed=0)
+        self.assertIs(solution, self.const_problem1)
+        self.assertTrue(solution.is_completely_consistently_assigned())
+
+    def test_island_genetic_local_search_migration(self):
+        x, y = csp.Variable(range(1000)), csp.Variable(range(1000))
+        const_problem = csp.ConstraintProblem([csp.Constraint((x, y), csp.all_diff_constraint_evaluator)])
+        with multiprocessing.Manager() as manager:
+            received_marks = manager.list()
+            genetic_problem = IslandMarkingGeneticConstraintProblem(const_problem, received_marks)
+            csp.island_genetic_local_search(genetic_problem, 3, 4, 2, 0.0, 1, 1,
+                                            csp.fully_connected_migration_topology, processes=3, random_seed=0)
+            received_marks = sorted(received_marks, key=len)
+        first_round_marks, second_round_marks = received_marks[:3], received_marks[3:]
+        islands_marks = frozenset.union(*first_round_marks)
+        self.assertEqual([1, 1, 1], [len(marks) for marks in first_round_marks])
+        self.assertEqual(3, len(islands_marks))
+        self.assertEqual([islands_marks] * 3, second_round_marks)
+
     def test_tree_csp_solver(self):
         csp.tree_csp_solver(self.const_problem2)
         self.assertTrue(self.const_problem2.is_completely_consistently_assigned())
 
+    def test_tree_csp_solver_on_forest(self):
+        self.name_to_variable_map["sa"].assign("red")
+        self.name_to_variable_map["v"].domain = ["red", "green"]
+        csp.tree_csp_solver(self.const_problem2)
+        self.assertTrue(self.const_problem2.is_completely_consistently_assigned())
+        self.assertEqual(self.name_to_variable_map["sa"].value, "red")
+        self.assertEqual(self.name_to_variable_map["v"].domain, ["red", "green"])
+
+        self.const_problem1.unassign_all_variables()
+        csp.tree_csp_solver(self.const_problem1)
+        self.assertFalse(self.const_problem1.get_assigned_variables())
+
+    def test_tree_decomposition(self):
+        decomposition = csp.tree_decompose(self.const_problem1)
+        self.assertEqual(decomposition.width, 2)
+        self.assertEqual(csp.count_solutions_with_tree_decomposition(self.const_problem1), 18)
+        self.assertEqual(csp.count_solutions_with_tree_decomposition(self.const_problem1,
+                                                                     csp.min_degree_elimination_order), 18)
+        self.name_to_variable_map["t"].assign("red")
+        self.name_to_variable_map["sa"].assign("blue")
+        self.assertEqual(csp.count_solutions_with_tree_decomposition(self.const_problem1), 2)
+        csp.tree_decomposition_solver(self.const_problem1)
+        self.assertTrue(self.const_problem1.is_completely_consistently_assigned())
+
+        self.const_problem1.unassign_all_variables()
+        csp.tree_decomposition_solver(self.const_problem3)
+        self.assertTrue(self.const_problem3.is_completely_consistently_assigned())
+
     def test_cycle_cutset(self):
         csp.naive_cycle_cutset(self.const_problem3)
         self.assertTrue(self.const_problem3.is_completely_consistently_assigned())
 
+    def test_find_cycle_cutset(self):
+        report = csp.get_cycle_cutset_report(self.const_problem1)
+        self.assertEqual(report.cutset, frozenset({self.name_to_variable_map["sa"]}))
+        self.assertEqual(report.cutset_size, 1)
+        self.assertEqual(report.assignments_amount, 3)
+        self.assertFalse(csp.find_cycle_cutset(self.const_problem2))
+
+        csp.naive_cycle_cutset(self.const_problem1)
+        self.assertTrue(self.const_problem1.is_completely_consistently_assigned())
+
+    def test_cutset_consistent_assignments(self):
+        generate_consistent_assignments = getattr(csp.naive_cutset_conditioning, "__generate_consistent_assignments")
+        sa, wa, nt = (self.name_to_variable_map[name] for name in ("sa", "wa", "nt"))
+        cutset_variables = (sa, wa, nt)
+        expected_assignments = list()
+        for values in itertools.product(sa.domain, wa.domain, nt.domain):
+            assignment = dict(zip(cutset_variables, values))
+            if all(constraint.is_consistent_with(assignment) for constraint in self.const_problem1.get_constraints()):
+                expected_assignments.append(assignment)
+
+        actions_history = collections.deque()
+        generated_assignments = [{variable: variable.value for variable in cutset_variables} for _ in
+                                 generate_consistent_assignments(self.const_problem1, cutset_variables,
+                                                                 actions_history)]
+        self.assertEqual(6, len(expected_assignments))
+        self.assertCountEqual(expected_assignments, generated_assignments)
+        self.assertFalse(self.const_problem1.get_assigned_variables())
+
+        current_assignment = dict()
+        nt_assignments_amount = 0
+        for variable, value in actions_history:
+            current_assignment[variable] = value
+            if variable is nt and value is not None:
+                self.assertNotEqual(current_assignment[sa], current_assignment[wa])
+                nt_assignments_amount += 1
+        self.assertEqual(6 * len(nt.domain), nt_assignments_amount)
+
+    def test_parallel_cycle_cutset(self):
+        solution = csp.parallel_cycle_cutset(self.const_problem3, processes=2)
+        self.assertTrue(self.const_problem3.is_completely_consistently_assigned(solution))
+        self.assertTrue(self.const_problem3.is_completely_consistently_assigned())
+
+        self.const_problem3.unassign_all_variables()
+        self.name_to_variable_map["v"].domain = ["red"]
+        self.name_to_variable_map["q"].domain = ["red"]
+        self.assertIsNone(csp.parallel_cycle_cutset(self.const_problem3, processes=2))
+
 
 if __name__ == '__main__':
     unittest.main()
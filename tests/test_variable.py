@@ -87,6 +87,27 @@ class TestVariable(unittest.TestCase):
         self.var.remove_from_domain(5)
         self.assertNotIn(removed_value, self.var.domain)
 
+    def test_add_to_domain(self):
+        self.var.remove_from_domain(5)
+        self.var.add_to_domain(5)
+        self.assertEqual(sorted(self.var.domain), [i for i in range(10)])
+
+    def test_domain_size(self):
+        self.assertEqual(10, self.var.domain_size)
+        self.var.remove_from_domain(5)
+        self.assertEqual(9, self.var.domain_size)
+        self.var.assign(3)
+        self.assertEqual(9, self.var.domain_size)
+
+    def test_instance(self):
+        self.var.assign(3)
+        var_instance = self.var.instance()
+        self.assertEqual(3, var_instance.value)
+        var_instance.unassign()
+        var_instance.remove_from_domain(5)
+        self.assertEqual(3, self.var.value)
+        self.assertIn(5, self.var.domain)
+
     def test_assigned_variable_construction(self):
         var1 = csp.Variable((i for i in range(10)), 7)
         self.assertEqual(7, var1.value)